@@ -0,0 +1,90 @@
+"""
+Tarefas administrativas da API.
+
+    python -m app.cli backfill-indexes
+    python -m app.cli import-users usuarios.ndjson      (ou - para ler da entrada padrão)
+    python -m app.cli export-users --output usuarios.ndjson [--include-sensitive]
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+
+def _backfill_indexes(args):
+    from app.services.user_service import user_service
+
+    async def run():
+        # A coluna name_normalized e os índices precisam existir antes da migração
+        await user_service.ensure_schema()
+        return await user_service.backfill_indexes(batch_size=args.batch_size)
+
+    updated = asyncio.run(run())
+    print(f"{updated} usuário(s) atualizado(s) em {user_service.table_name}")
+
+
+async def _read_chunks(file, size=64 * 1024):
+    while True:
+        chunk = file.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _import_users(args):
+    from app.services.user_bulk_service import user_bulk_service
+    from app.utils.auth import password_hasher
+
+    async def run():
+        await user_bulk_service.users.ensure_schema()
+        file = sys.stdin.buffer if args.file == "-" else open(args.file, "rb")
+        try:
+            return await user_bulk_service.import_ndjson(_read_chunks(file), check_existing=not args.no_check_existing)
+        finally:
+            if file is not sys.stdin.buffer:
+                file.close()
+            password_hasher.close()
+
+    print(json.dumps(asyncio.run(run()), ensure_ascii=False, indent=2))
+
+
+def _export_users(args):
+    from app.services.user_bulk_service import user_bulk_service
+
+    async def run():
+        file = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+        try:
+            async for chunk in user_bulk_service.export_ndjson(args.include_sensitive, args.page_size):
+                file.write(chunk)
+        finally:
+            if file is not sys.stdout.buffer:
+                file.close()
+
+    asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Tarefas administrativas da API")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backfill = subparsers.add_parser("backfill-indexes", help="Preenche name_normalized nas linhas antigas de UsersV2")
+    backfill.add_argument("--batch-size", type=int, default=100)
+    backfill.set_defaults(func=_backfill_indexes)
+
+    importer = subparsers.add_parser("import-users", help="Importa usuários de um arquivo NDJSON")
+    importer.add_argument("file", help="Arquivo NDJSON, ou - para a entrada padrão")
+    importer.add_argument("--no-check-existing", action="store_true", help="Não consulta emails já cadastrados")
+    importer.set_defaults(func=_import_users)
+
+    exporter = subparsers.add_parser("export-users", help="Exporta os usuários em NDJSON")
+    exporter.add_argument("--output", default="-", help="Arquivo de saída (padrão: saída padrão)")
+    exporter.add_argument("--include-sensitive", action="store_true", help="Inclui hash, palavra de segurança e tokens")
+    exporter.add_argument("--page-size", type=int, default=None)
+    exporter.set_defaults(func=_export_users)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
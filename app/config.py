@@ -12,4 +12,136 @@ ORACLE_COMPARTMENT_ID = os.environ.get('ORACLE_COMPARTMENT_ID')
 ORACLE_TENANT_ID = os.environ.get('ORACLE_TENANT_ID')
 ORACLE_USER_ID = os.environ.get('ORACLE_USER_ID')
 ORACLE_FINGERPRINT = os.environ.get('ORACLE_FINGERPRINT')
-ORACLE_PRIVATE_KEY_FILE = os.environ.get('ORACLE_PRIVATE_KEY_FILE')
\ No newline at end of file
+ORACLE_PRIVATE_KEY_FILE = os.environ.get('ORACLE_PRIVATE_KEY_FILE')
+
+# Armazenamento: "oracle" (Oracle NoSQL na nuvem) ou "local" (em memória, no processo, sem credenciais)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'oracle').lower()
+# Backend local: latência simulada por chamada, recusa acima das unidades/s do TableLimits
+# e fração das operações recusadas com throttling (0 a 1)
+LOCAL_STORAGE_LATENCY_MS = float(os.environ.get('LOCAL_STORAGE_LATENCY_MS', '0'))
+LOCAL_STORAGE_ENFORCE_LIMITS = os.environ.get('LOCAL_STORAGE_ENFORCE_LIMITS', 'false').lower() in ('1', 'true', 'yes')
+LOCAL_STORAGE_THROTTLE_RATE = float(os.environ.get('LOCAL_STORAGE_THROTTLE_RATE', '0'))
+
+# Notícias (RSS)
+# Intervalo entre atualizações do snapshot de notícias em memória
+RSS_REFRESH_INTERVAL_SECONDS = int(os.environ.get('RSS_REFRESH_INTERVAL_SECONDS', '300'))
+
+# Tempo máximo de download de cada feed e prazo total de uma atualização
+RSS_FEED_TIMEOUT_SECONDS = float(os.environ.get('RSS_FEED_TIMEOUT_SECONDS', '8'))
+RSS_REFRESH_DEADLINE_SECONDS = float(os.environ.get('RSS_REFRESH_DEADLINE_SECONDS', '10'))
+# Circuit breaker: falhas seguidas até pular o feed e por quanto tempo ele fica pulado
+RSS_BREAKER_FAILURES = int(os.environ.get('RSS_BREAKER_FAILURES', '3'))
+RSS_BREAKER_COOLDOWN_SECONDS = float(os.environ.get('RSS_BREAKER_COOLDOWN_SECONDS', '300'))
+# Quantos snapshots anteriores continuam válidos para cursores já entregues ao app
+RSS_SNAPSHOTS_RETAINED = int(os.environ.get('RSS_SNAPSHOTS_RETAINED', '3'))
+
+# Endereço público da API, usado para montar links absolutos (ex.: imagens do proxy).
+# Vazio = links relativos à raiz da API.
+PUBLIC_BASE_URL = os.environ.get('PUBLIC_BASE_URL', '').rstrip('/')
+
+# Proxy de imagens das notícias: miniaturas em cache LRU no disco
+IMAGE_CACHE_DIR = Path(os.environ.get('IMAGE_CACHE_DIR', BASE_DIR.parent / '.cache' / 'imagens'))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', str(200 * 1024 * 1024)))
+IMAGE_THUMB_WIDTH = int(os.environ.get('IMAGE_THUMB_WIDTH', '480'))
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', '4'))
+# Quanto uma requisição espera pela miniatura antes de redirecionar para a imagem original
+IMAGE_WAIT_SECONDS = float(os.environ.get('IMAGE_WAIT_SECONDS', '2'))
+# Por quanto tempo uma imagem cujo download/processamento falhou não é tentada de novo
+IMAGE_FAILURE_TTL_SECONDS = float(os.environ.get('IMAGE_FAILURE_TTL_SECONDS', '300'))
+# Hosts de imagem liberados mesmo em endereço interno (separados por vírgula), ex.:
+# "127.0.0.1,localhost" para um servidor de imagens local em desenvolvimento e benchmarks
+IMAGE_ALLOWED_HOSTS = frozenset(h.strip().lower() for h in os.environ.get('IMAGE_ALLOWED_HOSTS', '').split(',') if h.strip())
+
+# Léxico de temas do ranking de relevância (JSON {"termo": peso}); vazio = léxico padrão
+RSS_TOPIC_LEXICON_FILE = os.environ.get('RSS_TOPIC_LEXICON_FILE')
+
+# Oracle NoSQL: o borneo é bloqueante, então as chamadas rodam num pool de threads
+# DB_POOL_SIZE threads, no máximo DB_MAX_CONCURRENCY chamadas em andamento (as demais esperam)
+# e DB_CALL_TIMEOUT_SECONDS por chamada, contando a espera na fila
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '16'))
+DB_MAX_CONCURRENCY = int(os.environ.get('DB_MAX_CONCURRENCY', '64'))
+DB_CALL_TIMEOUT_SECONDS = float(os.environ.get('DB_CALL_TIMEOUT_SECONDS', '10'))
+# Métricas por operação (latência, unidades consumidas, linhas, throttling) servidas em /metrics
+DB_METRICS_ENABLED = os.environ.get('DB_METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# Capacidade provisionada da tabela de usuários (TableLimits: unidades de leitura/escrita por
+# segundo e GB). O governador mantém este processo dentro de DB_CAPACITY_SHARE dessas unidades
+# (ex.: 0.25 com 4 workers), com no máximo DB_MAX_QUEUE_DEPTH chamadas esperando (as demais
+# recebem 503); throttling do servidor é repetido por até DB_THROTTLE_RETRY_SECONDS
+DB_TABLE_READ_UNITS = int(os.environ.get('DB_TABLE_READ_UNITS', '50'))
+DB_TABLE_WRITE_UNITS = int(os.environ.get('DB_TABLE_WRITE_UNITS', '50'))
+DB_TABLE_STORAGE_GB = int(os.environ.get('DB_TABLE_STORAGE_GB', '25'))
+DB_CAPACITY_GOVERNOR = os.environ.get('DB_CAPACITY_GOVERNOR', 'true').lower() in ('1', 'true', 'yes')
+DB_CAPACITY_SHARE = float(os.environ.get('DB_CAPACITY_SHARE', '1'))
+DB_MAX_QUEUE_DEPTH = int(os.environ.get('DB_MAX_QUEUE_DEPTH', '128'))
+DB_THROTTLE_RETRY_SECONDS = float(os.environ.get('DB_THROTTLE_RETRY_SECONDS', '3'))
+
+# Cache dos documentos de usuário (GET /auth/me e afins): máximo de usuários e validade de cada entrada
+USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', '10000'))
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', '300'))
+
+# Atualizações com versão da linha (read-modify-write): tentativas antes de desistir com 409
+USER_UPDATE_MAX_RETRIES = int(os.environ.get('USER_UPDATE_MAX_RETRIES', '5'))
+
+# Versões de schema já aplicadas (JSON {tabela: versão}); com a versão igual a DDL não roda
+# na inicialização. Vazio desliga o cache e a DDL sempre roda (padrão no backend local, que começa vazio)
+SCHEMA_CACHE_FILE = os.environ.get(
+    'SCHEMA_CACHE_FILE',
+    '' if STORAGE_BACKEND == 'local' else str(BASE_DIR.parent / '.cache' / 'schema_versions.json'),
+)
+
+# Importação/exportação em massa de usuários (admin)
+# Chave exigida no header X-Admin-Key das rotas /admin; vazia desliga essas rotas
+ADMIN_API_KEY = os.environ.get('ADMIN_API_KEY', '')
+# Linhas processadas por lote, escritas simultâneas no banco e linhas por página na exportação
+USER_IMPORT_BATCH_SIZE = int(os.environ.get('USER_IMPORT_BATCH_SIZE', '500'))
+USER_IMPORT_CONCURRENCY = int(os.environ.get('USER_IMPORT_CONCURRENCY', '32'))
+USER_EXPORT_PAGE_SIZE = int(os.environ.get('USER_EXPORT_PAGE_SIZE', '1000'))
+
+# Tokens de dispositivo (FCM): no máximo DEVICE_TOKENS_PER_USER por usuário (ficam os usados
+# mais recentemente) e tokens sem uso há DEVICE_TOKEN_TTL_DAYS dias deixam de receber e são removidos
+DEVICE_TOKENS_PER_USER = int(os.environ.get('DEVICE_TOKENS_PER_USER', '5'))
+DEVICE_TOKEN_TTL_DAYS = int(os.environ.get('DEVICE_TOKEN_TTL_DAYS', '60'))
+# Envio de notificações: "firebase" (FCM) ou "local" (em memória, para desenvolvimento e benchmarks)
+MESSAGING_BACKEND = os.environ.get('MESSAGING_BACKEND', 'firebase').lower()
+
+# Limite de requests nas rotas caras de /auth (consulta ao banco e/ou hash de senha), em janela
+# deslizante, por IP e por identificador informado (email/nome). Formato das regras:
+# "rota=por_ip,por_identificador/janela_em_segundos;..." (0 desliga aquele limite)
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+RATE_LIMIT_RULES = os.environ.get(
+    'RATE_LIMIT_RULES',
+    'login=30,5/60;check-email=30,10/60;verify-security-word=20,5/300;reset-password=10,3/300',
+)
+# "memory" (contadores do próprio processo) ou "redis" (compartilhados entre workers, em RATE_LIMIT_REDIS_URL)
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory').lower()
+RATE_LIMIT_REDIS_URL = os.environ.get('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
+# Atrás de proxies reversos o IP do cliente vem de X-Forwarded-For: cada proxy acrescenta
+# à direita o endereço que viu, então vale o RATE_LIMIT_PROXY_HOPS-ésimo a partir da direita
+# (o que está à esquerda dele pode ter sido inventado pelo cliente)
+RATE_LIMIT_TRUST_PROXY = os.environ.get('RATE_LIMIT_TRUST_PROXY', 'false').lower() in ('1', 'true', 'yes')
+RATE_LIMIT_PROXY_HOPS = max(1, int(os.environ.get('RATE_LIMIT_PROXY_HOPS', '1')))
+
+# Lembretes de exame: "nosql" (tabela RemindersV2, compartilhada pelos workers e persistente
+# entre deploys) ou "sqlite" (arquivo REMINDER_SQLITE_PATH, para desenvolvimento e testes)
+REMINDER_STORE = os.environ.get('REMINDER_STORE', 'nosql').lower()
+REMINDER_SQLITE_PATH = os.environ.get('REMINDER_SQLITE_PATH', str(BASE_DIR.parent / '.cache' / 'reminders.sqlite3'))
+# Capacidade provisionada da tabela de lembretes, separada da de usuários (poucas leituras por
+# dia do horizonte e uma escrita por agendamento/envio)
+REMINDER_TABLE_READ_UNITS = int(os.environ.get('REMINDER_TABLE_READ_UNITS', '10'))
+REMINDER_TABLE_WRITE_UNITS = int(os.environ.get('REMINDER_TABLE_WRITE_UNITS', '10'))
+REMINDER_TABLE_STORAGE_GB = int(os.environ.get('REMINDER_TABLE_STORAGE_GB', '1'))
+# Só os lembretes das próximas REMINDER_HORIZON_HOURS horas ficam no agendador (a janela é
+# recarregada a cada metade dela); na subida também entram os pendentes das últimas
+# REMINDER_CATCHUP_HOURS horas, que venceram com o app fora do ar
+REMINDER_HORIZON_HOURS = float(os.environ.get('REMINDER_HORIZON_HOURS', '24'))
+REMINDER_CATCHUP_HOURS = float(os.environ.get('REMINDER_CATCHUP_HOURS', '72'))
+
+# Entrega de notificações push: as mensagens de todos os usuários entram numa fila e saem em
+# lotes de até FCM_BATCH_SIZE (máximo 500) por send_each, em FCM_SEND_WORKERS envios simultâneos.
+# Um lote espera até FCM_BATCH_LINGER_MS juntando mensagens; erros transitórios do FCM são
+# tentados até FCM_MAX_ATTEMPTS vezes, com espera exponencial a partir de FCM_RETRY_BASE_SECONDS
+FCM_BATCH_SIZE = min(int(os.environ.get('FCM_BATCH_SIZE', '500')), 500)
+FCM_SEND_WORKERS = int(os.environ.get('FCM_SEND_WORKERS', '4'))
+FCM_BATCH_LINGER_MS = float(os.environ.get('FCM_BATCH_LINGER_MS', '20'))
+FCM_MAX_ATTEMPTS = int(os.environ.get('FCM_MAX_ATTEMPTS', '3'))
+FCM_RETRY_BASE_SECONDS = float(os.environ.get('FCM_RETRY_BASE_SECONDS', '1'))
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from app.services.user_bulk_service import user_bulk_service
+from app.utils.auth import require_admin
+
+router = APIRouter(prefix="/admin", tags=["Administração"], dependencies=[Depends(require_admin)])
+
+@router.post("/users/import")
+async def import_users(
+    request: Request,
+    check_existing: bool = Query(True, description="Pula linhas cujo email já está cadastrado")
+):
+    """Importa usuários de um corpo NDJSON (application/x-ndjson), lido em fluxo."""
+    try:
+        return await user_bulk_service.import_ndjson(request.stream(), check_existing=check_existing)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/users/export")
+async def export_users(
+    include_sensitive: bool = Query(False, description="Inclui password_hash, security_word e device_tokens")
+):
+    """Exporta todos os usuários em NDJSON, página a página."""
+    return StreamingResponse(
+        user_bulk_service.export_ndjson(include_sensitive=include_sensitive),
+        media_type="application/x-ndjson"
+    )
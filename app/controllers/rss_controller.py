@@ -1,29 +1,85 @@
-from fastapi import APIRouter, Query
-from fastapi.responses import JSONResponse
-from app.services.rss_service import buscar_rss
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, Response
+from typing import Optional
+import asyncio
+from app import config
+from app.services.rss_service import obter_pagina, buscar_noticias, idade_snapshot
+from app.utils.http_cache import etag_confere
+from app.services.image_service import OrigemBloqueada, image_proxy
 
 router = APIRouter(prefix="/rss", tags=["RSS"])
 
 @router.get("/", response_class=JSONResponse)
-def get_rss(
+async def get_rss(
+    request: Request,
     page: int = Query(1, ge=1, description="Número da página"),
-    limit: int = Query(3, ge=1, description="Itens por página")
+    limit: int = Query(3, ge=1, le=50, description="Itens por página"),
+    cursor: Optional[str] = Query(None, description="Cursor devolvido em proximoCursor (tem prioridade sobre page e sort)"),
+    sort: str = Query("random", description="Ordem das notícias: 'random' ou 'relevance' (temas de saúde do homem)")
 ):
-    # 1. Busca todas as notícias
-    todas_noticias = buscar_rss()
-    
-    # 2. Calcula o total
-    total_noticias = len(todas_noticias)
-    
-    # 3. Faz a paginação (fatia a lista)
-    inicio = (page - 1) * limit
-    fim = inicio + limit
-    noticias_paginadas = todas_noticias[inicio:fim]
-    
-    # 4. Retorna no formato que o Flutter espera (Map/Dicionário)
+    # 1. Pega a página pronta do snapshot em memória (atualizado em segundo plano)
+    try:
+        pagina = await obter_pagina(page, limit, cursor, sort)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    idade = idade_snapshot()
+    idade = None if idade is None else int(idade)
+    headers = {
+        "ETag": pagina.etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache",
+        "Age": str(idade or 0),
+    }
+
+    # 2. O app já tem essa página: 304 sem corpo
+    if etag_confere(request.headers.get("if-none-match"), pagina.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # 3. Retorna o JSON no formato que o Flutter espera, já comprimido se o app aceitar
+    corpo, codificacao = pagina.codificada(request.headers.get("accept-encoding"), idade)
+    if codificacao:
+        headers["Content-Encoding"] = codificacao
+    return Response(content=corpo, media_type="application/json", headers=headers)
+
+
+@router.get("/search", response_class=JSONResponse)
+async def search_rss(
+    q: str = Query(..., min_length=1, description="Termos da busca"),
+    limit: int = Query(10, ge=1, le=50, description="Máximo de resultados")
+):
+    noticias = await buscar_noticias(q, limit)
     return JSONResponse(content={
-        "noticias": noticias_paginadas,
-        "totalNoticias": total_noticias,
-        "paginaAtual": page,
-        "noticiasPorPagina": limit
-    })
\ No newline at end of file
+        "noticias": noticias,
+        "totalNoticias": len(noticias),
+        "consulta": q
+    })
+
+@router.get("/image/{image_id}")
+async def get_image(image_id: str, request: Request):
+    """Miniatura de uma imagem de notícia, servida do cache em disco."""
+    em_cache = image_proxy.obter(image_id)
+
+    if em_cache is None:
+        # A miniatura é gerada no pool de workers; a requisição só espera um pouco por ela
+        futuro = image_proxy.agendar(image_id)
+        if futuro is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Imagem não encontrada")
+        try:
+            em_cache = await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(futuro)), timeout=config.IMAGE_WAIT_SECONDS
+            )
+        except OrigemBloqueada:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Imagem não encontrada")
+        except Exception:
+            # Ainda processando (ou a origem falhou): manda o app para a imagem original
+            return RedirectResponse(image_proxy.origem(image_id), status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
+    caminho, etag = em_cache
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return FileResponse(caminho, media_type="image/jpeg", headers=headers)
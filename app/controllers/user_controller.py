@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException, status, Depends
-from app.schemas.user_schema import UserCreate, UserLogin, PasswordReset, Token, EmailOnly, SecurityWordCheck, DeviceToken, ExamSchedule
+from app.schemas.user_schema import UserCreate, UserLogin, PasswordReset, Token, TokenPair, EmailOnly, SecurityWordCheck, DeviceToken, ExamSchedule, RefreshRequest
 from app.services.user_service import user_service
 from app.utils.auth import AuthUtils, get_current_user
+from app.utils.rate_limit import rate_limit
 from app.firebase_setup import schedule_reminder 
 
 router = APIRouter(prefix="/auth", tags=["Autenticação"])
@@ -10,22 +11,27 @@ router = APIRouter(prefix="/auth", tags=["Autenticação"])
 async def register(user_data: UserCreate):
     return await user_service.register_user(user_data)
 
-@router.post("/login", response_model=Token)
+@router.post("/login", response_model=Token, dependencies=[Depends(rate_limit("login", "identifier"))])
 async def login(login_data: UserLogin):
     return await user_service.login_user(login_data)
 
-@router.post("/reset-password")
+@router.post("/refresh", response_model=TokenPair)
+async def refresh(data: RefreshRequest):
+    # Sem hash de senha: o usuário vem do cache e o refresh token é trocado por um par novo e revogado
+    return await user_service.refresh_session(data.refresh_token)
+
+@router.post("/reset-password", dependencies=[Depends(rate_limit("reset-password", "email"))])
 async def reset_password(reset_data: PasswordReset):
     return await user_service.reset_password(reset_data)
 
-@router.post("/check-email")
+@router.post("/check-email", dependencies=[Depends(rate_limit("check-email", "email"))])
 async def check_email(email_data: EmailOnly):
     user = await user_service._get_user_by_email(email_data.email)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Email não encontrado")
     return {"message": "Email encontrado", "exists": True}
 
-@router.post("/verify-security-word")
+@router.post("/verify-security-word", dependencies=[Depends(rate_limit("verify-security-word", "email"))])
 async def verify_security_word(data: SecurityWordCheck):
     user = await user_service._get_user_by_email(data.email)
     if not user:
@@ -50,17 +56,13 @@ async def schedule_exam_test(
     """
     Agendar um lembrete de exame simples.
     """
-    user = await user_service.get_user_by_id(current_user_id, include_sensitive=True) 
-    
-    if not user or not user.get('device_tokens'):
+    # O lembrete vai para todos os aparelhos ativos do usuário na hora do envio
+    if not await user_service.live_device_tokens(current_user_id):
         raise HTTPException(status_code=404, detail="Token do dispositivo não encontrado.")
     
-    latest_token = user['device_tokens'][-1]['token'] 
-    
     # 🟢 ATUALIZADO: Chama sem recurrence
-    schedule_reminder(
+    await schedule_reminder(
         current_user_id,
-        latest_token,
         exam_data.exam_name, 
         exam_data.exam_date
     )
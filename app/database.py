@@ -1,43 +1,255 @@
 # app/database.py - CORRIGIR linha 3
-from borneo import NoSQLHandle, NoSQLHandleConfig
-from borneo.iam import SignatureProvider
+from borneo import PrepareRequest, PreparedStatement, QueryRequest
+from borneo.exception import ThrottlingException
 from app import config  # ← MUDAR ESTA LINHA
+from app.storage import open_handle
+from app.storage.governor import CapacityGovernor, DatabaseOverloaded
+from app.utils.metricas import metricas_banco, registro
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
 import os
+import random
+import threading
+import time
 
 class Database:
     def __init__(self):
-        self.handle = None
-        self._connect()
+        # A conexão só é aberta no primeiro uso: importar o módulo não lê a chave nem vai à rede
+        self._handle = None
+        self._lock = threading.Lock()
+
+    @property
+    def handle(self):
+        if self._handle is None:
+            with self._lock:
+                if self._handle is None:
+                    self._handle = self._connect()
+        return self._handle
+
+    @handle.setter
+    def handle(self, handle):
+        self._handle = handle
 
     def _connect(self):
-        endpoint = config.ORACLE_ENDPOINT
-        compartment_id = config.ORACLE_COMPARTMENT_ID
+        # Oracle NoSQL na nuvem ou o backend local em memória, conforme STORAGE_BACKEND
+        return open_handle(config.STORAGE_BACKEND)
+
+    def close(self):
+        if self._handle:
+            self._handle.close()
+            self._handle = None
+
+
+def cached_schema_version(table_name: str) -> Optional[str]:
+    """Versão do schema já aplicada a esta tabela, segundo o cache local (None se não há)."""
+    if not config.SCHEMA_CACHE_FILE:
+        return None
+    try:
+        with open(config.SCHEMA_CACHE_FILE) as file:
+            return json.load(file).get(table_name)
+    except (OSError, ValueError):
+        return None
+
+
+def store_schema_version(table_name: str, version: str):
+    if not config.SCHEMA_CACHE_FILE:
+        return
+    try:
+        with open(config.SCHEMA_CACHE_FILE) as file:
+            versions = json.load(file)
+    except (OSError, ValueError):
+        versions = {}
+    versions[table_name] = version
+    os.makedirs(os.path.dirname(config.SCHEMA_CACHE_FILE) or ".", exist_ok=True)
+    temporary = f"{config.SCHEMA_CACHE_FILE}.tmp"
+    with open(temporary, "w") as file:
+        json.dump(versions, file)
+    os.replace(temporary, config.SCHEMA_CACHE_FILE)
+
+class DatabaseTimeout(Exception):
+    """Uma chamada ao banco passou do timeout. Vira 504 no main."""
+
+
+class AsyncHandle:
+    """
+    Versão awaitable do handle do borneo.
+
+    Cada chamada roda num pool de threads de tamanho fixo, com no máximo `max_concurrency`
+    chamadas em andamento e um timeout por chamada, para que uma ida lenta ao Oracle NoSQL
+    não trave o event loop (e com ele todas as outras requisições).
+    """
+
+    def __init__(self, database: Database, max_workers: int, max_concurrency: int, timeout: float, metrics=None,
+                 governor: Optional[CapacityGovernor] = None, retry_deadline: float = 0.0, backoff_base: float = 0.05,
+                 backoff_max: float = 1.0):
+        self._database = database
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="nosql")
+        self.max_concurrency = max_concurrency
+        # Criado no primeiro uso, no event loop que está rodando (o do app, não o da importação)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.timeout = timeout
+        # MetricasBanco: latência, unidades e throttling de cada chamada (None desliga)
+        self.metrics = metrics
+        # Ritmo das chamadas dentro das unidades provisionadas da tabela (None desliga)
+        self.governor = governor
+        # ThrottlingException é repetida com espera exponencial (com jitter) até este prazo
+        self.retry_deadline = retry_deadline
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
 
-        nosql_config = NoSQLHandleConfig(endpoint)
-        nosql_config.set_default_compartment(compartment_id)
+    def _limit(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
 
-        private_key_file = config.ORACLE_PRIVATE_KEY_FILE
-        full_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', private_key_file)
+    async def _run(self, method: str, *args, timeout: Optional[float] = None):
+        deadline = time.monotonic() + self.retry_deadline
+        attempt = 0
+        while True:
+            try:
+                return await self._call(method, args, timeout)
+            except ThrottlingException:
+                # Recusada pelo servidor antes de executar: repetir não duplica a escrita
+                delay = random.uniform(0.5, 1.0) * min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                attempt += 1
+                if time.monotonic() + delay > deadline:
+                    retry_after = self.governor.retry_after() if self.governor is not None else 1
+                    raise DatabaseOverloaded(retry_after, "Banco de dados sem capacidade no momento")
+                await asyncio.sleep(delay)
 
-        print(f"Procurando chave em: {full_path}")
+    async def _call(self, method: str, args: tuple, timeout: Optional[float]):
+        start = time.perf_counter()
+        reads, writes = CapacityGovernor.buckets_for(method, args[0]) if self.governor is not None else (False, False)
+        estimate = None
+        try:
+            if reads or writes:
+                estimate = await self.governor.admit(method, reads, writes)
+            async with self._limit():
+                loop = asyncio.get_running_loop()
+                call = loop.run_in_executor(self._executor, getattr(self._database.handle, method), *args)
+                try:
+                    result = await asyncio.wait_for(call, timeout or self.timeout)
+                except asyncio.TimeoutError:
+                    raise DatabaseTimeout("Banco de dados não respondeu a tempo")
+        except DatabaseOverloaded:
+            raise
+        except Exception as e:
+            throttled = isinstance(e, ThrottlingException)
+            if estimate is not None:
+                self.governor.release(estimate)
+                if throttled:
+                    self.governor.throttled(reads, writes)
+            if self.metrics is not None:
+                self.metrics.falha(method, time.perf_counter() - start, e, throttled)
+            raise
+        if estimate is not None:
+            self.governor.settle(method, estimate, result)
+        if self.metrics is not None:
+            self.metrics.sucesso(method, time.perf_counter() - start, result)
+        return result
 
-        # Ler o conteúdo do arquivo PEM
-        with open(full_path, 'r') as file:
-            private_key = file.read()
+    async def get(self, request, timeout: Optional[float] = None):
+        return await self._run("get", request, timeout=timeout)
 
-        provider = SignatureProvider(
-            tenant_id=config.ORACLE_TENANT_ID,
-            user_id=config.ORACLE_USER_ID,
-            fingerprint=config.ORACLE_FINGERPRINT,
-            private_key=private_key
-        )
+    async def put(self, request, timeout: Optional[float] = None):
+        return await self._run("put", request, timeout=timeout)
 
-        nosql_config.set_authorization_provider(provider)
-        self.handle = NoSQLHandle(nosql_config)
-        print("Conectado ao Oracle NoSQL!")
+    async def delete(self, request, timeout: Optional[float] = None):
+        return await self._run("delete", request, timeout=timeout)
+
+    async def query(self, request, timeout: Optional[float] = None):
+        return await self._run("query", request, timeout=timeout)
+
+    async def prepare(self, request, timeout: Optional[float] = None):
+        return await self._run("prepare", request, timeout=timeout)
+
+    async def write_multiple(self, request, timeout: Optional[float] = None):
+        return await self._run("write_multiple", request, timeout=timeout)
+
+    async def do_table_request(self, request, timeout_ms: int, poll_interval_ms: int):
+        return await self._run("do_table_request", request, timeout_ms, poll_interval_ms, timeout=timeout_ms / 1000 + 5)
 
     def close(self):
-        if self.handle:
-            self.handle.close()
+        self._executor.shutdown(wait=False)
+
+class StatementRegistry:
+    """
+    Consultas preparadas uma única vez por processo.
+
+    Na primeira execução de um texto SQL ele é compilado com PrepareRequest e guardado;
+    as execuções seguintes só copiam o PreparedStatement e ligam as variáveis ($nome),
+    sem nova compilação no servidor e sem montar SQL com valores vindos do usuário.
+    """
+
+    def __init__(self, handle: AsyncHandle):
+        self._handle = handle
+        # texto SQL -> PreparedStatement (ou o Future da preparação em andamento)
+        self._prepared: Dict[str, "asyncio.Future[PreparedStatement]"] = {}
+        self.prepares = 0
+
+    async def prepare(self, statement: str) -> PreparedStatement:
+        future = self._prepared.get(statement)
+        if future is None:
+            # Quem chega durante a preparação espera a mesma, em vez de preparar de novo
+            future = asyncio.get_running_loop().create_future()
+            self._prepared[statement] = future
+            try:
+                result = await self._handle.prepare(PrepareRequest().set_statement(statement))
+                self.prepares += 1
+                future.set_result(result.get_prepared_statement())
+            except asyncio.CancelledError:
+                del self._prepared[statement]
+                future.cancel()
+                raise
+            except Exception as e:
+                del self._prepared[statement]
+                future.set_exception(e)
+                # Marca a exceção como lida: quem não estava esperando não gera aviso no log
+                future.exception()
+                raise
+        return await asyncio.shield(future)
+
+    async def bind(self, statement: str, variables: Optional[Dict[str, Any]] = None) -> QueryRequest:
+        """QueryRequest da consulta preparada com as variáveis ligadas (ex.: {"$email": email})."""
+        prepared = (await self.prepare(statement)).copy_statement()
+        for name, value in (variables or {}).items():
+            prepared.set_variable(name, value)
+        return QueryRequest().set_prepared_statement(prepared)
+
+    async def query(self, statement: str, variables: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Executa até o fim e devolve todas as linhas."""
+        request = await self.bind(statement, variables)
+        rows = []
+        try:
+            while True:
+                rows.extend((await self._handle.query(request)).get_results())
+                if request.is_done():
+                    return rows
+        finally:
+            request.close()
+
+    def clear(self):
+        """Esquece as consultas preparadas (ex.: depois de mudar o schema da tabela)."""
+        self._prepared.clear()
+
 
-db = Database()
\ No newline at end of file
+db = Database()
+governor = None
+if config.DB_CAPACITY_GOVERNOR:
+    governor = registro.registrar(CapacityGovernor(
+        config.DB_TABLE_READ_UNITS * config.DB_CAPACITY_SHARE,
+        config.DB_TABLE_WRITE_UNITS * config.DB_CAPACITY_SHARE,
+        config.DB_MAX_QUEUE_DEPTH,
+    ))
+async_handle = AsyncHandle(
+    db, config.DB_POOL_SIZE, config.DB_MAX_CONCURRENCY, config.DB_CALL_TIMEOUT_SECONDS,
+    metrics=metricas_banco if config.DB_METRICS_ENABLED else None,
+    governor=governor,
+    retry_deadline=config.DB_THROTTLE_RETRY_SECONDS,
+)
+statements = StatementRegistry(async_handle)
\ No newline at end of file
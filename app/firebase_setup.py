@@ -1,8 +1,12 @@
 import firebase_admin
-from firebase_admin import credentials, messaging
-from apscheduler.schedulers.background import BackgroundScheduler
+from firebase_admin import credentials
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
 import os
+from app import config
+from app.services.notification_service import send_exam_reminder
+from app.services.reminder_store import new_reminder, open_reminder_store
 
 CREDENTIALS_PATH = "firebase-service-account.json"
 
@@ -15,50 +19,120 @@ def initialize_firebase():
         else:
             print(f"ERRO: Arquivo de credenciais não encontrado em {CREDENTIALS_PATH}")
 
-def send_fcm_message(token: str, title: str, body: str):
-    try:
-        message = messaging.Message(
-            notification=messaging.Notification(
-                title=title,
-                body=body,
-            ),
-            token=token,
-        )
-        response = messaging.send(message)
-        print('Mensagem FCM enviada com sucesso:', response)
-    except Exception as e:
-        print('Erro ao enviar mensagem FCM:', e)
+# Iniciado no lifespan do app (app/main.py), não na importação; os jobs rodam no event loop
+# do app, então podem usar os serviços async (banco, envio de notificações)
+scheduler = AsyncIOScheduler()
 
-scheduler = BackgroundScheduler()
-scheduler.start()
 
-# 🟢 ATUALIZADO: Removido parâmetro recurrence e lógica complexa
-def schedule_reminder(user_id: str, token: str, exam_name: str, exam_date_str: str):
+class ReminderScheduler:
     """
-    Agenda um lembrete único para 3 dias antes do exame.
+    Lembretes de exame guardados no REMINDER_STORE, para não se perderem num restart ou
+    deploy. O agendador em memória só recebe os que vencem dentro do horizonte
+    (REMINDER_HORIZON_HOURS): na subida eles são carregados de uma vez, e um job periódico
+    carrega a janela seguinte antes de a atual acabar.
+
+    Com vários workers todos carregam os mesmos lembretes; na hora do envio cada um tenta
+    marcar o lembrete como em envio no store, e só quem conseguiu envia. A entrega é no
+    máximo uma vez: um worker que cai entre marcar e enviar deixa o lembrete em "sending",
+    e ele não é mais carregado.
     """
-    try:
-        exam_date = datetime.strptime(exam_date_str, "%Y-%m-%d")
-        
-        # Data do aviso (3 dias antes)
-        run_date = exam_date - timedelta(days=3)
-        
-        # Se já passou (para testes), joga para 1 minuto no futuro
-        if run_date < datetime.now():
-            run_date = datetime.now() + timedelta(minutes=1)
 
-        job_id = f"reminder_{user_id}_{exam_name}_{exam_date_str}"
+    def __init__(self, scheduler, store=None):
+        self.scheduler = scheduler
+        self._store = store
+        self.loaded_until: Optional[datetime] = None
 
-        # 🟢 Usa trigger='date' para executar UMA vez na data específica
-        scheduler.add_job(
-            send_fcm_message,
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = open_reminder_store()
+        return self._store
+
+    @store.setter
+    def store(self, value):
+        self._store = value
+
+    async def start(self):
+        """Chamado no lifespan, com o agendador já rodando."""
+        await self.store.ensure_schema()
+        loaded = await self.load_horizon(catch_up=True)
+        self.scheduler.add_job(
+            self.load_horizon, trigger='interval', hours=config.REMINDER_HORIZON_HOURS / 2,
+            id="reminders_horizon", replace_existing=True
+        )
+        print(f"{loaded} lembrete(s) carregado(s) até {self.loaded_until}")
+
+    async def load_horizon(self, catch_up: bool = False) -> int:
+        now = datetime.now()
+        start = now - timedelta(hours=config.REMINDER_CATCHUP_HOURS) if catch_up else self.loaded_until or now
+        end = now + timedelta(hours=config.REMINDER_HORIZON_HOURS)
+        reminders = await self.store.due_between(start, end)
+        for reminder in reminders:
+            self._add_job(reminder, now)
+        self.loaded_until = end
+        return len(reminders)
+
+    def _add_job(self, reminder: Dict[str, Any], now: datetime):
+        # Vencidos com o app fora do ar vão agora (uma data no passado seria descartada como perdida)
+        self.scheduler.add_job(
+            run_reminder,
             trigger='date',
-            run_date=run_date,
-            id=job_id,
-            args=[token, "Lembrete de Exame", f"Não esqueça do seu exame: {exam_name}! É daqui a 3 dias."],
+            run_date=max(datetime.fromisoformat(reminder["run_at"]), now),
+            id=reminder["reminder_id"],
+            args=[self.store, reminder],
             replace_existing=True
         )
+
+    async def schedule(self, user_id: str, exam_name: str, exam_date_str: str):
+        """
+        Lembrete único para 3 dias antes do exame, enviado a todos os aparelhos do usuário
+        que estiverem ativos na hora do envio. Reagendar o mesmo exame substitui o anterior.
+        """
+        exam_date = datetime.strptime(exam_date_str, "%Y-%m-%d")
+
+        # Data do aviso (3 dias antes)
+        due = exam_date - timedelta(days=3)
+
+        # Se já passou (para testes), joga para 1 minuto no futuro
+        now = datetime.now()
+        run_date = due if due >= now else now + timedelta(minutes=1)
+
+        reminder = new_reminder(f"reminder_{user_id}_{exam_name}_{exam_date_str}", user_id, exam_name, run_date)
+        await self.store.save(reminder)
+        if self.loaded_until is not None and run_date <= self.loaded_until:
+            self._add_job(reminder, now)
         print(f"Lembrete agendado para {run_date}")
 
+    def close(self):
+        if self._store is not None:
+            self._store.close()
+
+
+async def run_reminder(store, reminder: Dict[str, Any]):
+    """
+    Job do agendador: envia o lembrete se este worker foi o que o marcou como em envio.
+    Entregue em pelo menos um aparelho (ou sem aparelho para receber), o lembrete sai do
+    store; se nenhuma mensagem saiu, volta a pendente e a próxima subida (catch-up) tenta
+    de novo.
+    """
+    if not await store.claim(reminder):
+        return
+    try:
+        report = await send_exam_reminder(reminder["user_id"], reminder["exam_name"])
+    except Exception:
+        await store.release(reminder)
+        raise
+    if report["sent"] == 0 and report["failed"] > 0:
+        await store.release(reminder)
+        return
+    await store.complete(reminder)
+
+
+reminders = ReminderScheduler(scheduler)
+
+
+async def schedule_reminder(user_id: str, exam_name: str, exam_date_str: str):
+    try:
+        await reminders.schedule(user_id, exam_name, exam_date_str)
     except Exception as e:
-        print(f"Erro ao agendar lembrete: {e}")
\ No newline at end of file
+        print(f"Erro ao agendar lembrete: {e}")
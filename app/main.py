@@ -1,9 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes.router import router
 from contextlib import asynccontextmanager
-from app.database import db
-from app.firebase_setup import scheduler, initialize_firebase # 🟢 ADICIONADO: Importar a função de inicialização
+from app.database import DatabaseTimeout, db, async_handle
+from app.storage.governor import DatabaseOverloaded
+from app.firebase_setup import scheduler, reminders, initialize_firebase # 🟢 ADICIONADO: Importar a função de inicialização
+from app.services import rss_service
+from app.services.fcm_delivery import delivery_pipeline
+from app.services.image_service import image_proxy
+from app.services.user_service import user_service
+from app.utils.auth import password_hasher, token_cache
+from app.utils.metricas import registro
 import os
 
 @asynccontextmanager
@@ -17,19 +25,41 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"Erro ao inicializar Firebase: {e}")
 
+    # Garante a tabela de usuários (sem ida ao banco se o schema em cache já é o atual)
+    try:
+        await user_service.ensure_schema()
+    except Exception as e:
+        print(f"Erro ao verificar o schema: {e}")
+
     # Inicia o agendador de notificações
     if not scheduler.running:
         scheduler.start() 
+
+    # Lembretes persistidos que vencem dentro do horizonte voltam para o agendador
+    try:
+        await reminders.start()
+    except Exception as e:
+        print(f"Erro ao carregar lembretes: {e}")
+
+    # Mantém o snapshot de notícias atualizado em segundo plano
+    rss_service.iniciar_atualizacao_periodica()
         
     yield
+
+    await rss_service.parar_atualizacao_periodica()
+    image_proxy.fechar()
+    delivery_pipeline.close()
+    password_hasher.close()
     
     # Código aqui roda na finalização (quando você usa Ctrl+C)
     print("Aplicação desligando, fechando conexão com o banco...")
+    async_handle.close()
     db.close()
     
     # Desliga o agendador
     if scheduler.running:
         scheduler.shutdown()
+    reminders.close()
     print("Conexão com o banco fechada.")
 
 app = FastAPI(
@@ -52,6 +82,20 @@ app.add_middleware(
 # Incluir todas as rotas
 app.include_router(router)
 
+@app.exception_handler(DatabaseOverloaded)
+async def database_overloaded(request: Request, exc: DatabaseOverloaded):
+    # Banco no limite de capacidade: o app tenta de novo depois, em vez de receber um 500
+    return JSONResponse(
+        status_code=503,
+        content={"detail": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(DatabaseTimeout)
+async def database_timeout(request: Request, exc: DatabaseTimeout):
+    # Chamada ao banco que passou do timeout: o banco não respondeu, não é erro do app
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
 @app.get("/")
 async def root():
     return {
@@ -65,5 +109,12 @@ async def root():
 async def health_check():
     return {
         "message": "API funcionando!",
-        "backend": "FastAPI + Oracle NoSQL"
-    }
\ No newline at end of file
+        "backend": "FastAPI + Oracle NoSQL",
+        "cache_usuarios": user_service.cache.estatisticas(),
+        "cache_tokens": token_cache.estatisticas()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    # Formato de texto do Prometheus (chamadas ao banco por operação)
+    return PlainTextResponse(registro.exportar(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,6 +1,9 @@
-from pydantic import BaseModel, EmailStr, constr
+from pydantic import BaseModel, EmailStr, constr, field_validator
+from pydantic.networks import validate_email
+from functools import lru_cache
 from typing import Optional, List
 from datetime import datetime
+import re
 
 class UserCreate(BaseModel):
     name: str
@@ -24,12 +27,17 @@ class SecurityWordCheck(BaseModel):
     email: EmailStr
     security_word: str
 
-class Token(BaseModel):
+class TokenPair(BaseModel):
     access_token: str
     refresh_token: str
     token_type: str
+
+class Token(TokenPair):
     user: dict
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class DeviceToken(BaseModel):
     device_token: str
     platform: Optional[str] = "android"
@@ -37,4 +45,42 @@ class DeviceToken(BaseModel):
 # 🟢 ATUALIZADO: Removido o campo recurrence
 class ExamSchedule(BaseModel):
     exam_name: str
-    exam_date: str
\ No newline at end of file
+    exam_date: str
+
+
+# Parte local simples (ASCII, sem pontos nas pontas nem seguidos): o caso de quase todo email
+_RE_EMAIL_SIMPLES = re.compile(r"^(?!\.)(?!.*\.\.)[A-Za-z0-9.!#$%&'*+/=?^_`{|}~-]{1,64}(?<!\.)@([^@\s]+)$")
+
+
+@lru_cache(maxsize=4096)
+def _dominio_normalizado(dominio: str) -> str:
+    return validate_email(f"x@{dominio}")[1].partition("@")[2]
+
+
+def validar_email_em_massa(email: str) -> str:
+    """
+    Mesmo resultado do EmailStr, mas validando cada domínio uma única vez: numa importação
+    milhares de linhas repetem os mesmos poucos domínios, e a validação do domínio é a parte cara.
+    """
+    m = _RE_EMAIL_SIMPLES.match(email)
+    if m is None:
+        return validate_email(email)[1]
+    return f"{email[:m.start(1) - 1]}@{_dominio_normalizado(m.group(1))}"
+
+
+class UserImport(BaseModel):
+    """Uma linha do NDJSON de importação: senha em texto (password) ou já com hash (password_hash)"""
+    user_id: Optional[str] = None
+    name: str
+    email: str
+    password: Optional[constr(min_length=6)] = None
+    password_hash: Optional[str] = None
+    security_word: str
+    is_active: bool = True
+    device_tokens: List[dict] = []
+    created_at: Optional[datetime] = None
+
+    @field_validator("email")
+    @classmethod
+    def validar_email(cls, value: str) -> str:
+        return validar_email_em_massa(value)
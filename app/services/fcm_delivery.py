@@ -0,0 +1,180 @@
+import asyncio
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from firebase_admin import messaging
+
+from app import config
+from app.services.messaging import invalid_message, is_dead_token, is_transient, open_messaging
+from app.utils.metricas import Contador, registro
+
+
+class _Pending:
+    """Uma mensagem na fila, com o Future de quem a enviou e as tentativas já feitas."""
+
+    __slots__ = ("message", "future", "attempts")
+
+    def __init__(self, message: messaging.Message, future: asyncio.Future):
+        self.message = message
+        self.future = future
+        self.attempts = 0
+
+
+class DeliveryPipeline:
+    """
+    Fila única de mensagens push, enviada ao FCM em lotes.
+
+    Quem envia (`submit`) só enfileira e espera o resultado de cada mensagem. `workers`
+    tarefas tiram da fila até `batch_size` mensagens de uma vez (esperando até `linger`
+    segundos para o lote encher) e fazem um send_each por lote num pool de threads do
+    mesmo tamanho. Assim milhares de lembretes que vencem no mesmo minuto viram poucas
+    chamadas ao FCM, e não uma por usuário.
+
+    Erros transitórios (FCM indisponível, cota, falha de rede) voltam para a fila depois de
+    uma espera exponencial com jitter, até `max_attempts` tentativas; o resultado final de
+    cada mensagem é contado em fcm_messages_total (/metrics). Se o send_each recusa o lote
+    inteiro por uma mensagem inválida (ValueError), só as inválidas falham e as outras são
+    reenviadas num lote; um ValueError que não é de nenhuma mensagem (Firebase não
+    inicializado) vale para o lote todo, sem reenvio.
+    """
+
+    def __init__(self, backend=None, batch_size: int = 500, workers: int = 4, linger: float = 0.02,
+                 max_attempts: int = 3, retry_base: float = 1.0):
+        self._backend = backend
+        self.batch_size = batch_size
+        self.workers = workers
+        self.linger = linger
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.outcomes = Contador("fcm_messages_total", "Mensagens push por resultado (retried: tentativa que voltou para a fila)", ("outcome", "error"))
+        self.batches = Contador("fcm_batches_total", "Chamadas send_each, mensagens enviadas nelas e lotes reenviados sem as mensagens inválidas (split)", ("kind",))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Mensagens esperando a próxima tentativa, com o timer que as devolve à fila
+        self._retrying: Dict[_Pending, asyncio.TimerHandle] = {}
+
+    @property
+    def backend(self):
+        # Criado no primeiro envio: importar o serviço não exige o Firebase inicializado
+        if self._backend is None:
+            self._backend = open_messaging()
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend):
+        self._backend = backend
+
+    def _start(self):
+        # Fila e tarefas pertencem ao event loop em que começaram (o do app)
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="fcm")
+        self._tasks = [self._loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def submit(self, messages: List[messaging.Message]) -> List[messaging.SendResponse]:
+        """Enfileira as mensagens e devolve o resultado de cada uma, na mesma ordem."""
+        if self._loop is not asyncio.get_running_loop():
+            self.close()
+            self._start()
+        futures = []
+        for message in messages:
+            pending = _Pending(message, self._loop.create_future())
+            futures.append(pending.future)
+            self._queue.put_nowait(pending)
+        return await asyncio.gather(*futures)
+
+    def _drain(self, batch: List[_Pending]):
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+    async def _worker(self):
+        while True:
+            batch = [await self._queue.get()]
+            self._drain(batch)
+            if len(batch) < self.batch_size and self.linger:
+                await asyncio.sleep(self.linger)
+                self._drain(batch)
+            await self._send(batch)
+
+    async def _send_each(self, messages: List[messaging.Message]) -> List[messaging.SendResponse]:
+        try:
+            return await self._loop.run_in_executor(self._executor, self.backend.send_each, messages)
+        except Exception as e:
+            # A chamada inteira falhou (rede, credenciais): o mesmo erro vale para todas
+            return [messaging.SendResponse(None, e)] * len(messages)
+        finally:
+            self.batches.somar("calls")
+            self.batches.somar("messages", valor=len(messages))
+
+    async def _send(self, batch: List[_Pending]):
+        messages = [pending.message for pending in batch]
+        responses = await self._send_each(messages)
+        if isinstance(responses[0].exception, ValueError):
+            # O SDK valida o lote inteiro antes de enviar: uma mensagem malformada derruba
+            # todas. As inválidas ficam com o próprio erro e as outras vão de novo
+            errors = [invalid_message(m) for m in messages]
+            valid = [i for i, error in enumerate(errors) if error is None]
+            if len(valid) < len(messages):
+                self.batches.somar("split")
+                responses = [messaging.SendResponse(None, error) for error in errors]
+                if valid:
+                    resent = await self._send_each([messages[i] for i in valid])
+                    for i, response in zip(valid, resent):
+                        responses[i] = response
+
+        for pending, response in zip(batch, responses):
+            pending.attempts += 1
+            if pending.future.done():
+                continue  # quem enviou desistiu (cancelado)
+            if response.success:
+                self.outcomes.somar("sent", "")
+                pending.future.set_result(response)
+            elif is_transient(response.exception) and pending.attempts < self.max_attempts:
+                self.outcomes.somar("retried", type(response.exception).__name__)
+                delay = self.retry_base * 2 ** (pending.attempts - 1) * random.uniform(0.5, 1.0)
+                self._retrying[pending] = self._loop.call_later(delay, self._requeue, pending)
+            else:
+                outcome = "dead_token" if is_dead_token(response.exception) else "failed"
+                self.outcomes.somar(outcome, type(response.exception).__name__)
+                pending.future.set_result(response)
+
+    def _requeue(self, pending: _Pending):
+        del self._retrying[pending]
+        self._queue.put_nowait(pending)
+
+    def linhas(self):
+        yield from self.outcomes.linhas()
+        yield from self.batches.linhas()
+
+    def close(self):
+        """
+        Para as tarefas; mensagens ainda na fila ou esperando nova tentativa terminam com
+        erro para quem as enviou.
+        """
+        for task in self._tasks:
+            task.cancel()
+        waiting = list(self._retrying)
+        for timer in self._retrying.values():
+            timer.cancel()
+        self._retrying = {}
+        if self._queue is not None:
+            while not self._queue.empty():
+                waiting.append(self._queue.get_nowait())
+        for pending in waiting:
+            if not pending.future.done():
+                pending.future.set_exception(RuntimeError("Entrega de notificações encerrada"))
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self._tasks, self._queue, self._executor, self._loop = [], None, None, None
+
+
+delivery_pipeline = registro.registrar(DeliveryPipeline(
+    batch_size=config.FCM_BATCH_SIZE,
+    workers=config.FCM_SEND_WORKERS,
+    linger=config.FCM_BATCH_LINGER_MS / 1000,
+    max_attempts=config.FCM_MAX_ATTEMPTS,
+    retry_base=config.FCM_RETRY_BASE_SECONDS,
+))
@@ -0,0 +1,133 @@
+import asyncio
+import time
+import httpx
+from typing import Callable, Dict, List, Optional, Any
+
+
+class CircuitBreaker:
+    """Abre após N falhas seguidas e deixa o feed de fora até o fim do cooldown."""
+
+    def __init__(self, limite_falhas: int = 3, cooldown: float = 300):
+        self.limite_falhas = limite_falhas
+        self.cooldown = cooldown
+        self.falhas = 0
+        self.aberto_ate = 0.0
+
+    def permite(self) -> bool:
+        # Depois do cooldown o feed ganha uma nova tentativa (meio-aberto)
+        return time.monotonic() >= self.aberto_ate
+
+    def registrar_sucesso(self):
+        self.falhas = 0
+        self.aberto_ate = 0.0
+
+    def registrar_falha(self):
+        self.falhas += 1
+        if self.falhas >= self.limite_falhas:
+            self.aberto_ate = time.monotonic() + self.cooldown
+
+
+class FeedFetcher:
+    """
+    Baixa uma lista de feeds em paralelo com um cliente HTTP compartilhado.
+
+    Cada feed tem seu próprio timeout e circuit breaker, e a rodada inteira respeita
+    um prazo total. O processamento do XML roda em thread, fora do event loop.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        headers: Optional[Dict[str, str]] = None,
+        timeout_feed: float = 8,
+        prazo_total: float = 10,
+        limite_falhas: int = 3,
+        cooldown: float = 300,
+    ):
+        self.urls = list(urls)
+        self.headers = headers or {}
+        self.timeout_feed = timeout_feed
+        self.prazo_total = prazo_total
+        self.breakers = {url: CircuitBreaker(limite_falhas, cooldown) for url in self.urls}
+        # Validadores HTTP por feed para GET condicional
+        self.validadores: Dict[str, Dict[str, Optional[str]]] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout_feed,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=max(len(self.urls), 1) * 2),
+            )
+        return self._client
+
+    async def fechar(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _buscar_feed(self, url: str, processar: Callable[[str, bytes], Any]):
+        breaker = self.breakers.setdefault(url, CircuitBreaker())
+        validadores = self.validadores.setdefault(url, {"etag": None, "last_modified": None})
+
+        headers = {}
+        if validadores["etag"]:
+            headers['If-None-Match'] = validadores["etag"]
+        if validadores["last_modified"]:
+            headers['If-Modified-Since'] = validadores["last_modified"]
+
+        try:
+            response = await asyncio.wait_for(
+                self._get_client().get(url, headers=headers),
+                timeout=self.timeout_feed,
+            )
+
+            if response.status_code == 304:
+                breaker.registrar_sucesso()
+                return None
+
+            if response.status_code != 200:
+                print(f"⚠️ Link indisponível: {url} (Status {response.status_code})")
+                breaker.registrar_falha()
+                return None
+
+            resultado = await asyncio.get_running_loop().run_in_executor(None, processar, url, response.content)
+
+            validadores["etag"] = response.headers.get('ETag')
+            validadores["last_modified"] = response.headers.get('Last-Modified')
+            breaker.registrar_sucesso()
+            return resultado
+
+        except Exception as e:
+            print(f"❌ Erro no feed {url}: {e!r}")
+            breaker.registrar_falha()
+            return None
+
+    async def buscar_todos(self, processar: Callable[[str, bytes], Any]) -> Dict[str, Any]:
+        """
+        Retorna {url: resultado de processar(url, conteudo)} apenas para os feeds que trouxeram
+        conteúdo novo. Feeds com 304, erro, breaker aberto ou fora do prazo ficam de fora.
+        """
+        tarefas = {
+            asyncio.create_task(self._buscar_feed(url, processar)): url
+            for url in self.urls
+            if self.breakers.setdefault(url, CircuitBreaker()).permite()
+        }
+        if not tarefas:
+            return {}
+
+        concluidas, pendentes = await asyncio.wait(tarefas, timeout=self.prazo_total)
+
+        for tarefa in pendentes:
+            print(f"⏱️ Feed fora do prazo: {tarefas[tarefa]}")
+            tarefa.cancel()
+            self.breakers[tarefas[tarefa]].registrar_falha()
+
+        resultados = {}
+        for tarefa in concluidas:
+            resultado = tarefa.result()
+            if resultado is not None:
+                resultados[tarefas[tarefa]] = resultado
+        return resultados
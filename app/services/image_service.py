@@ -0,0 +1,314 @@
+import hashlib
+import io
+import ipaddress
+import os
+import socket
+import threading
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+from PIL import Image
+
+from app import config
+from app.utils.cache import CacheLRUTTL
+
+# Imagens maiores que isso nem são processadas
+MAX_ORIGINAL_BYTES = 15 * 1024 * 1024
+# Quantas origens (id -> URL) ficam registradas em memória
+MAX_ORIGENS = 20000
+# Redirecionamentos seguidos no download (cada destino passa pela checagem de endereço)
+MAX_REDIRECIONAMENTOS = 5
+
+
+class OrigemBloqueada(ValueError):
+    """URL de imagem que aponta para a rede interna (ou não é http/https)."""
+
+
+def _endereco_publico(endereco: str) -> bool:
+    return ipaddress.ip_address(endereco.split("%")[0]).is_global
+
+
+def _via_proxy(url: str) -> bool:
+    return urlsplit(url).scheme in urllib.request.getproxies()
+
+
+def verificar_origem(url: str, hosts_liberados: Iterable[str] = ()) -> bool:
+    """
+    As URLs de imagem vêm dos feeds: sem esta checagem, um feed poderia fazer o servidor
+    baixar de localhost, da rede privada ou do serviço de metadados da nuvem. Resolve o
+    host e exige que todos os endereços sejam públicos, salvo para `hosts_liberados`
+    (IMAGE_ALLOWED_HOSTS). Retorna True se o host foi liberado sem a checagem.
+    """
+    partes = urlsplit(url)
+    if partes.scheme not in ("http", "https") or not partes.hostname:
+        raise OrigemBloqueada(f"URL de imagem não suportada: {url}")
+    if partes.hostname.lower() in hosts_liberados:
+        return True
+    try:
+        enderecos = {info[4][0] for info in socket.getaddrinfo(partes.hostname, partes.port or 443, type=socket.SOCK_STREAM)}
+    except socket.gaierror as e:
+        raise OrigemBloqueada(f"Host da imagem não resolve: {partes.hostname}") from e
+    if not all(_endereco_publico(e) for e in enderecos):
+        raise OrigemBloqueada(f"Imagem em endereço interno: {partes.hostname}")
+    return False
+
+
+class CacheDiscoLRU:
+    """
+    Cache de arquivos em disco limitado em bytes, com descarte do menos usado.
+
+    Cada arquivo é salvo como '<id>-<etag>.jpg', então o índice e os ETags são
+    reconstruídos a partir do diretório quando o processo reinicia (no primeiro uso, não
+    na criação: importar o módulo não mexe no disco).
+    """
+
+    def __init__(self, diretorio: Path, max_bytes: int):
+        self.diretorio = Path(diretorio)
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        # id -> (caminho, etag, tamanho), do menos para o mais recentemente usado
+        self._entradas: "OrderedDict[str, Tuple[Path, str, int]]" = OrderedDict()
+        self._carregado = False
+
+    def _carregar(self):
+        # Chamado com o lock
+        if self._carregado:
+            return
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        arquivos = sorted(self.diretorio.glob("*.jpg"), key=lambda p: p.stat().st_mtime)
+        for caminho in arquivos:
+            image_id, _, etag = caminho.stem.partition("-")
+            tamanho = caminho.stat().st_size
+            self._entradas[image_id] = (caminho, etag, tamanho)
+            self.total_bytes += tamanho
+        self._carregado = True
+        self._descartar()
+
+    def obter(self, image_id: str) -> Optional[Tuple[Path, str]]:
+        """Arquivo e ETag da miniatura; a recência no disco fica para tocar(), fora do event loop."""
+        with self._lock:
+            self._carregar()
+            entrada = self._entradas.get(image_id)
+            if entrada is None:
+                return None
+            self._entradas.move_to_end(image_id)
+        return entrada[0], entrada[1]
+
+    def tocar(self, image_ids):
+        """Persiste a recência (mtime) para a ordem LRU sobreviver a reinícios."""
+        for image_id in image_ids:
+            entrada = self._entradas.get(image_id)
+            if entrada is None:
+                continue
+            try:
+                os.utime(entrada[0])
+            except OSError:
+                pass
+
+    def guardar(self, image_id: str, conteudo: bytes) -> Tuple[Path, str]:
+        with self._lock:
+            self._carregar()
+        etag = hashlib.sha1(conteudo).hexdigest()[:16]
+        caminho = self.diretorio / f"{image_id}-{etag}.jpg"
+        temporario = caminho.with_suffix(".tmp")
+        temporario.write_bytes(conteudo)
+        os.replace(temporario, caminho)
+
+        with self._lock:
+            anterior = self._entradas.pop(image_id, None)
+            if anterior is not None:
+                self.total_bytes -= anterior[2]
+                if anterior[0] != caminho:
+                    anterior[0].unlink(missing_ok=True)
+            self._entradas[image_id] = (caminho, etag, len(conteudo))
+            self.total_bytes += len(conteudo)
+            self._descartar()
+        return caminho, etag
+
+    def _descartar(self):
+        while self.total_bytes > self.max_bytes and len(self._entradas) > 1:
+            _, (caminho, _, tamanho) = self._entradas.popitem(last=False)
+            self.total_bytes -= tamanho
+            caminho.unlink(missing_ok=True)
+
+
+class ImageProxy:
+    """
+    Proxy das imagens das notícias: cada URL externa vira um id, a imagem é baixada uma
+    única vez em um pool de workers, reduzida para miniatura e servida a partir do disco.
+
+    Só endereços públicos (ou os hosts de `hosts_liberados`) são baixados
+    (verificar_origem, em cada redirecionamento). Uma
+    falha fica lembrada por IMAGE_FAILURE_TTL_SECONDS: nesse tempo a imagem não é baixada
+    de novo a cada pedido nem a cada snapshot. O pool, o cliente HTTP e o diretório do
+    cache só são criados no primeiro uso.
+    """
+
+    def __init__(
+        self,
+        diretorio: Path,
+        max_bytes: int,
+        largura: int = 480,
+        workers: int = 4,
+        hosts_liberados: Iterable[str] = (),
+    ):
+        self.largura = largura
+        self.workers = workers
+        self.hosts_liberados: FrozenSet[str] = frozenset(h.lower() for h in hosts_liberados)
+        self.cache = CacheDiscoLRU(diretorio, max_bytes)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+        self._origens: "OrderedDict[str, str]" = OrderedDict()
+        self._em_andamento: Dict[str, Future] = {}
+        # id -> exceção da última tentativa, por IMAGE_FAILURE_TTL_SECONDS
+        self._falhas = CacheLRUTTL(MAX_ORIGENS, config.IMAGE_FAILURE_TTL_SECONDS)
+        # ids servidos cujo mtime ainda não foi atualizado (ver obter)
+        self._a_tocar: Set[str] = set()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="imagens")
+            return self._pool
+
+    def _http(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                # Redirecionamentos seguidos à mão em _baixar, para checar cada destino
+                self._client = httpx.Client(timeout=10, follow_redirects=False, headers={'User-Agent': 'CheckMen/1.0'})
+            return self._client
+
+    @staticmethod
+    def gerar_id(url: str) -> str:
+        return hashlib.sha1(url.encode()).hexdigest()[:20]
+
+    def registrar(self, url: str) -> str:
+        """Registra a URL de origem e devolve o id usado em /rss/image/{id}."""
+        image_id = self.gerar_id(url)
+        with self._lock:
+            self._origens[image_id] = url
+            self._origens.move_to_end(image_id)
+            while len(self._origens) > MAX_ORIGENS:
+                self._origens.popitem(last=False)
+        return image_id
+
+    def origem(self, image_id: str) -> Optional[str]:
+        return self._origens.get(image_id)
+
+    def url_proxy(self, url: str) -> str:
+        """Link público da miniatura (vazio se a notícia não tem imagem)."""
+        if not url:
+            return ''
+        return f"{config.PUBLIC_BASE_URL}/rss/image/{self.registrar(url)}"
+
+    def obter(self, image_id: str) -> Optional[Tuple[Path, str]]:
+        """
+        Miniatura já no disco. A atualização do mtime (recência do LRU) vai para o pool:
+        os ids servidos se acumulam e uma única tarefa os toca de uma vez.
+        """
+        em_cache = self.cache.obter(image_id)
+        if em_cache is not None:
+            with self._lock:
+                agendar = not self._a_tocar
+                self._a_tocar.add(image_id)
+            if agendar:
+                self._executor().submit(self._tocar)
+        return em_cache
+
+    def _tocar(self):
+        with self._lock:
+            image_ids, self._a_tocar = self._a_tocar, set()
+        self.cache.tocar(image_ids)
+
+    def agendar(self, image_id: str) -> Optional[Future]:
+        """
+        Coloca a geração da miniatura no pool (uma única vez por id). Se a última tentativa
+        falhou há menos de IMAGE_FAILURE_TTL_SECONDS, devolve um Future já com aquele erro.
+        """
+        url = self.origem(image_id)
+        if url is None:
+            return None
+        falha = self._falhas.obter(image_id)
+        if falha is not None:
+            futuro = Future()
+            futuro.set_exception(falha)
+            return futuro
+        pool = self._executor()
+        with self._lock:
+            futuro = self._em_andamento.get(image_id)
+            if futuro is None:
+                futuro = pool.submit(self._gerar, image_id, url)
+                self._em_andamento[image_id] = futuro
+                futuro.add_done_callback(lambda f: self._concluido(image_id, f))
+        return futuro
+
+    def _concluido(self, image_id: str, futuro: Future):
+        self._em_andamento.pop(image_id, None)
+        if not futuro.cancelled() and futuro.exception() is not None:
+            self._falhas.guardar(image_id, futuro.exception())
+
+    def pre_carregar(self, image_ids):
+        """Agenda as miniaturas que ainda não estão no disco nem falharam há pouco (a cada snapshot)."""
+        for image_id in image_ids:
+            if self.cache.obter(image_id) is None and self._falhas.obter(image_id) is None:
+                self.agendar(image_id)
+
+    def _baixar(self, url: str) -> bytearray:
+        client = self._http()
+        for _ in range(MAX_REDIRECIONAMENTOS + 1):
+            liberado = verificar_origem(url, self.hosts_liberados)
+            with client.stream("GET", url) as response:
+                # O endereço de fato conectado também precisa ser público (o DNS pode ter mudado);
+                # atrás de um proxy de saída a conexão é com o proxy, e quem resolve é ele
+                rede = response.extensions.get("network_stream")
+                servidor = rede.get_extra_info("server_addr") if rede is not None and not (liberado or _via_proxy(url)) else None
+                if servidor and not _endereco_publico(servidor[0]):
+                    raise OrigemBloqueada(f"Imagem em endereço interno: {url}")
+                if response.is_redirect:
+                    url = urljoin(url, response.headers["location"])
+                    continue
+                response.raise_for_status()
+                conteudo = bytearray()
+                for bloco in response.iter_bytes():
+                    conteudo.extend(bloco)
+                    if len(conteudo) > MAX_ORIGINAL_BYTES:
+                        raise ValueError(f"Imagem grande demais: {url}")
+                return conteudo
+        raise ValueError(f"Redirecionamentos demais: {url}")
+
+    def _gerar(self, image_id: str, url: str) -> Tuple[Path, str]:
+        # Roda no pool: download + redimensionamento
+        conteudo = self._baixar(url)
+
+        with Image.open(io.BytesIO(conteudo)) as imagem:
+            imagem.draft("RGB", (self.largura, self.largura))
+            imagem = imagem.convert("RGB")
+            imagem.thumbnail((self.largura, self.largura * 2))
+            saida = io.BytesIO()
+            imagem.save(saida, format="JPEG", quality=80, optimize=True, progressive=True)
+
+        return self.cache.guardar(image_id, saida.getvalue())
+
+    def fechar(self):
+        with self._lock:
+            pool, client, self._pool, self._client = self._pool, self._client, None, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        if client is not None:
+            client.close()
+
+
+image_proxy = ImageProxy(
+    config.IMAGE_CACHE_DIR,
+    config.IMAGE_CACHE_MAX_BYTES,
+    largura=config.IMAGE_THUMB_WIDTH,
+    workers=config.IMAGE_WORKERS,
+    hosts_liberados=config.IMAGE_ALLOWED_HOSTS,
+)
@@ -0,0 +1,136 @@
+import random
+import threading
+import time
+from typing import Iterable, List, Optional
+
+from firebase_admin import exceptions, messaging
+
+from app import config
+
+# Erros do FCM que significam que o token não vai mais receber (app desinstalado, token de
+# outro projeto): o token é removido do usuário
+DEAD_TOKEN_ERRORS = (messaging.UnregisteredError, messaging.SenderIdMismatchError)
+
+
+# Limite de mensagens numa chamada send_each do FCM
+MAX_BATCH = 500
+
+# Erros do FCM que passam sozinhos (servidor indisponível, cota, timeout): vale tentar de novo
+TRANSIENT_ERRORS = (
+    exceptions.UnavailableError, exceptions.InternalError, exceptions.ResourceExhaustedError,
+    exceptions.DeadlineExceededError, exceptions.UnknownError,
+)
+
+
+def _invalid_token(error: exceptions.InvalidArgumentError) -> bool:
+    """
+    INVALID_ARGUMENT vale para qualquer campo da mensagem (payload grande, dado inválido);
+    só conta como token morto quando o FCM aponta o token (fieldViolations em message.token
+    ou a mensagem de token de registro inválido).
+    """
+    response = getattr(error, "http_response", None)
+    if response is not None:
+        try:
+            details = response.json().get("error", {}).get("details", [])
+        except ValueError:
+            details = []
+        for detail in details:
+            for violation in detail.get("fieldViolations", ()):
+                if violation.get("field") == "message.token":
+                    return True
+    return "registration token" in str(error).lower()
+
+
+def is_dead_token(error: Optional[BaseException]) -> bool:
+    if isinstance(error, exceptions.InvalidArgumentError):
+        return _invalid_token(error)
+    return isinstance(error, DEAD_TOKEN_ERRORS)
+
+
+def invalid_message(message: messaging.Message) -> Optional[ValueError]:
+    """
+    O erro de validação da mensagem, do mesmo codificador que o send_each usa antes de
+    enviar o lote (None se ela é válida). Separa uma mensagem malformada de um ValueError
+    que não é dela, como o Firebase não inicializado.
+    """
+    try:
+        messaging._MessagingService.encode_message(message)
+    except ValueError as e:
+        return e
+    return None
+
+
+def is_transient(error: Optional[BaseException]) -> bool:
+    """Erro que vale repetir: os do FCM em TRANSIENT_ERRORS e falhas de rede fora do SDK."""
+    return isinstance(error, TRANSIENT_ERRORS) or (
+        error is not None and not isinstance(error, (exceptions.FirebaseError, ValueError))
+    )
+
+
+class FirebaseMessaging:
+    """Envio pelo FCM (firebase_admin); bloqueante, chamado fora do event loop."""
+
+    def send_each(self, messages: List[messaging.Message]) -> List[messaging.SendResponse]:
+        return messaging.send_each(messages).responses
+
+
+class LocalMessaging:
+    """
+    Substituto do FCM em memória: guarda as mensagens "entregues" e responde como o FCM.
+
+    Tokens em `unregistered` recebem UnregisteredError e os em `invalid`, InvalidArgumentError,
+    como um app desinstalado ou um token malformado. `latency` simula a ida e volta de cada
+    chamada a send_each e `unavailable_rate` a fração de mensagens que recebe UnavailableError
+    (FCM sobrecarregado). Mais de MAX_BATCH mensagens numa chamada ou uma mensagem malformada
+    dão ValueError para o lote inteiro, como no SDK.
+    """
+
+    def __init__(self, latency: float = 0.0, unregistered: Iterable[str] = (), invalid: Iterable[str] = (),
+                 unavailable_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.unregistered = set(unregistered)
+        self.invalid = set(invalid)
+        self.unavailable_rate = unavailable_rate
+        self.sent: List[messaging.Message] = []
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def send_each(self, messages: List[messaging.Message]) -> List[messaging.SendResponse]:
+        if len(messages) > MAX_BATCH:
+            raise ValueError(f"send_each aceita no máximo {MAX_BATCH} mensagens")
+        for message in messages:
+            error = invalid_message(message)
+            if error is not None:
+                raise error
+        if self.latency:
+            time.sleep(self.latency)
+        responses = []
+        with self._lock:
+            self.calls += 1
+            for message in messages:
+                if self.unavailable_rate and self._random.random() < self.unavailable_rate:
+                    responses.append(messaging.SendResponse(None, exceptions.UnavailableError(
+                        "The server is overloaded or is not able to process the request."
+                    )))
+                elif message.token in self.unregistered:
+                    responses.append(messaging.SendResponse(None, messaging.UnregisteredError(
+                        "Requested entity was not found."
+                    )))
+                elif message.token in self.invalid:
+                    responses.append(messaging.SendResponse(None, exceptions.InvalidArgumentError(
+                        "The registration token is not a valid FCM registration token"
+                    )))
+                else:
+                    self.sent.append(message)
+                    responses.append(messaging.SendResponse({"name": f"local/messages/{len(self.sent)}"}, None))
+        return responses
+
+
+def open_messaging(backend: Optional[str] = None):
+    backend = (backend or config.MESSAGING_BACKEND).lower()
+    if backend == "local":
+        return LocalMessaging()
+    if backend == "firebase":
+        return FirebaseMessaging()
+    raise ValueError(f"MESSAGING_BACKEND desconhecido: {backend!r} (use firebase ou local)")
@@ -0,0 +1,82 @@
+import asyncio
+from typing import Any, Dict, Optional
+
+from firebase_admin import messaging
+
+from app.services.fcm_delivery import DeliveryPipeline, delivery_pipeline
+from app.services.messaging import is_dead_token
+from app.services.user_service import UserService, split_device_tokens, user_service
+from app.utils.metricas import instrumentar
+
+
+class NotificationService:
+    """
+    Notificações push para todos os aparelhos de um usuário.
+
+    Envia para cada token vivo (usado dentro de DEVICE_TOKEN_TTL_DAYS, no máximo
+    DEVICE_TOKENS_PER_USER) pela fila de entrega em lotes, e remove do usuário os tokens que
+    o FCM disser que não valem mais. Assim o custo de cada notificação fica limitado pelo
+    teto de tokens, e não pelo histórico de instalações do usuário.
+    """
+
+    def __init__(self, users: UserService, pipeline: DeliveryPipeline):
+        self.users = users
+        self.pipeline = pipeline
+
+    @property
+    def backend(self):
+        return self.pipeline.backend
+
+    @backend.setter
+    def backend(self, backend):
+        self.pipeline.backend = backend
+
+    @instrumentar("send_notification")
+    async def send_to_user(self, user_id: str, title: str, body: str, data: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Envia para todos os tokens vivos do usuário; retorna contagens de enviados, falhas e removidos."""
+        report = {"sent": 0, "failed": 0, "pruned": 0}
+        user = await self.users.get_user_by_id(user_id, include_sensitive=True)
+        live, expired = split_device_tokens(user.get("device_tokens") if user else None)
+        tokens = [t["token"] for t in live]
+        if not tokens:
+            if expired:
+                await self.users.prune_device_tokens(user_id)
+                report["pruned"] = expired
+            return report
+
+        messages = [
+            messaging.Message(notification=messaging.Notification(title=title, body=body), data=data, token=token)
+            for token in tokens
+        ]
+        # Sai junto com as mensagens de outros usuários, no próximo lote da fila
+        responses = await self.pipeline.submit(messages)
+
+        dead = []
+        for token, response in zip(tokens, responses):
+            if response.success:
+                report["sent"] += 1
+                continue
+            report["failed"] += 1
+            if is_dead_token(response.exception):
+                dead.append(token)
+            else:
+                print(f"Erro ao enviar notificação para {user_id}: {response.exception}")
+
+        # Cada remoção também leva os expirados; sem token morto, uma só limpa os expirados
+        if dead:
+            await asyncio.gather(*(self.users.prune_device_tokens(user_id, token) for token in dead))
+        elif expired:
+            await self.users.prune_device_tokens(user_id)
+        report["pruned"] = len(dead) + expired
+        return report
+
+
+# Instância do serviço
+notification_service = NotificationService(user_service, delivery_pipeline)
+
+
+async def send_exam_reminder(user_id: str, exam_name: str) -> Dict[str, Any]:
+    """Job do agendador: lembrete de exame em todos os aparelhos do usuário; retorna o relatório do envio."""
+    return await notification_service.send_to_user(
+        user_id, "Lembrete de Exame", f"Não esqueça do seu exame: {exam_name}! É daqui a 3 dias."
+    )
@@ -0,0 +1,270 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from borneo import DeleteRequest, GetRequest, PutOption, PutRequest, TableLimits, TableRequest
+
+from app import config
+from app.database import async_handle, cached_schema_version, statements, store_schema_version
+from app.utils.metricas import instrumentar
+
+# Estados de um lembrete: "pending" até um worker pegá-lo, "sending" enquanto ele envia.
+# Enviado, o lembrete é apagado; se o envio falha, volta a "pending"
+PENDING = "pending"
+SENDING = "sending"
+
+
+def new_reminder(reminder_id: str, user_id: str, exam_name: str, run_at: datetime) -> Dict[str, Any]:
+    """Documento de um lembrete; `due_day` (AAAA-MM-DD, o dia de run_at) é a partição no NoSQL."""
+    return {
+        "reminder_id": reminder_id,
+        "user_id": user_id,
+        "exam_name": exam_name,
+        "due_day": run_at.date().isoformat(),
+        "run_at": run_at.isoformat(),
+        "status": PENDING,
+    }
+
+
+def days_between(start: datetime, end: datetime) -> List[str]:
+    """Dias (AAAA-MM-DD) de `start` até `end`, inclusive."""
+    days, day = [], start.date()
+    while day <= end.date():
+        days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+class SQLiteReminderStore:
+    """
+    Lembretes num arquivo SQLite (ou ":memory:"), para desenvolvimento, testes e um único
+    servidor. O índice por (status, run_at) faz a carga do horizonte ler só os lembretes
+    pendentes dentro dele.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Uma conexão para o processo, usada por uma thread de cada vez
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+
+    def _execute(self, func):
+        # `func` devolve o resultado já lido (linhas, rowcount), nunca o cursor: um cursor
+        # liberado depois, em outra thread, atrapalharia a próxima chamada
+        with self._lock:
+            with self._conn:
+                return func(self._conn)
+
+    async def _run(self, func):
+        return await asyncio.to_thread(self._execute, func)
+
+    async def ensure_schema(self):
+        await self._run(lambda conn: conn.executescript("""
+            CREATE TABLE IF NOT EXISTS reminders (
+                reminder_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                exam_name TEXT NOT NULL,
+                due_day TEXT NOT NULL,
+                run_at TEXT NOT NULL,
+                status TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_reminders_pending ON reminders(status, run_at);
+        """).close())
+
+    async def save(self, reminder: Dict[str, Any]):
+        await self.save_many([reminder])
+
+    async def save_many(self, reminders: List[Dict[str, Any]]):
+        """Grava (ou substitui) os lembretes numa única transação."""
+        rows = [
+            (r["reminder_id"], r["user_id"], r["exam_name"], r["due_day"], r["run_at"], r["status"])
+            for r in reminders
+        ]
+        await self._run(lambda conn: conn.executemany(
+            "INSERT OR REPLACE INTO reminders VALUES (?, ?, ?, ?, ?, ?)", rows
+        ).close())
+
+    async def due_between(self, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """Lembretes pendentes com run_at entre `start` e `end`."""
+        rows = await self._run(lambda conn: conn.execute(
+            "SELECT * FROM reminders WHERE status = ? AND run_at >= ? AND run_at <= ?",
+            (PENDING, start.isoformat(), end.isoformat()),
+        ).fetchall())
+        return [dict(row) for row in rows]
+
+    async def claim(self, reminder: Dict[str, Any]) -> bool:
+        """Marca o lembrete como em envio; False se outro worker já o pegou (ou ele não existe)."""
+        updated = await self._run(lambda conn: conn.execute(
+            "UPDATE reminders SET status = ? WHERE reminder_id = ? AND status = ? AND run_at = ?",
+            (SENDING, reminder["reminder_id"], PENDING, reminder["run_at"]),
+        ).rowcount)
+        return updated == 1
+
+    async def complete(self, reminder: Dict[str, Any]):
+        """Apaga o lembrete enviado (se não foi reagendado enquanto isso)."""
+        await self._run(lambda conn: conn.execute(
+            "DELETE FROM reminders WHERE reminder_id = ? AND status = ? AND run_at = ?",
+            (reminder["reminder_id"], SENDING, reminder["run_at"]),
+        ).close())
+
+    async def release(self, reminder: Dict[str, Any]):
+        """Devolve a "pending" um lembrete cujo envio falhou, para a próxima carga tentar de novo."""
+        await self._run(lambda conn: conn.execute(
+            "UPDATE reminders SET status = ? WHERE reminder_id = ? AND status = ? AND run_at = ?",
+            (PENDING, reminder["reminder_id"], SENDING, reminder["run_at"]),
+        ).close())
+
+    def close(self):
+        self._conn.close()
+
+
+class NoSQLReminderStore:
+    """
+    Lembretes numa tabela do Oracle NoSQL, compartilhada por todos os workers e que
+    sobrevive a deploys. A chave é o reminder_id, como no SQLite: reagendar o mesmo exame
+    para outro dia substitui a linha em vez de deixar a antiga pendente. Carregar o horizonte
+    é uma consulta por igualdade em cada dia dele pelo índice de due_day, sem varrer a tabela.
+    """
+
+    def __init__(self, table_name: str = "RemindersV2"):
+        self.table_name = table_name
+
+    def _create_table_ddl(self) -> str:
+        return f"""
+            CREATE TABLE IF NOT EXISTS {self.table_name} (
+                reminder_id STRING,
+                due_day STRING,
+                user_id STRING,
+                exam_name STRING,
+                run_at STRING,
+                status STRING,
+                PRIMARY KEY(reminder_id)
+            )
+            """
+
+    def _index_ddls(self) -> List[str]:
+        return [f"CREATE INDEX IF NOT EXISTS idx_due_day ON {self.table_name}(due_day)"]
+
+    def schema_version(self) -> str:
+        """Muda sempre que alguma DDL da tabela muda"""
+        ddls = [self._create_table_ddl(), *self._index_ddls()]
+        return hashlib.sha1("\n".join(" ".join(ddl.split()) for ddl in ddls).encode()).hexdigest()[:16]
+
+    @instrumentar("ensure_reminder_schema")
+    async def ensure_schema(self, force: bool = False) -> bool:
+        """
+        Cria a tabela e o índice de due_day, com os limites REMINDER_TABLE_*. Como em
+        UserService.ensure_schema, uma versão já aplicada segundo o cache local não vai ao
+        banco, e a versão só é guardada quando todas as DDLs deram certo.
+        """
+        version = self.schema_version()
+        if not force and cached_schema_version(self.table_name) == version:
+            return False
+
+        complete = True
+        ddls = [(self._create_table_ddl(), TableLimits(
+            config.REMINDER_TABLE_READ_UNITS, config.REMINDER_TABLE_WRITE_UNITS, config.REMINDER_TABLE_STORAGE_GB
+        ))] + [(ddl, None) for ddl in self._index_ddls()]
+        for ddl, limits in ddls:
+            request = TableRequest().set_statement(ddl)
+            if limits is not None:
+                request.set_table_limits(limits)
+            try:
+                await async_handle.do_table_request(request, 60000, 1000)
+            except Exception as e:
+                print(f"Erro na DDL de {self.table_name}: {e}")
+                complete = False
+
+        if complete:
+            store_schema_version(self.table_name, version)
+        return complete
+
+    @instrumentar("save_reminder")
+    async def save(self, reminder: Dict[str, Any]):
+        await async_handle.put(PutRequest().set_table_name(self.table_name).set_value(reminder))
+
+    async def save_many(self, reminders: List[Dict[str, Any]]):
+        await asyncio.gather(*(self.save(reminder) for reminder in reminders))
+
+    @instrumentar("load_reminders")
+    async def due_between(self, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """Lembretes pendentes com run_at entre `start` e `end`: uma consulta por dia."""
+        lower, upper = start.isoformat(), end.isoformat()
+        statement = f"DECLARE $due_day STRING; SELECT * FROM {self.table_name} WHERE due_day = $due_day"
+        per_day = await asyncio.gather(*(
+            statements.query(statement, {"$due_day": day}) for day in days_between(start, end)
+        ))
+        return [
+            row for rows in per_day for row in rows
+            if row.get("status") == PENDING and lower <= row.get("run_at", "") <= upper
+        ]
+
+    @staticmethod
+    def _key(reminder: Dict[str, Any]) -> Dict[str, str]:
+        return {"reminder_id": reminder["reminder_id"]}
+
+    async def _read(self, reminder: Dict[str, Any], current: str):
+        """Linha atual do lembrete se ela ainda está em `current` com o mesmo run_at, senão None."""
+        result = await async_handle.get(GetRequest().set_table_name(self.table_name).set_key(self._key(reminder)))
+        row = result.get_value()
+        if row is None or row.get("status") != current or row.get("run_at") != reminder["run_at"]:
+            return None
+        return result
+
+    async def _transition(self, reminder: Dict[str, Any], current: str, new: str) -> bool:
+        """
+        Troca o status de `current` para `new` com um put condicionado à versão lida: entre
+        vários workers com o mesmo lembrete carregado, só um consegue.
+        """
+        result = await self._read(reminder, current)
+        if result is None:
+            return False
+        row = result.get_value()
+        request = (
+            PutRequest().set_table_name(self.table_name).set_value({**row, "status": new})
+            .set_option(PutOption.IF_VERSION).set_match_version(result.get_version())
+        )
+        return (await async_handle.put(request)).get_version() is not None
+
+    @instrumentar("claim_reminder")
+    async def claim(self, reminder: Dict[str, Any]) -> bool:
+        """Marca o lembrete como em envio; False se outro worker já o pegou (ou ele não existe)."""
+        return await self._transition(reminder, PENDING, SENDING)
+
+    @instrumentar("complete_reminder")
+    async def complete(self, reminder: Dict[str, Any]):
+        """
+        Apaga o lembrete enviado, condicionado à versão lida: se ele foi reagendado depois
+        do claim, a linha nova fica.
+        """
+        result = await self._read(reminder, SENDING)
+        if result is None:
+            return
+        await async_handle.delete(
+            DeleteRequest().set_table_name(self.table_name).set_key(self._key(reminder))
+            .set_match_version(result.get_version())
+        )
+
+    @instrumentar("release_reminder")
+    async def release(self, reminder: Dict[str, Any]):
+        """Devolve a "pending" um lembrete cujo envio falhou, para a próxima carga tentar de novo."""
+        await self._transition(reminder, SENDING, PENDING)
+
+    def close(self):
+        pass
+
+
+def open_reminder_store(backend: Optional[str] = None):
+    backend = (backend or config.REMINDER_STORE).lower()
+    if backend == "nosql":
+        return NoSQLReminderStore()
+    if backend == "sqlite":
+        return SQLiteReminderStore(config.REMINDER_SQLITE_PATH)
+    raise ValueError(f"REMINDER_STORE desconhecido: {backend!r} (use nosql ou sqlite)")
@@ -0,0 +1,67 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.rss_search import IndiceInvertido, tokenizar
+
+# Temas prioritários para quem usa o CheckMen e o peso de cada termo.
+# Os termos passam pela mesma tokenização da busca (sem acento e em minúsculas).
+LEXICO_PADRAO = {
+    # Próstata e urologia
+    "prostata": 3.0, "psa": 2.5, "urologista": 2.0, "urologia": 2.0, "toque": 1.0,
+    # Hormônios e saúde sexual
+    "testosterona": 3.0, "andropausa": 2.5, "hormonal": 1.2, "eretil": 2.0, "disfuncao": 1.5, "libido": 1.5,
+    # Coração e metabolismo
+    "cardiovascular": 2.5, "cardiaco": 2.0, "coracao": 2.0, "infarto": 2.5, "avc": 2.0,
+    "hipertensao": 2.0, "pressao": 1.2, "colesterol": 2.0, "diabetes": 1.5, "obesidade": 1.2,
+    # Saúde mental
+    "depressao": 2.0, "ansiedade": 2.0, "suicidio": 2.0, "mental": 1.5, "estresse": 1.2,
+    # Público masculino e prevenção
+    "homem": 2.0, "homens": 2.0, "masculino": 2.0, "masculina": 2.0,
+    "cancer": 1.5, "exame": 1.0, "exames": 1.0, "prevencao": 1.0, "tabagismo": 1.0,
+}
+
+
+def carregar_lexico(caminho: Optional[str] = None) -> Dict[str, float]:
+    """Léxico padrão ou o JSON {"termo": peso} apontado por caminho."""
+    if not caminho:
+        return dict(LEXICO_PADRAO)
+    with open(Path(caminho), encoding="utf-8") as arquivo:
+        return {termo: float(peso) for termo, peso in json.load(arquivo).items()}
+
+
+class RanqueadorRelevancia:
+    """
+    Pontua as notícias de um snapshot pelo léxico de temas, de uma vez só.
+
+    As frequências vêm do índice de busca já montado (matriz documentos x termos do
+    léxico), então a pontuação é um único produto matricial: log(1 + tf) · pesos.
+    """
+
+    def __init__(self, lexico: Dict[str, float]):
+        pesos: Dict[str, float] = {}
+        for termo, peso in lexico.items():
+            for token in tokenizar(termo):
+                pesos[token] = max(peso, pesos.get(token, 0.0))
+        self.termos: List[str] = list(pesos)
+        self.pesos = np.array([pesos[t] for t in self.termos], dtype=np.float32)
+
+    def pontuar(self, indice: IndiceInvertido) -> Dict[str, float]:
+        doc_ids, matriz = indice.matriz_frequencias(self.termos)
+        pontuacoes = np.log1p(matriz) @ self.pesos
+        return dict(zip(doc_ids, pontuacoes.astype(np.float64).round(4).tolist()))
+
+    def ordenar(self, itens: List[Dict[str, Any]], indice: IndiceInvertido) -> List[Dict[str, Any]]:
+        """
+        Cópias dos itens com a pontuação em "relevancia", do mais ao menos relevante.
+        Empates mantêm a ordem recebida. Os itens recebidos não mudam: são os mesmos do
+        snapshot em ordem aleatória e do índice de ingestão.
+        """
+        pontuacoes = self.pontuar(indice)
+        valores = np.fromiter((pontuacoes.get(item["id"], 0.0) for item in itens), dtype=np.float32, count=len(itens))
+        return [
+            {**itens[i], "relevancia": pontuacoes.get(itens[i]["id"], 0.0)}
+            for i in np.argsort(-valores, kind="stable")
+        ]
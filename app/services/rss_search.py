@@ -0,0 +1,200 @@
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.utils.texto import dobrar_acentos
+
+_RE_TOKEN = re.compile(r'[0-9a-z]+')
+
+# Palavras muito comuns em português que não ajudam a ranquear
+STOPWORDS = frozenset("""
+a ao aos as com como da das de do dos e em entre era essa esse esta este foi ha isso
+mais mas na nas no nos o os ou para pela pelas pelo pelos por que quando se sem ser
+seu sua sao tem um uma umas uns ja nao sobre apos ate pode tambem muito
+""".split())
+
+_POSTINGS_VAZIOS = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32), np.empty(0, dtype=np.float32))
+
+# Parâmetros clássicos do BM25
+K1 = 1.2
+B = 0.75
+# Termos do título contam como se aparecessem duas vezes
+PESO_TITULO = 2
+
+
+def tokenizar(texto: str) -> List[str]:
+    """Tokens sem acento e em minúsculas, sem stopwords: 'Próstata e PSA' -> ['prostata', 'psa']."""
+    return [t for t in _RE_TOKEN.findall(dobrar_acentos(texto)) if len(t) > 1 and t not in STOPWORDS]
+
+
+class IndiceInvertido:
+    """
+    Índice invertido das notícias do snapshot com ranking BM25.
+
+    É atualizado de forma incremental: a cada snapshot só entram as notícias novas ou
+    alteradas e só saem as que deixaram de existir. As listas de postings ficam em arrays
+    NumPy (posição do documento, frequência e tamanho); uma atualização só filtra as
+    posições que saíram e acrescenta as que entraram nos arrays dos termos afetados. Cada
+    documento mantém a sua posição enquanto estiver no índice, e as de documentos removidos
+    são reaproveitadas.
+
+    O peso BM25 de cada posting depende do tamanho médio dos documentos, que muda a cada
+    atualização: ele é calculado na primeira consulta com o termo e guardado até o termo ou
+    o tamanho médio mudar, então uma consulta é só uma soma vetorizada por termo.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.tamanhos: Dict[str, int] = {}
+        self.termos_por_doc: Dict[str, List[str]] = {}
+        self.itens: Dict[str, Dict[str, Any]] = {}
+        self.tamanho_total = 0
+        # Forma compilada: posição -> doc_id (None numa posição livre), doc_id -> posição
+        # e termo -> (posições, frequências, tamanhos dos documentos)
+        self._doc_ids: List[Optional[str]] = []
+        self._posicoes: Dict[str, int] = {}
+        self._livres: List[int] = []
+        self._compilado: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        # Mudanças ainda não compiladas: posições que saíram e posição -> (frequência, tamanho) que entraram
+        self._saidas: Dict[str, Set[int]] = {}
+        self._entradas: Dict[str, Dict[int, Tuple[int, int]]] = {}
+        # termo -> pesos BM25 (sem o idf), calculados com o tamanho médio de `_tamanho_medio`
+        self._pesos: Dict[str, np.ndarray] = {}
+        self._tamanho_medio = 0.0
+
+    def __len__(self):
+        return len(self.itens)
+
+    def adicionar(self, item: Dict[str, Any]):
+        doc_id = item["id"]
+        if doc_id in self.itens:
+            self.remover(doc_id)
+
+        termos = Counter(tokenizar(item["title"]) * PESO_TITULO)
+        termos.update(tokenizar(item["description"]))
+
+        if self._livres:
+            posicao = self._livres.pop()
+            self._doc_ids[posicao] = doc_id
+        else:
+            posicao = len(self._doc_ids)
+            self._doc_ids.append(doc_id)
+        self._posicoes[doc_id] = posicao
+
+        tamanho = sum(termos.values())
+        for termo, frequencia in termos.items():
+            self.postings.setdefault(termo, {})[doc_id] = frequencia
+            self._entradas.setdefault(termo, {})[posicao] = (frequencia, tamanho)
+        self.tamanhos[doc_id] = tamanho
+        self.termos_por_doc[doc_id] = list(termos)
+        self.tamanho_total += tamanho
+        self.itens[doc_id] = item
+
+    def remover(self, doc_id: str):
+        if self.itens.pop(doc_id, None) is None:
+            return
+        posicao = self._posicoes.pop(doc_id)
+        for termo in self.termos_por_doc.pop(doc_id):
+            documentos = self.postings.get(termo)
+            if documentos is not None:
+                documentos.pop(doc_id, None)
+                if not documentos:
+                    del self.postings[termo]
+            # Se ainda não foi compilado, basta desfazer a entrada
+            entradas = self._entradas.get(termo)
+            if entradas is not None and posicao in entradas:
+                del entradas[posicao]
+            else:
+                self._saidas.setdefault(termo, set()).add(posicao)
+        self.tamanho_total -= self.tamanhos.pop(doc_id)
+        self._doc_ids[posicao] = None
+        self._livres.append(posicao)
+
+    def sincronizar(self, itens: Iterable[Dict[str, Any]]):
+        """Deixa o índice igual à lista de itens mexendo apenas no que mudou."""
+        atuais = {item["id"]: item for item in itens}
+        for doc_id in [d for d in self.itens if d not in atuais]:
+            self.remover(doc_id)
+        for doc_id, item in atuais.items():
+            # A ingestão reaproveita o mesmo objeto quando a notícia não muda
+            if self.itens.get(doc_id) is not item:
+                self.adicionar(item)
+        self._compilar()
+
+    def _compilar(self):
+        """Aplica aos arrays de postings as saídas e entradas pendentes de cada termo."""
+        for termo in self._saidas.keys() | self._entradas.keys():
+            indices, frequencias, tamanhos = self._compilado.get(termo, _POSTINGS_VAZIOS)
+            saidas = self._saidas.get(termo)
+            if saidas:
+                manter = ~np.isin(indices, np.fromiter(saidas, dtype=np.int32, count=len(saidas)))
+                indices, frequencias, tamanhos = indices[manter], frequencias[manter], tamanhos[manter]
+            entradas = self._entradas.get(termo)
+            if entradas:
+                n = len(entradas)
+                indices = np.concatenate((indices, np.fromiter(entradas, dtype=np.int32, count=n)))
+                frequencias = np.concatenate((frequencias, np.fromiter((f for f, _ in entradas.values()), dtype=np.float32, count=n)))
+                tamanhos = np.concatenate((tamanhos, np.fromiter((t for _, t in entradas.values()), dtype=np.float32, count=n)))
+            self._pesos.pop(termo, None)
+            if len(indices):
+                self._compilado[termo] = (indices, frequencias, tamanhos)
+            else:
+                self._compilado.pop(termo, None)
+        self._saidas, self._entradas = {}, {}
+
+    def _pesos_bm25(self, termo: str, postings: Tuple[np.ndarray, np.ndarray, np.ndarray]) -> np.ndarray:
+        """Peso BM25 (sem o idf) de cada posting do termo, guardado para as próximas consultas."""
+        tamanho_medio = self.tamanho_total / len(self.itens)
+        if tamanho_medio != self._tamanho_medio:
+            self._pesos, self._tamanho_medio = {}, tamanho_medio
+        pesos = self._pesos.get(termo)
+        if pesos is None:
+            _, frequencias, tamanhos = postings
+            normalizacao = K1 * (1 - B + B * tamanhos / tamanho_medio)
+            pesos = self._pesos[termo] = frequencias * (K1 + 1) / (frequencias + normalizacao)
+        return pesos
+
+    def buscar(self, consulta: str, limite: int = 10) -> List[Dict[str, Any]]:
+        termos = set(tokenizar(consulta))
+        if not termos or not self.itens:
+            return []
+        if self._saidas or self._entradas:
+            self._compilar()
+
+        total_docs = len(self.itens)
+        pontuacoes = None
+        for termo in termos:
+            postings = self._compilado.get(termo)
+            if postings is None:
+                continue
+            indices = postings[0]
+            idf = math.log(1 + (total_docs - len(indices) + 0.5) / (len(indices) + 0.5))
+            if pontuacoes is None:
+                pontuacoes = np.zeros(len(self._doc_ids), dtype=np.float32)
+            pontuacoes[indices] += idf * self._pesos_bm25(termo, postings)
+
+        if pontuacoes is None:
+            return []
+
+        encontrados = np.flatnonzero(pontuacoes)
+        if len(encontrados) > limite:
+            encontrados = encontrados[np.argpartition(pontuacoes[encontrados], -limite)[-limite:]]
+        melhores = encontrados[np.argsort(-pontuacoes[encontrados], kind="stable")]
+        return [self.itens[self._doc_ids[i]] for i in melhores]
+
+    def matriz_frequencias(self, termos: List[str]) -> Tuple[List[str], np.ndarray]:
+        """Matriz documentos x termos com a frequência de cada termo, na ordem dos doc_ids devolvidos."""
+        if self._saidas or self._entradas:
+            self._compilar()
+        matriz = np.zeros((len(self._doc_ids), len(termos)), dtype=np.float32)
+        for j, termo in enumerate(termos):
+            postings = self._compilado.get(termo)
+            if postings is not None:
+                matriz[postings[0], j] = postings[1]
+        if not self._livres:
+            return list(self._doc_ids), matriz
+        ocupadas = [i for i, doc_id in enumerate(self._doc_ids) if doc_id is not None]
+        return [self._doc_ids[i] for i in ocupadas], matriz[ocupadas]
@@ -1,7 +1,20 @@
 import feedparser
-import requests
+import asyncio
+import base64
+import binascii
+import hashlib
 import random
+import time
 import re
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from app import config
+from app.utils.http_cache import RespostaPronta
+from app.utils.texto import chave_texto
+from app.services.feed_fetcher import FeedFetcher
+from app.services.image_service import image_proxy
+from app.services.rss_search import IndiceInvertido
+from app.services.rss_ranking import RanqueadorRelevancia, carregar_lexico
 
 # Lista de Feeds de Saúde (Fontes mais estáveis e variadas)
 URLS = [
@@ -11,91 +24,375 @@ URLS = [
     "https://vidasaudavel.einstein.br/feed/",          # Hospital Einstein (Qualidade de Vida)
 ]
 
-def buscar_rss():
-    resultados = []
-    
-    # User-Agent de navegador para evitar bloqueios
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'application/rss+xml, application/xml, text/xml'
+# User-Agent de navegador para evitar bloqueios
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/rss+xml, application/xml, text/xml'
+}
+
+# Cliente dos feeds: downloads em paralelo, GET condicional e circuit breaker por feed
+_fetcher = FeedFetcher(
+    URLS,
+    headers=HEADERS,
+    timeout_feed=config.RSS_FEED_TIMEOUT_SECONDS,
+    prazo_total=config.RSS_REFRESH_DEADLINE_SECONDS,
+    limite_falhas=config.RSS_BREAKER_FAILURES,
+    cooldown=config.RSS_BREAKER_COOLDOWN_SECONDS,
+)
+
+# Últimos itens normalizados de cada feed (reaproveitados em 304 ou erro)
+_itens_por_feed = {}
+# Índice de ingestão por feed: chave (GUID ou link normalizado) -> (hash do conteúdo, item)
+_indice_por_feed = {}
+
+# Snapshots recentes por versão ({ordem: itens}), para que cursores antigos continuem funcionando
+_snapshots = OrderedDict()
+# Páginas já serializadas/comprimidas por (versão, ordem, início, limite, expirado)
+_paginas = OrderedDict()
+MAX_PAGINAS_EM_CACHE = 512
+# Índice de busca textual sobre o snapshot atual
+_indice_busca = IndiceInvertido()
+# Ranking por temas de saúde do homem, pré-calculado a cada snapshot
+_ranqueador = RanqueadorRelevancia(carregar_lexico(config.RSS_TOPIC_LEXICON_FILE))
+
+# Ordens disponíveis para as páginas de /rss
+ORDEM_ALEATORIA = "random"
+ORDEM_RELEVANCIA = "relevance"
+ORDENS = (ORDEM_ALEATORIA, ORDEM_RELEVANCIA)
+
+# Snapshot em memória servido pelo endpoint /rss (vazio, em todas as ordens, até a primeira carga)
+_snapshot = {"versao": None, "itens": [], "ordens": {ordem: [] for ordem in ORDENS}, "atualizado_em": None}
+_lock_atualizacao = asyncio.Lock()
+_tarefa_atualizacao = None
+
+
+# Padrões pré-compilados usados na normalização das entradas
+_RE_TAGS_HTML = re.compile(r'<[^<]+?>')
+_RE_IMAGEM_HTML = re.compile(r'src="([^"]+jpg|[^"]+png|[^"]+jpeg)"')
+
+
+def _normalizar_link(link):
+    """Link canônico para deduplicação: sem www, fragmento, parâmetros utm_ ou barra final."""
+    partes = urlsplit(link.strip())
+    host = partes.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = urlencode([(k, v) for k, v in parse_qsl(partes.query) if not k.lower().startswith('utm_')])
+    return urlunsplit(('', host, partes.path.rstrip('/'), query, ''))
+
+
+# Leitura direta do dict: o .get do FeedParserDict resolve apelidos de chave e custa ~8x mais
+_campo = dict.get
+
+
+def _chave_entrada(entry):
+    """Chave estável da entrada no índice: GUID quando o feed fornece, senão o link normalizado."""
+    guid = _campo(entry, 'id')
+    if guid:
+        return guid
+    return _normalizar_link(_campo(entry, 'link', ''))
+
+
+def _hash_entrada(entry):
+    """Hash dos campos crus que influenciam o item normalizado."""
+    media = _campo(entry, 'media_content') or []
+    thumb = _campo(entry, 'media_thumbnail') or []
+    enclosures = [_campo(l, 'href', '') for l in _campo(entry, 'links', ()) if _campo(l, 'rel') == 'enclosure']
+    bruto = "\x1f".join([
+        _campo(entry, 'title', ''),
+        _campo(entry, 'link', ''),
+        _campo(entry, 'summary', ''),
+        _campo(media[-1], 'url', '') if media else '',
+        _campo(thumb[0], 'url', '') if thumb else '',
+        *enclosures,
+    ])
+    return hashlib.sha1(bruto.encode()).hexdigest()
+
+
+def _normalizar_entrada(entry, chave):
+    """Converte uma entrada do feedparser no formato que o app espera (ou None)."""
+    # Título
+    title = _campo(entry, 'title', '')
+    if not title:
+        return None
+
+    # Link
+    link = _campo(entry, 'link', '')
+
+    # Descrição (Limpeza de HTML mais robusta)
+    raw_description = _campo(entry, 'summary', '') or _campo(entry, 'description', '') or ''
+
+    # Remove tags HTML (<p>, <a>, <img>, etc) da descrição para ficar texto puro
+    clean_description = _RE_TAGS_HTML.sub('', raw_description).strip()
+
+    # Busca de Imagem (Várias tentativas para garantir)
+    image_url = ''
+
+    # Tenta 'media_content' (Padrão G1)
+    media = _campo(entry, 'media_content')
+    if isinstance(media, list) and len(media) > 0:
+        image_url = _campo(media[-1], 'url', '') # Pega a maior imagem
+
+    # Tenta 'media_thumbnail' (Youtube/Blogs)
+    thumb = _campo(entry, 'media_thumbnail')
+    if not image_url and isinstance(thumb, list) and len(thumb) > 0:
+        image_url = _campo(thumb[0], 'url', '')
+
+    # Tenta extrair do HTML da descrição (comum em Wordpress como Drauzio/Einstein)
+    if not image_url and 'src=' in raw_description:
+        match = _RE_IMAGEM_HTML.search(raw_description)
+        if match:
+            image_url = match.group(1)
+
+    # Se ainda não tem imagem, tenta links de enclosure
+    if not image_url:
+        for l in _campo(entry, 'links', ()):
+            if _campo(l, 'rel') == 'enclosure' and 'image' in _campo(l, 'type', ''):
+                image_url = _campo(l, 'href', '')
+                break
+
+    # Retorna apenas se tiver o básico
+    if not (title and link):
+        return None
+
+    return {
+        "id": hashlib.sha1(chave.encode()).hexdigest()[:16],
+        "title": title,
+        "description": clean_description[:140] + "..." if len(clean_description) > 140 else clean_description,
+        "link": link,
+        # O app baixa a miniatura pelo proxy; a original fica disponível como fallback
+        "imageUrl": image_proxy.url_proxy(image_url),
+        "imageOriginalUrl": image_url
     }
 
-    for url in URLS:
+
+def _ingerir_entradas(url, entries):
+    """
+    Normaliza apenas as entradas novas ou alteradas do feed. Entradas com o mesmo hash
+    da última ingestão reaproveitam o item já normalizado.
+    """
+    indice_anterior = _indice_por_feed.get(url, {})
+    indice = {}
+
+    itens = []
+    for entry in entries:
         try:
-            # 1. Baixa o conteúdo
-            response = requests.get(url, headers=headers, timeout=8)
-            
-            if response.status_code != 200:
-                print(f"⚠️ Link indisponível: {url} (Status {response.status_code})")
+            chave = _chave_entrada(entry)
+            if chave in indice:
                 continue
 
-            # 2. Processa o XML com feedparser
-            feed = feedparser.parse(response.content)
+            hash_entrada = _hash_entrada(entry)
+            anterior = indice_anterior.get(chave)
+            if anterior and anterior[0] == hash_entrada:
+                item = anterior[1]
+            else:
+                item = _normalizar_entrada(entry, chave)
 
-            if not feed.entries:
-                continue
+            if item:
+                indice[chave] = (hash_entrada, item)
+                itens.append(item)
+        except Exception:
+            continue
 
-            for entry in feed.entries:
-                try:
-                    # Título
-                    title = entry.get('title', '')
-                    if not title: continue
-
-                    # Link
-                    link = entry.get('link', '')
-
-                    # Descrição (Limpeza de HTML mais robusta)
-                    raw_description = entry.get('summary', '') or entry.get('description', '') or ''
-                    
-                    # Remove tags HTML (<p>, <a>, <img>, etc) da descrição para ficar texto puro
-                    clean_description = re.sub('<[^<]+?>', '', raw_description).strip()
-
-                    # Busca de Imagem (Várias tentativas para garantir)
-                    image_url = ''
-                    
-                    # Tenta 'media_content' (Padrão G1)
-                    if 'media_content' in entry:
-                        media = entry.media_content
-                        if isinstance(media, list) and len(media) > 0:
-                            image_url = media[-1].get('url', '') # Pega a maior imagem
-                    
-                    # Tenta 'media_thumbnail' (Youtube/Blogs)
-                    if not image_url and 'media_thumbnail' in entry:
-                         thumb = entry.media_thumbnail
-                         if isinstance(thumb, list) and len(thumb) > 0:
-                             image_url = thumb[0].get('url', '')
-
-                    # Tenta extrair do HTML da descrição (comum em Wordpress como Drauzio/Einstein)
-                    if not image_url and 'src=' in raw_description:
-                        match = re.search(r'src="([^"]+jpg|[^"]+png|[^"]+jpeg)"', raw_description)
-                        if match:
-                            image_url = match.group(1)
-
-                    # Se ainda não tem imagem, tenta links de enclosure
-                    if not image_url and 'links' in entry:
-                        for l in entry.links:
-                            if l.get('rel') == 'enclosure' and 'image' in l.get('type', ''):
-                                image_url = l.get('href', '')
-                                break
-
-                    # Adiciona à lista apenas se tiver o básico
-                    if title and link:
-                        resultados.append({
-                            "title": title,
-                            "description": clean_description[:140] + "..." if len(clean_description) > 140 else clean_description,
-                            "link": link,
-                            "imageUrl": image_url
-                        })
-
-                except Exception:
-                    continue
+    _indice_por_feed[url] = indice
+    return itens
 
-        except Exception as e:
-            print(f"❌ Erro no feed {url}: {e}")
+
+def _processar_feed(url, conteudo):
+    """Processa o XML com feedparser e ingere as entradas (roda fora do event loop)."""
+    feed = feedparser.parse(conteudo)
+    return _ingerir_entradas(url, feed.entries)
+
+
+def _deduplicar(itens):
+    """Colapsa a mesma notícia publicada em mais de um feed (mesmo link ou mesmo título)."""
+    vistos = set()
+    unicos = []
+    for item in itens:
+        chaves = (_normalizar_link(item["link"]), chave_texto(item["title"]))
+        if any(chave in vistos for chave in chaves):
             continue
+        vistos.update(chaves)
+        unicos.append(item)
+    return unicos
+
 
-    # Embaralha para variar as notícias na tela inicial
-    if resultados:
-        random.shuffle(resultados)
-    
-    return resultados
\ No newline at end of file
+def _versao_do_conteudo(itens):
+    """
+    Versão do snapshot: hash do id e dos campos exibidos de cada notícia. As páginas em
+    cache (e o ETag delas) são chaveadas pela versão, então uma notícia editada no feed,
+    com o mesmo id, precisa gerar outra versão; sem mudança, a versão (e a ordem) se mantém.
+    """
+    assinaturas = sorted(
+        f"{item['id']}\x1f{item['title']}\x1f{item['description']}\x1f{item['imageUrl']}" for item in itens
+    )
+    return hashlib.sha1("\n".join(assinaturas).encode()).hexdigest()[:12]
+
+
+async def atualizar_snapshot():
+    """
+    Busca todos os feeds em paralelo e troca o snapshot em memória.
+    Feeds sem novidade (304), com erro ou fora do prazo mantêm seus últimos itens; se nenhuma
+    notícia vier, o snapshot anterior continua sendo servido.
+    """
+    async with _lock_atualizacao:
+        novos = await _fetcher.buscar_todos(_processar_feed)
+        _itens_por_feed.update(novos)
+
+        resultados = []
+        for url in _fetcher.urls:
+            resultados.extend(_itens_por_feed.get(url, []))
+        resultados = _deduplicar(resultados)
+
+        if not resultados:
+            print("⚠️ Nenhuma notícia obtida, mantendo o snapshot anterior")
+            return False
+
+        versao = _versao_do_conteudo(resultados)
+
+        # Embaralha para variar as notícias na tela inicial, com semente fixa por versão
+        # para que todas as páginas de um mesmo snapshot venham da mesma ordem. Parte da
+        # ordem por id: a ordem dos feeds muda sem mudar a versão (um feed que responde
+        # 304, outro que chega primeiro) e a mesma versão daria outro embaralhamento
+        resultados.sort(key=lambda item: item["id"])
+        random.Random(versao).shuffle(resultados)
+
+        # Índice de busca e ranking de relevância: calculados uma vez por snapshot
+        _indice_busca.sincronizar(resultados)
+        ordens = {
+            ORDEM_ALEATORIA: resultados,
+            ORDEM_RELEVANCIA: _ranqueador.ordenar(resultados, _indice_busca),
+        }
+
+        _snapshot["versao"] = versao
+        _snapshot["itens"] = resultados
+        _snapshot["ordens"] = ordens
+        _snapshot["atualizado_em"] = time.monotonic()
+
+        _snapshots[versao] = ordens
+        _snapshots.move_to_end(versao)
+        while len(_snapshots) > config.RSS_SNAPSHOTS_RETAINED:
+            _snapshots.popitem(last=False)
+
+        # Gera as miniaturas novas em segundo plano, antes de o app pedir
+        image_proxy.pre_carregar(
+            image_proxy.registrar(item["imageOriginalUrl"]) for item in resultados if item["imageOriginalUrl"]
+        )
+        return True
+
+
+def idade_snapshot():
+    """Segundos desde a última atualização bem-sucedida (None se ainda não houve)."""
+    if _snapshot["atualizado_em"] is None:
+        return None
+    return time.monotonic() - _snapshot["atualizado_em"]
+
+
+async def buscar_rss():
+    """Retorna as notícias do snapshot, carregando-o na primeira chamada."""
+    if _snapshot["atualizado_em"] is None:
+        await atualizar_snapshot()
+    return _snapshot["itens"]
+
+
+def codificar_cursor(versao, offset, ordem=ORDEM_ALEATORIA):
+    """Cursor opaco para o app: versão do snapshot + posição da próxima notícia + ordem."""
+    return base64.urlsafe_b64encode(f"{versao}:{offset}:{ordem}".encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    """Retorna (versao, offset, ordem) ou levanta ValueError se o cursor for inválido."""
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        versao, offset, *resto = bruto.split(":")
+        offset = int(offset)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Cursor inválido")
+    # Cursores emitidos antes da ordenação por relevância não têm a ordem
+    ordem = resto[0] if resto else ORDEM_ALEATORIA
+    if offset < 0 or len(resto) > 1 or ordem not in ORDENS:
+        raise ValueError("Cursor inválido")
+    return versao, offset, ordem
+
+
+async def obter_pagina(page=1, limit=3, cursor=None, ordem=ORDEM_ALEATORIA):
+    """
+    Página do snapshot já serializada e comprimida (RespostaPronta, com idadeSnapshot
+    acrescentado a cada resposta). Com cursor, continua do ponto indicado no mesmo snapshot
+    e na mesma ordem; se ele já saiu da memória, recomeça do início do snapshot atual e
+    avisa com snapshotExpirado. Páginas repetidas saem do cache sem serializar nada.
+    """
+    if ordem not in ORDENS:
+        raise ValueError("Ordenação inválida")
+    await buscar_rss()
+
+    versao = _snapshot["versao"]
+    inicio = (page - 1) * limit
+    expirado = False
+
+    if cursor:
+        versao_cursor, offset, ordem = decodificar_cursor(cursor)
+        if versao_cursor in _snapshots:
+            versao, inicio = versao_cursor, offset
+        else:
+            expirado = True
+            inicio = 0
+
+    itens = _snapshots[versao][ordem] if versao in _snapshots else _snapshot["ordens"][ordem]
+    chave = (versao, ordem, inicio, limit, expirado)
+    pronta = _paginas.get(chave)
+    if pronta is not None:
+        _paginas.move_to_end(chave)
+        return pronta
+
+    fim = inicio + limit
+    pronta = RespostaPronta({
+        "noticias": itens[inicio:fim],
+        "totalNoticias": len(itens),
+        "paginaAtual": inicio // limit + 1,
+        "noticiasPorPagina": limit,
+        "versaoSnapshot": versao,
+        "ordem": ordem,
+        "proximoCursor": codificar_cursor(versao, fim, ordem) if fim < len(itens) else None,
+        "snapshotExpirado": expirado
+    }, campo_variavel="idadeSnapshot")
+    _paginas[chave] = pronta
+    while len(_paginas) > MAX_PAGINAS_EM_CACHE:
+        _paginas.popitem(last=False)
+    return pronta
+
+
+async def buscar_noticias(consulta, limite=10):
+    """Busca textual (BM25) nas notícias do snapshot atual."""
+    await buscar_rss()
+    return _indice_busca.buscar(consulta, limite)
+
+
+async def _loop_atualizacao(intervalo):
+    while True:
+        try:
+            await atualizar_snapshot()
+        except Exception as e:
+            print(f"❌ Erro ao atualizar notícias: {e}")
+        await asyncio.sleep(intervalo)
+
+
+def iniciar_atualizacao_periodica(intervalo=None):
+    """Agenda a atualização do snapshot no event loop atual (chamado no lifespan)."""
+    global _tarefa_atualizacao
+    if _tarefa_atualizacao is None or _tarefa_atualizacao.done():
+        intervalo = intervalo or config.RSS_REFRESH_INTERVAL_SECONDS
+        _tarefa_atualizacao = asyncio.create_task(_loop_atualizacao(intervalo))
+    return _tarefa_atualizacao
+
+
+async def parar_atualizacao_periodica():
+    global _tarefa_atualizacao
+    if _tarefa_atualizacao is not None:
+        _tarefa_atualizacao.cancel()
+        try:
+            await _tarefa_atualizacao
+        except asyncio.CancelledError:
+            pass
+        _tarefa_atualizacao = None
+    await _fetcher.fechar()
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import uuid
+from datetime import date, datetime
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple
+
+from borneo import PutOption, PutRequest
+from pydantic import ValidationError
+
+from app import config
+from app.database import async_handle, statements
+from app.schemas.user_schema import UserImport
+from app.services.user_service import SENSITIVE_FIELDS, UserService, user_service
+from app.utils.auth import password_hasher, pwd_context
+from app.utils.metricas import instrumentar, operacao
+from app.utils.texto import normalizar_nome
+
+# Linhas maiores que isso são rejeitadas (evita acumular um "registro" sem fim em memória)
+MAX_LINE_BYTES = 1024 * 1024
+# Quantos erros por linha voltam no relatório (os demais só entram na contagem)
+MAX_REPORTED_ERRORS = 100
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Quebra um stream de bytes em linhas sem juntar o corpo inteiro em memória"""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+        if len(pending) > MAX_LINE_BYTES:
+            raise ValueError(f"Linha maior que {MAX_LINE_BYTES} bytes")
+    if pending:
+        yield pending
+
+
+def _json_default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+class UserBulkService:
+    """
+    Importação e exportação de usuários em NDJSON (um JSON por linha), em fluxo contínuo.
+
+    A importação processa o arquivo em lotes de USER_IMPORT_BATCH_SIZE linhas com até
+    USER_IMPORT_CONCURRENCY escritas simultâneas; a exportação pagina a tabela com a
+    continuation key da consulta. Nenhum dos dois guarda o arquivo inteiro em memória.
+    """
+
+    def __init__(self, users: UserService):
+        self.users = users
+
+    @instrumentar("import_users")
+    async def import_ndjson(self, chunks: AsyncIterable[bytes], check_existing: bool = True) -> Dict[str, Any]:
+        """
+        Importa usuários de um stream NDJSON. Cada linha segue UserImport; senhas podem vir
+        em texto (password, o hash é feito aqui) ou já com hash sha256_crypt (password_hash).
+
+        Linhas cujo user_id já existe são puladas; com check_existing, também as com email
+        já cadastrado. Retorna as contagens e os primeiros erros por número de linha, mesmo
+        quando o banco falha em algumas linhas ou o arquivo termina numa linha grande demais.
+        """
+        report = {"imported": 0, "skipped": 0, "failed": 0, "errors": []}
+        batch: List[Tuple[int, bytes]] = []
+        line_number = 0
+        try:
+            async for line in iter_lines(chunks):
+                line_number += 1
+                if not line.strip():
+                    continue
+                batch.append((line_number, line))
+                if len(batch) >= config.USER_IMPORT_BATCH_SIZE:
+                    await self._import_batch(batch, check_existing, report)
+                    batch = []
+        except ValueError as e:
+            # Linha sem fim dentro de MAX_LINE_BYTES: o resto do arquivo não dá para separar
+            self._fail(report, line_number + 1, f"{e}; importação interrompida")
+        if batch:
+            await self._import_batch(batch, check_existing, report)
+        report["errors"].sort(key=lambda error: error["line"])
+        return report
+
+    @staticmethod
+    def _fail(report: Dict[str, Any], line_number: int, error: str):
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"line": line_number, "error": error})
+
+    async def _import_batch(self, batch: List[Tuple[int, bytes]], check_existing: bool, report: Dict[str, Any]):
+        semaphore = asyncio.Semaphore(config.USER_IMPORT_CONCURRENCY)
+        emails_in_batch = set()
+
+        async def import_line(line_number: int, line: bytes):
+            async with semaphore:
+                try:
+                    row = UserImport.model_validate_json(line)
+                    if row.email in emails_in_batch:
+                        raise ValueError("Email repetido no arquivo")
+                    emails_in_batch.add(row.email)
+                    outcome = await self._import_row(row, check_existing)
+                except (ValidationError, ValueError) as e:
+                    self._fail(report, line_number, str(e))
+                    return
+                except Exception as e:
+                    # Falha do banco (timeout, sobrecarga, erro do borneo) nesta linha: as outras
+                    # do lote seguem, e quem importa pode reenviar só as que falharam
+                    self._fail(report, line_number, f"Erro no banco: {getattr(e, 'detail', None) or e!r}")
+                    return
+                report[outcome] += 1
+
+        await asyncio.gather(*(import_line(n, line) for n, line in batch))
+
+    async def _import_row(self, row: UserImport, check_existing: bool) -> str:
+        if row.password_hash:
+            # Hash vindo de outro sistema: só aceita esquemas que o login sabe verificar
+            if pwd_context.identify(row.password_hash, required=False) is None:
+                raise ValueError("password_hash em formato não suportado")
+        elif not row.password:
+            raise ValueError("Informe password ou password_hash")
+
+        if check_existing and await self.users._get_user_by_email(row.email):
+            return "skipped"
+
+        # Só depois da checagem: numa reimportação quase tudo é pulado, e o hash é o custo maior
+        password_hash = row.password_hash or await password_hasher.hash(row.password)
+
+        now = datetime.utcnow().isoformat()
+        user_doc = {
+            "user_id": row.user_id or str(uuid.uuid4()),
+            "name": row.name,
+            "name_normalized": normalizar_nome(row.name),
+            "email": row.email,
+            "password_hash": password_hash,
+            "security_word": row.security_word.lower(),
+            "device_tokens": row.device_tokens,
+            "is_active": row.is_active,
+            "created_at": row.created_at.isoformat() if row.created_at else now,
+            "updated_at": now,
+        }
+        put_request = (
+            PutRequest().set_table_name(self.users.table_name).set_value(user_doc)
+            .set_option(PutOption.IF_ABSENT)
+        )
+        result = await async_handle.put(put_request)
+        return "imported" if result.get_version() is not None else "skipped"
+
+    async def export_ndjson(self, include_sensitive: bool = False, page_size: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        Todos os usuários como NDJSON, uma página por vez. Sem include_sensitive saem sem
+        password_hash, security_word e device_tokens (exportação para análise).
+        """
+        with operacao("export_users"):
+            request = (await statements.bind(f"SELECT * FROM {self.users.table_name}")).set_limit(
+                page_size or config.USER_EXPORT_PAGE_SIZE
+            )
+        try:
+            while True:
+                # O rótulo não atravessa o yield: quem consome o gerador pode estar em outro contexto
+                with operacao("export_users"):
+                    rows = (await async_handle.query(request)).get_results()
+                if rows:
+                    if not include_sensitive:
+                        rows = [{k: v for k, v in row.items() if k not in SENSITIVE_FIELDS} for row in rows]
+                    yield "".join(
+                        json.dumps(row, ensure_ascii=False, default=_json_default) + "\n" for row in rows
+                    ).encode()
+                if request.is_done():
+                    break
+        finally:
+            request.close()
+
+
+# Instância do serviço
+user_bulk_service = UserBulkService(user_service)
@@ -1,28 +1,70 @@
 # gui2761/mvp-saude-homem-backend/app/services/user_service.py
 
-from borneo import PutRequest, GetRequest, QueryRequest, TableRequest, TableLimits
-from app.database import db
-from app.utils.auth import AuthUtils
+from borneo import PutRequest, GetRequest, QueryRequest, PutOption, TableRequest, TableLimits
+from app.database import async_handle, statements, cached_schema_version, store_schema_version
+from app.utils.auth import AuthUtils, password_hasher, refresh_issued_at, rotate_refresh_token
 from app.schemas.user_schema import UserCreate, UserLogin, PasswordReset
+from app.utils.texto import normalizar_nome
+from app.utils.cache import CacheLRUTTL
+from app.utils.metricas import instrumentar
+from app import config
 from fastapi import HTTPException, status
-from datetime import datetime
-from typing import Optional, Dict, Any, List
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Callable, Tuple
+import asyncio
+import hashlib
+import random
+import time
 import uuid
 
+# Campos que só saem de get_user_by_id com include_sensitive=True: segredos e colunas
+# internas (name_normalized só existe para o índice de busca por nome)
+SENSITIVE_FIELDS = ("password_hash", "security_word", "device_tokens", "tokens_revoked_before", "name_normalized")
+
+# Tipos usados no DECLARE das variáveis de update_fields
+_DECLARED_TYPES = {bool: "BOOLEAN", int: "LONG", float: "DOUBLE", str: "STRING"}
+
+
+def device_token_cutoff(now: Optional[datetime] = None) -> datetime:
+    """last_used mínimo (UTC) de um token de dispositivo ainda válido."""
+    return (now or datetime.utcnow()) - timedelta(days=config.DEVICE_TOKEN_TTL_DAYS)
+
+
+def last_used(token: Dict[str, Any]) -> datetime:
+    """
+    last_used do token como datetime UTC sem fuso: o borneo devolve TIMESTAMP como
+    datetime, mas documentos em cache ou gravados antes podem trazer o texto ISO.
+    """
+    value = token.get("last_used")
+    if not value:
+        return datetime.min
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def split_device_tokens(tokens: Optional[List[Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], int]:
+    """(tokens vivos do mais recente ao mais antigo, até o teto; quantos estão expirados)."""
+    cutoff = device_token_cutoff()
+    live = [t for t in tokens or [] if last_used(t) >= cutoff]
+    return live[::-1][:config.DEVICE_TOKENS_PER_USER], len(tokens or []) - len(live)
+
 
 class UserService:
     def __init__(self):
         # 🟢 MUDANÇA 1: Nome da tabela alterado para evitar conflito com a antiga e sem traços
         self.table_name = "UsersV2"
-        self._create_table_if_not_exists()
+        # Documentos completos por user_id; toda escrita deste serviço atualiza a entrada
+        self.cache = CacheLRUTTL(config.USER_CACHE_MAX_ENTRIES, config.USER_CACHE_TTL_SECONDS)
 
-    def _create_table_if_not_exists(self):
-        """Cria tabela Users se não existir"""
-        try:
-            create_table_ddl = f"""
+    def _create_table_ddl(self) -> str:
+        return f"""
             CREATE TABLE IF NOT EXISTS {self.table_name} (
                 user_id STRING,
                 name STRING,
+                name_normalized STRING,
                 email STRING,
                 password_hash STRING,
                 security_word STRING,
@@ -30,49 +72,234 @@ class UserService:
                 created_at TIMESTAMP(3),
                 updated_at TIMESTAMP(3),
                 is_active BOOLEAN,
+                tokens_revoked_before LONG,
                 PRIMARY KEY(user_id)
             )
             """
-            request = TableRequest().set_statement(create_table_ddl)
-            
+
+    def _index_ddls(self) -> List[str]:
+        """Índices secundários: login e checagem de email viram leituras indexadas em vez de full scan"""
+        return [
+            # Tabelas criadas antes do índice de nome não têm a coluna (ver backfill_indexes)
+            f"ALTER TABLE {self.table_name} (ADD name_normalized STRING)",
+            # Refresh tokens emitidos antes deste instante (epoch em segundos) não valem mais
+            f"ALTER TABLE {self.table_name} (ADD tokens_revoked_before LONG)",
+            f"CREATE INDEX IF NOT EXISTS idx_email ON {self.table_name}(email)",
+            f"CREATE INDEX IF NOT EXISTS idx_name_normalized ON {self.table_name}(name_normalized)",
+        ]
+
+    def schema_version(self) -> str:
+        """Muda sempre que alguma DDL da tabela muda"""
+        ddls = [self._create_table_ddl(), *self._index_ddls()]
+        return hashlib.sha1("\n".join(" ".join(ddl.split()) for ddl in ddls).encode()).hexdigest()[:16]
+
+    @instrumentar("ensure_schema")
+    async def ensure_schema(self, force: bool = False) -> bool:
+        """
+        Cria tabela Users se não existir, com os índices de email e nome usados no login.
+        Chamado no lifespan; se o cache local diz que esta versão do schema já foi aplicada,
+        não faz nenhuma chamada ao banco. A versão só vai para o cache quando todas as DDLs
+        deram certo, para que uma falha seja tentada de novo na próxima subida.
+        Retorna True se a DDL rodou sem erro.
+        """
+        version = self.schema_version()
+        if not force and cached_schema_version(self.table_name) == version:
+            print(f"Schema de {self.table_name} já na versão {version}, DDL ignorada")
+            return False
+
+        complete = True
+        try:
+            request = TableRequest().set_statement(self._create_table_ddl())
+
             # 🟢 MUDANÇA 2: Definindo limites de Throughput e Capacidade (Obrigatório na Nuvem)
-            # Leitura: 50 unidades, Escrita: 50 unidades, Armazenamento: 25 GB (Limites do Free Tier geralmente)
-            limits = TableLimits(50, 50, 25)
+            # Padrão: leitura 50 unidades, escrita 50 unidades, armazenamento 25 GB (Free Tier);
+            # os mesmos números que o governador de capacidade usa como teto
+            limits = TableLimits(config.DB_TABLE_READ_UNITS, config.DB_TABLE_WRITE_UNITS, config.DB_TABLE_STORAGE_GB)
             request.set_table_limits(limits)
 
-            db.handle.table_request(request)
+            await async_handle.do_table_request(request, 60000, 1000)
             print(f"Tabela {self.table_name} criada/verificada com sucesso!")
         except Exception as e:
-            print(f"Tabela {self.table_name} já existe ou erro: {e}")
+            # A tabela pode já existir (ex.: com outros limites); os índices ainda são tentados
+            print(f"Erro ao criar a tabela {self.table_name}: {e}")
+            complete = False
+
+        for ddl in self._index_ddls():
+            try:
+                await async_handle.do_table_request(TableRequest().set_statement(ddl), 60000, 1000)
+            except Exception as e:
+                # O ALTER falha quando a coluna já existe; isso é esperado
+                if ddl.lstrip().upper().startswith("ALTER") and "already exists" in str(e).lower():
+                    continue
+                print(f"Erro na DDL de {self.table_name}: {e}")
+                complete = False
+
+        if complete:
+            store_schema_version(self.table_name, version)
+        return complete
+
+    @instrumentar("backfill_indexes")
+    async def backfill_indexes(self, batch_size: int = 100) -> int:
+        """
+        Migração: preenche name_normalized nas linhas antigas para que o login por nome
+        as encontre pelo índice. Pode ser executada mais de uma vez. Retorna quantas linhas mudaram.
+        """
+        request = (await statements.bind(f"SELECT * FROM {self.table_name}")).set_limit(batch_size)
+        updated = 0
+        try:
+            while True:
+                result = await async_handle.query(request)
+                for user in result.get_results():
+                    if user.get("name_normalized") != normalizar_nome(user.get("name") or ""):
+                        # Com versão da linha: não sobrescreve um token registrado no meio da migração
+                        if await self.modify_user(user["user_id"], self._fill_name_normalized):
+                            updated += 1
+                if request.is_done():
+                    break
+        finally:
+            request.close()
+        return updated
+
+    @staticmethod
+    def _fill_name_normalized(user: Dict[str, Any]) -> bool:
+        expected = normalizar_nome(user.get("name") or "")
+        if user.get("name_normalized") == expected:
+            return False
+        user["name_normalized"] = expected
+        return True
 
+    @instrumentar("save_device_token")
     async def save_device_token(self, user_id: str, device_token: str, platform: Optional[str] = "android"):
-        """Salva ou atualiza o token do dispositivo para o usuário."""
-        user = await self.get_user_by_id(user_id, include_sensitive=True) 
-        
-        if not user:
+        """
+        Salva ou atualiza o token do dispositivo para o usuário.
+
+        Um único UPDATE tira o token (se já existir) e os expirados, acrescenta o token de
+        novo com last_used atual e corta os mais antigos além de DEVICE_TOKENS_PER_USER, sem
+        ler a linha antes: dois registros simultâneos não se sobrescrevem e a lista não cresce.
+        """
+        now = datetime.utcnow()
+        cutoff = device_token_cutoff(now)
+        statement = (
+            "DECLARE $user_id STRING; $token STRING; $platform STRING; $now STRING; "
+            "$cutoff STRING; $max_tokens INTEGER; "
+            f"UPDATE {self.table_name} u "
+            "REMOVE u.device_tokens[$element.token = $token OR $element.last_used < $cutoff], "
+            'ADD u.device_tokens {"token": $token, "platform": $platform, "last_used": $now}, '
+            "REMOVE u.device_tokens[$pos < size($) - $max_tokens], "
+            "SET u.updated_at = $now "
+            "WHERE user_id = $user_id"
+        )
+        variables = {
+            "$user_id": user_id, "$token": device_token, "$platform": platform, "$now": now.isoformat(),
+            "$cutoff": cutoff.isoformat(), "$max_tokens": config.DEVICE_TOKENS_PER_USER,
+        }
+        if not await self._execute_update(statement, variables):
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado")
 
-        # Garante que 'device_tokens' é uma lista
-        user.setdefault('device_tokens', []) 
-        
-        tokens: List[Dict[str, str]] = user['device_tokens']
-        
-        # Remove token se já existir para evitar duplicatas
-        tokens = [t for t in tokens if t.get('token') != device_token]
-        
-        tokens.append({
-            "token": device_token,
-            "platform": platform,
-            "last_used": datetime.utcnow().isoformat()
-        })
-        
-        user['device_tokens'] = tokens
-        user["updated_at"] = datetime.utcnow().isoformat()
+        # Aplica a mesma mudança no documento em cache, se houver
+        cached = self.cache.obter(user_id)
+        if cached is not None:
+            tokens = [
+                t for t in cached.get("device_tokens") or []
+                if t.get("token") != device_token and last_used(t) >= cutoff
+            ]
+            tokens.append({"token": device_token, "platform": platform, "last_used": now})
+            tokens = tokens[-config.DEVICE_TOKENS_PER_USER:]
+            self.cache.guardar(user_id, {**cached, "device_tokens": tokens, "updated_at": now})
+
+    @instrumentar("prune_device_tokens")
+    async def prune_device_tokens(self, user_id: str, device_token: Optional[str] = None) -> bool:
+        """
+        Tira da lista do usuário os tokens expirados e, se informado, `device_token`
+        (ex.: o FCM disse que ele não vale mais). Retorna False se o usuário não existe.
+        """
+        cutoff = device_token_cutoff()
+        statement = (
+            "DECLARE $user_id STRING; $token STRING; $cutoff STRING; "
+            f"UPDATE {self.table_name} u "
+            "REMOVE u.device_tokens[$element.token = $token OR $element.last_used < $cutoff] "
+            "WHERE user_id = $user_id"
+        )
+        variables = {"$user_id": user_id, "$token": device_token or "", "$cutoff": cutoff.isoformat()}
+        if not await self._execute_update(statement, variables):
+            return False
+
+        cached = self.cache.obter(user_id)
+        if cached is not None:
+            tokens = [
+                t for t in cached.get("device_tokens") or []
+                if t.get("token") != device_token and last_used(t) >= cutoff
+            ]
+            self.cache.guardar(user_id, {**cached, "device_tokens": tokens})
+        return True
+
+    async def live_device_tokens(self, user_id: str) -> List[Dict[str, Any]]:
+        """Tokens do usuário usados dentro de DEVICE_TOKEN_TTL_DAYS, do mais recente ao mais antigo."""
+        user = await self.get_user_by_id(user_id, include_sensitive=True)
+        return split_device_tokens(user.get("device_tokens") if user else None)[0]
+
+    @instrumentar("update_fields")
+    async def update_fields(self, user_id: str, fields: Dict[str, Any]) -> bool:
+        """
+        Grava só os campos informados (UPDATE ... SET), sem ler a linha antes nem tocar
+        nos demais campos. Retorna False se o usuário não existe.
+        """
+        names = sorted(fields)
+        declare = " ".join(f"${name} {_DECLARED_TYPES[type(fields[name])]};" for name in names)
+        assignments = ", ".join(f"u.{name} = ${name}" for name in names)
+        statement = (
+            f"DECLARE $user_id STRING; {declare} "
+            f"UPDATE {self.table_name} u SET {assignments} WHERE user_id = $user_id"
+        )
+        variables = {f"${name}": fields[name] for name in names}
+        variables["$user_id"] = user_id
+        if not await self._execute_update(statement, variables):
+            return False
+
+        cached = self.cache.obter(user_id)
+        if cached is not None:
+            self.cache.guardar(user_id, {**cached, **fields})
+        return True
+
+    @instrumentar("modify_user")
+    async def modify_user(self, user_id: str, change: Callable[[Dict[str, Any]], bool]) -> Optional[Dict[str, Any]]:
+        """
+        Read-modify-write com controle otimista: lê a linha com a versão, aplica `change`
+        (que altera o documento e retorna False quando não há nada a mudar) e grava só se
+        a versão não mudou. Em conflito relê e tenta de novo, até USER_UPDATE_MAX_RETRIES vezes.
 
-        put_request = PutRequest().set_table_name(self.table_name).set_value(user)
-        db.handle.put(put_request)
+        Retorna o documento gravado, ou None se o usuário não existe ou nada mudou.
+        """
+        for attempt in range(config.USER_UPDATE_MAX_RETRIES):
+            get_request = GetRequest().set_table_name(self.table_name).set_key({"user_id": user_id})
+            result = await async_handle.get(get_request)
+            user = result.get_value()
+            if not user or not change(user):
+                return None
+
+            user["updated_at"] = datetime.utcnow().isoformat()
+            put_request = (
+                PutRequest().set_table_name(self.table_name).set_value(user)
+                .set_option(PutOption.IF_VERSION).set_match_version(result.get_version())
+            )
+            if (await async_handle.put(put_request)).get_version() is not None:
+                self.cache.guardar(user_id, user)
+                return user
 
+            # Outra escrita chegou antes: espera um pouco (com jitter) e refaz sobre a versão nova
+            await asyncio.sleep(random.uniform(0, 0.01 * 2 ** attempt))
 
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Usuário alterado por outra requisição, tente novamente"
+        )
+
+    async def _execute_update(self, statement: str, variables: Dict[str, Any]) -> bool:
+        """Executa um UPDATE com variáveis; True se a linha existia e foi alterada"""
+        results = await statements.query(statement, variables)
+        return bool(results) and results[0].get("NumRowsUpdated", 0) > 0
+
+    @instrumentar("register_user")
     async def register_user(self, user_data: UserCreate) -> Dict[str, Any]:
         """Registra novo usuário"""
         if await self._email_exists(user_data.email):
@@ -87,8 +314,9 @@ class UserService:
         user_doc = {
             "user_id": user_id,
             "name": user_data.name,
+            "name_normalized": normalizar_nome(user_data.name),
             "email": user_data.email,
-            "password_hash": AuthUtils.hash_password(user_data.password),
+            "password_hash": await password_hasher.hash(user_data.password),
             "security_word": user_data.security_word.lower(),
             "device_tokens": [],
             "is_active": True,
@@ -97,15 +325,11 @@ class UserService:
         }
 
         put_request = PutRequest().set_table_name(self.table_name).set_value(user_doc)
-        db.handle.put(put_request)
-
-        access_token = AuthUtils.create_access_token({"sub": user_id})
-        refresh_token = AuthUtils.create_refresh_token({"sub": user_id})
+        await async_handle.put(put_request)
+        self.cache.guardar(user_id, user_doc)
 
         return {
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "token_type": "bearer",
+            **AuthUtils.create_token_pair(user_id),
             "user": {
                 "user_id": user_id,
                 "name": user_data.name,
@@ -114,9 +338,11 @@ class UserService:
             }
         }
 
+    @instrumentar("login_user")
     async def login_user(self, login_data: UserLogin) -> Dict[str, Any]:
         """Faz login do usuário"""
 
+        generation = self.cache.geracao()
         user = await self._get_user_by_email(login_data.identifier)
         
         if not user:
@@ -128,7 +354,8 @@ class UserService:
                 detail="Identificador ou senha incorretos"
             )
         
-        if not AuthUtils.verify_password(login_data.password, user.get("password_hash", "")):
+        valid, new_hash = await password_hasher.verify_and_update(login_data.password, user.get("password_hash", ""))
+        if not valid:
              raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Identificador ou senha incorretos"
@@ -140,13 +367,18 @@ class UserService:
                 detail="Conta desativada"
             )
 
-        access_token = AuthUtils.create_access_token({"sub": user["user_id"]})
-        refresh_token = AuthUtils.create_refresh_token({"sub": user["user_id"]})
+        if new_hash:
+            # Hash com custo diferente do configurado: regrava só o hash, com o custo atual
+            user["password_hash"] = new_hash
+            user["updated_at"] = datetime.utcnow().isoformat()
+            await self.update_fields(user["user_id"], {"password_hash": new_hash, "updated_at": user["updated_at"]})
+
+        # O app chama /auth/me logo depois do login: já deixa o documento lido no cache
+        # (se nenhuma escrita no usuário aconteceu desde a leitura)
+        self.cache.preencher(user["user_id"], user, generation)
 
         return {
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "token_type": "bearer",
+            **AuthUtils.create_token_pair(user["user_id"]),
             "user": {
                 "user_id": user["user_id"],
                 "name": user["name"],
@@ -155,6 +387,7 @@ class UserService:
             }
         }
 
+    @instrumentar("reset_password")
     async def reset_password(self, reset_data: PasswordReset) -> Dict[str, str]:
         """Recupera senha usando palavra de segurança"""
         user = await self._get_user_by_email(reset_data.email)
@@ -165,50 +398,86 @@ class UserService:
         if user.get("security_word") != reset_data.security_word.lower():
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Palavra de segurança incorreta")
 
-        user["password_hash"] = AuthUtils.hash_password(reset_data.new_password)
-        user["updated_at"] = datetime.utcnow().isoformat()
-        put_request = PutRequest().set_table_name(self.table_name).set_value(user)
-        db.handle.put(put_request)
+        await self.update_fields(user["user_id"], {
+            "password_hash": await password_hasher.hash(reset_data.new_password),
+            "updated_at": datetime.utcnow().isoformat(),
+            # Encerra as sessões abertas com a senha antiga
+            "tokens_revoked_before": int(time.time()),
+        })
         return {"message": "Senha alterada com sucesso"}
 
+    @instrumentar("refresh_session")
+    async def refresh_session(self, refresh_token: str) -> Dict[str, str]:
+        """
+        /auth/refresh: troca o refresh token por um par novo se o usuário ainda existe, está
+        ativo e não encerrou as sessões (troca de senha) depois de o token ser emitido. O
+        documento vem do cache de usuários na maior parte das vezes.
+        """
+        payload = AuthUtils.verify_token(refresh_token, expected_type="refresh")
+        user = await self.get_user_by_id(payload.get("sub") or "", include_sensitive=True)
+        revoked_before = user.get("tokens_revoked_before") if user else None
+        # iat e revogação são em segundos inteiros: um token do mesmo segundo da troca de
+        # senha pode ter sido emitido antes dela, então também não vale
+        if (
+            not user or not user.get("is_active", True)
+            or (revoked_before is not None and refresh_issued_at(payload) <= revoked_before)
+        ):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido ou expirado")
+        return rotate_refresh_token(payload)
+
     async def _email_exists(self, email: str) -> bool:
         """Verifica se email já existe"""
         user = await self._get_user_by_email(email)
         return user is not None
 
+    @instrumentar("get_user_by_email")
     async def _get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
         """Busca usuário por email"""
         if "@" not in email:
             return None 
 
-        query = f"SELECT * FROM {self.table_name} WHERE email = '{email}'"
-        request = QueryRequest().set_statement(query)
-        result = db.handle.query(request)
-        return result.get_results()[0] if result.get_results() else None
+        query = f"DECLARE $email STRING; SELECT * FROM {self.table_name} WHERE email = $email"
+        return await self._query_first(await statements.bind(query, {"$email": email}))
 
+    @instrumentar("get_user_by_name")
     async def _get_user_by_name(self, name: str) -> Optional[Dict[str, Any]]:
-        """Busca usuário pelo nome"""
-        query = f"SELECT * FROM {self.table_name} WHERE name = '{name}'"
-        request = QueryRequest().set_statement(query)
-        result = db.handle.query(request)
-        return result.get_results()[0] if result.get_results() else None
+        """Busca usuário pelo nome (sem diferenciar caixa), via índice idx_name_normalized"""
+        query = f"DECLARE $name STRING; SELECT * FROM {self.table_name} WHERE name_normalized = $name"
+        return await self._query_first(await statements.bind(query, {"$name": normalizar_nome(name)}))
 
+    async def _query_first(self, request: QueryRequest) -> Optional[Dict[str, Any]]:
+        """Primeira linha de uma consulta; uma rodada pode voltar vazia sem a consulta ter terminado"""
+        request.set_limit(1)
+        try:
+            while True:
+                results = (await async_handle.query(request)).get_results()
+                if results:
+                    return results[0]
+                if request.is_done():
+                    return None
+        finally:
+            request.close()
+
+    @instrumentar("get_user_by_id")
     async def get_user_by_id(self, user_id: str, include_sensitive: bool = False) -> Optional[Dict[str, Any]]:
-        """Busca usuário por ID"""
-        get_request = GetRequest().set_table_name(self.table_name).set_key({"user_id": user_id})
-        result = db.handle.get(get_request)
-        if result.get_value():
+        """Busca usuário por ID (primeiro no cache, depois no banco)"""
+        user = self.cache.obter(user_id)
+        if user is None:
+            generation = self.cache.geracao()
+            get_request = GetRequest().set_table_name(self.table_name).set_key({"user_id": user_id})
+            result = await async_handle.get(get_request)
             user = result.get_value()
-            
-            if include_sensitive:
-                 user.setdefault('device_tokens', []) 
-                 
-            if not include_sensitive:
-                user.pop("password_hash", None)
-                user.pop("security_word", None)
-                user.pop("device_tokens", None)
-            return user
-        return None
+            if not user:
+                return None
+            # Não guarda se uma escrita no usuário terminou enquanto a leitura estava em curso
+            self.cache.preencher(user_id, user, generation)
+
+        # Sempre uma cópia: quem chama pode alterar o documento sem mexer no cache
+        if include_sensitive:
+            copy = dict(user)
+            copy['device_tokens'] = [dict(t) for t in user.get('device_tokens') or []]
+            return copy
+        return {k: v for k, v in user.items() if k not in SENSITIVE_FIELDS}
 
 
 # Instância do serviço
@@ -0,0 +1,32 @@
+"""
+Backends de armazenamento do app, escolhidos por STORAGE_BACKEND:
+
+- "oracle": Oracle NoSQL na nuvem, via borneo (produção);
+- "local": o mesmo modelo de dados em memória, no processo (desenvolvimento, CI e benchmarks).
+
+Os dois seguem StorageHandle e falam com os objetos de requisição do borneo, então o
+restante do app não sabe qual está em uso.
+"""
+from app import config
+from app.storage.base import StorageHandle
+from app.storage.local import LocalNoSQLHandle
+
+BACKENDS = ("oracle", "local")
+
+
+def open_handle(backend: str = None) -> StorageHandle:
+    backend = (backend or config.STORAGE_BACKEND).lower()
+    if backend == "local":
+        return LocalNoSQLHandle(
+            latencia=config.LOCAL_STORAGE_LATENCY_MS / 1000,
+            limitar_capacidade=config.LOCAL_STORAGE_ENFORCE_LIMITS,
+            taxa_throttling=config.LOCAL_STORAGE_THROTTLE_RATE,
+        )
+    if backend == "oracle":
+        # Importado só aqui: o backend local não precisa das credenciais nem do SignatureProvider
+        from app.storage.oracle import connect_oracle
+        return connect_oracle()
+    raise ValueError(f"STORAGE_BACKEND desconhecido: {backend!r} (use {' ou '.join(BACKENDS)})")
+
+
+__all__ = ["StorageHandle", "LocalNoSQLHandle", "open_handle", "BACKENDS"]
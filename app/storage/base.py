@@ -0,0 +1,25 @@
+from typing import Any, Protocol
+
+
+class StorageHandle(Protocol):
+    """
+    O que o app usa de um handle de armazenamento: o subconjunto de borneo.NoSQLHandle
+    chamado por app.database. Todos os métodos são bloqueantes e recebem/retornam os
+    objetos de requisição e resultado do borneo.
+    """
+
+    def get(self, request: Any) -> Any: ...
+
+    def put(self, request: Any) -> Any: ...
+
+    def query(self, request: Any) -> Any: ...
+
+    def prepare(self, request: Any) -> Any: ...
+
+    def write_multiple(self, request: Any) -> Any: ...
+
+    def table_request(self, request: Any) -> Any: ...
+
+    def do_table_request(self, request: Any, timeout_ms: int, poll_interval_ms: int) -> Any: ...
+
+    def close(self) -> None: ...
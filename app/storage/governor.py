@@ -0,0 +1,176 @@
+import asyncio
+import math
+import re
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.utils.metricas import operacao_atual
+
+# Peso da chamada mais recente na média de unidades por operação
+_PESO_ESTIMATIVA = 0.2
+
+_RE_ESCRITA = re.compile(r"\b(UPDATE|INSERT|UPSERT|DELETE)\b", re.I)
+
+
+class DatabaseOverloaded(Exception):
+    """
+    O banco está no limite de capacidade e a chamada foi descartada (fila cheia ou
+    throttling que não passou dentro do prazo). Vira 503 com Retry-After no main.
+    """
+
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class TokenBucket:
+    """
+    Balde de unidades por segundo, no event loop. Como as unidades de uma chamada só são
+    conhecidas no resultado, a entrada desconta uma estimativa e `adjust` corrige depois;
+    o saldo pode ficar negativo, e quem chega espera ele voltar a ser positivo.
+
+    Quem espera passa por um lock, na ordem de chegada: um só dorme no balde por vez.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, units: float):
+        async with self._lock:
+            self._refill()
+            while self.tokens <= 0:
+                await asyncio.sleep(-self.tokens / self.rate + 0.001)
+                self._refill()
+            self.tokens -= units
+
+    def adjust(self, units: float):
+        self._refill()
+        self.tokens -= units
+
+    def drain(self):
+        """O servidor recusou por capacidade: o que o balde achava disponível não existe."""
+        self._refill()
+        self.tokens = min(self.tokens, 0)
+
+    def seconds_until(self, units: float) -> float:
+        """Tempo até o saldo cobrir `units` unidades além do que já foi descontado."""
+        self._refill()
+        return max(0.0, (units - self.tokens) / self.rate)
+
+
+class CapacityGovernor:
+    """
+    Mantém as chamadas deste processo dentro das unidades por segundo provisionadas na
+    tabela (TableLimits), em vez de deixar o servidor recusar com ThrottlingException.
+
+    Leituras e escritas têm baldes separados. O custo de cada chamada é estimado pela média
+    do que a mesma operação (rótulo de instrumentar + método do handle) consumiu antes.
+    Com mais de `max_queue` chamadas esperando unidades, as novas são descartadas na hora
+    com DatabaseOverloaded, e o Retry-After é o tempo para a fila atual ser atendida.
+    """
+
+    def __init__(self, read_units: float, write_units: float, max_queue: int, burst_seconds: float = 1.0):
+        self.read = TokenBucket(read_units, read_units * burst_seconds)
+        self.write = TokenBucket(write_units, write_units * burst_seconds)
+        self.max_queue = max_queue
+        self.waiting = 0
+        self.shed = 0
+        self._queued = [0.0, 0.0]  # unidades estimadas de quem está esperando (leitura, escrita)
+        self._estimates: Dict[Tuple[Optional[str], str], Tuple[float, float]] = {}
+
+    @staticmethod
+    def buckets_for(method: str, request) -> Tuple[bool, bool]:
+        """(lê, escreve) de uma chamada do handle; DDL não passa pelo governador."""
+        if method in ("get", "prepare"):
+            return True, False
+        if method in ("put", "delete", "write_multiple"):
+            return False, True
+        if method == "query":
+            prepared = request.get_prepared_statement()
+            sql = prepared.get_sql_text() if prepared is not None else request.get_statement()
+            return True, bool(sql and _RE_ESCRITA.search(sql))
+        return False, False
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(max(
+            self.read.seconds_until(self._queued[0]),
+            self.write.seconds_until(self._queued[1]),
+        )))
+
+    async def admit(self, method: str, reads: bool, writes: bool) -> Tuple[float, float]:
+        """Espera unidades para a chamada; devolve a estimativa descontada, para `settle`."""
+        if self.waiting >= self.max_queue:
+            self.shed += 1
+            raise DatabaseOverloaded(self.retry_after(), "Fila de chamadas ao banco cheia")
+        read_estimate, write_estimate = self._estimates.get((operacao_atual(), method), (1.0, 1.0))
+        read_estimate = read_estimate if reads else 0.0
+        write_estimate = write_estimate if writes else 0.0
+        self.waiting += 1
+        self._queued[0] += read_estimate
+        self._queued[1] += write_estimate
+        taken = (0.0, 0.0)
+        try:
+            if reads:
+                await self.read.acquire(read_estimate)
+                taken = (read_estimate, 0.0)
+            if writes:
+                await self.write.acquire(write_estimate)
+        except BaseException:
+            # Cancelada na espera: devolve o que já tinha descontado
+            self.release(taken)
+            raise
+        finally:
+            self.waiting -= 1
+            self._queued[0] -= read_estimate
+            self._queued[1] -= write_estimate
+        return read_estimate, write_estimate
+
+    def settle(self, method: str, estimate: Tuple[float, float], result):
+        """Corrige os baldes com as unidades que o resultado informou e atualiza a média."""
+        read_units = result.get_read_units() or 0
+        write_units = result.get_write_units() or 0
+        self.read.adjust(read_units - estimate[0])
+        self.write.adjust(write_units - estimate[1])
+        key = (operacao_atual(), method)
+        previous = self._estimates.get(key)
+        if previous is None:
+            self._estimates[key] = (float(read_units), float(write_units))
+        else:
+            self._estimates[key] = (
+                previous[0] + _PESO_ESTIMATIVA * (read_units - previous[0]),
+                previous[1] + _PESO_ESTIMATIVA * (write_units - previous[1]),
+            )
+
+    def release(self, estimate: Tuple[float, float]):
+        """A chamada não consumiu nada (erro antes do servidor): devolve a estimativa."""
+        self.read.adjust(-estimate[0])
+        self.write.adjust(-estimate[1])
+
+    def throttled(self, reads: bool, writes: bool):
+        if reads:
+            self.read.drain()
+        if writes:
+            self.write.drain()
+
+    def linhas(self) -> Iterable[str]:
+        """Estado do governador no formato de texto do Prometheus (registrado em /metrics)."""
+        yield "# HELP nosql_governor_waiting Chamadas esperando unidades de capacidade"
+        yield "# TYPE nosql_governor_waiting gauge"
+        yield f"nosql_governor_waiting {self.waiting}"
+        yield "# HELP nosql_governor_shed_total Chamadas descartadas com a fila cheia"
+        yield "# TYPE nosql_governor_shed_total counter"
+        yield f"nosql_governor_shed_total {self.shed}"
+        yield "# HELP nosql_governor_tokens Saldo de unidades dos baldes (negativo: em dívida)"
+        yield "# TYPE nosql_governor_tokens gauge"
+        yield f'nosql_governor_tokens{{kind="read"}} {self.read.tokens:.2f}'
+        yield f'nosql_governor_tokens{{kind="write"}} {self.write.tokens:.2f}'
@@ -0,0 +1,639 @@
+"""
+Backend "local" do armazenamento: o Oracle NoSQL simulado em memória, no próprio processo.
+
+Serve para rodar o app, os benchmarks e a CI sem credenciais da nuvem. Recebe os mesmos
+objetos de requisição do borneo (GetRequest, PutRequest, QueryRequest, PrepareRequest,
+WriteMultipleRequest, TableRequest) e implementa o subconjunto de SQL que o app usa:
+
+    CREATE TABLE [IF NOT EXISTS] t (... PRIMARY KEY([SHARD(col, ...),] col, ...))
+    CREATE INDEX [IF NOT EXISTS] idx ON t(col, ...)
+    ALTER TABLE t (ADD col TIPO)
+    SELECT * FROM t [alias] [WHERE col = valor [AND ...]]   (literal ou $variável)
+    UPDATE t [alias] SET col = v | ADD col v | REMOVE col[$element.campo = v], ... WHERE pk = v
+    DECLARE $var TIPO; ... antes de qualquer uma das consultas
+
+Colunas TIMESTAMP (no topo ou campos de ARRAY(RECORD(...))) voltam como datetime, como
+no borneo, mesmo gravadas como texto ISO; comparadas a um texto num filtro, ele é lido
+como timestamp.
+
+Em UPDATE, v pode ser literal, $variável ou um construtor {"campo": v, ...}. O filtro do
+REMOVE aceita termos ligados por OR, comparando $element.campo, $element ou $pos (=, !=,
+<, <=, >, >=) com v ou com size($) - v.
+
+As unidades consumidas seguem o modelo de cobrança da nuvem: 1 unidade de leitura/escrita
+por KB de linha, mínimo 1; uma consulta sem índice lê todas as linhas da tabela, uma
+consulta por índice lê uma entrada de índice por linha encontrada mais a própria linha, e
+uma com a chave de shard inteira no WHERE lê só as linhas daquela partição.
+
+Opcionalmente simula a nuvem mais de perto: latência por chamada, o limite de unidades
+por segundo declarado no TableLimits da tabela (ReadThrottlingException /
+WriteThrottlingException quando estoura) e throttling aleatório numa taxa fixa.
+"""
+import copy
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from datetime import datetime
+
+from borneo import PreparedStatement, PutOption, PutRequest, Version
+from borneo.exception import (
+    BatchOperationNumberLimitException, IllegalArgumentException, ReadThrottlingException,
+    TableNotFoundException, WriteThrottlingException,
+)
+from borneo.operations import OperationResult, WriteMultipleResult
+
+# Máximo de operações num WriteMultipleRequest, como na nuvem
+MAX_OPERACOES_LOTE = 50
+
+_RE_CREATE_TABLE = re.compile(
+    r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s*\((.*)PRIMARY\s+KEY\s*\(((?:[^()]|\([^()]*\))*)\)", re.I | re.S
+)
+_RE_CREATE_INDEX = re.compile(
+    r"CREATE\s+INDEX\s+(IF\s+NOT\s+EXISTS\s+)?(\w+)\s+ON\s+(\w+)\s*\(([^)]*)\)", re.I | re.S
+)
+_RE_ALTER_ADD = re.compile(r"ALTER\s+TABLE\s+(\w+)\s*\(\s*ADD\s+(\w+)\s+(\w+)", re.I | re.S)
+_RE_TIMESTAMP = re.compile(r"(\w+)\s+TIMESTAMP\b", re.I)
+_RE_ARRAY_RECORD = re.compile(r"(\w+)\s+ARRAY\s*\(\s*RECORD\s*\(((?:[^()]|\([^()]*\))*)\)\s*\)", re.I | re.S)
+_RE_SELECT = re.compile(r"SELECT\s+\*\s+FROM\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?(?:\s+WHERE\s+(.+?))?\s*$", re.I | re.S)
+_RE_UPDATE = re.compile(
+    r"UPDATE\s+(\w+)(?:\s+(?:AS\s+)?(?!SET\b|ADD\b|REMOVE\b)(\w+))?\s+(.+?)\s+WHERE\s+(.+?)\s*$", re.I | re.S
+)
+_RE_DECLARE = re.compile(r"^\s*DECLARE\s+(?:\$\w+\s+[^;]+;\s*)+", re.I | re.S)
+_RE_CLAUSULA = re.compile(r"(SET|ADD|REMOVE)?\s*(?:\w+\.)?(\w+)\s*(?:\[(.+)\])?\s*=?\s*(.*)$", re.I | re.S)
+# Um termo do filtro de array no REMOVE: $element.campo, $pos ou $element comparado a um valor,
+# que pode ser "size($) - valor" (ex.: manter só os N últimos elementos)
+_RE_TERMO_FILTRO = re.compile(
+    r"\s*(\$element(?:\.(\w+))?|\$pos)\s*(=|!=|<=|>=|<|>)\s*(?:size\(\$\)\s*-\s*)?(\S+?)\s*$", re.I
+)
+_COMPARADORES = {
+    "=": lambda a, b: a == b, "!=": lambda a, b: a != b, "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b, ">": lambda a, b: a > b, ">=": lambda a, b: a >= b,
+}
+_RE_IGUALDADE = re.compile(r"(?:\w+\.)?(\w+)\s*=\s*('(?:[^']|'')*'|\"(?:[^\"])*\"|\$\w+|-?\d+(?:\.\d+)?|true|false)", re.I)
+
+
+def _unidades(linha):
+    return max(1, math.ceil(len(json.dumps(linha, default=str).encode()) / 1024))
+
+
+def _versao():
+    return Version.create_version(bytearray(uuid.uuid4().bytes))
+
+
+def _chave_primaria(texto):
+    """Colunas da PRIMARY KEY e quantas delas formam a shard key (todas, sem SHARD(...))."""
+    shard = re.match(r"\s*SHARD\s*\(([^)]*)\)", texto, re.I)
+    colunas = [c.strip() for c in re.sub(r"SHARD\s*\(([^)]*)\)", r"\1", texto, flags=re.I).split(",")]
+    return colunas, len(shard.group(1).split(",")) if shard else len(colunas)
+
+
+def _timestamps(colunas):
+    """
+    Colunas TIMESTAMP da DDL: nome -> None (a coluna em si) ou os campos TIMESTAMP dos
+    registros de uma coluna ARRAY(RECORD(...)).
+    """
+    tipos = {}
+    for m in _RE_ARRAY_RECORD.finditer(colunas):
+        campos = {c.group(1) for c in _RE_TIMESTAMP.finditer(m.group(2))}
+        if campos:
+            tipos[m.group(1)] = campos
+    for m in _RE_TIMESTAMP.finditer(_RE_ARRAY_RECORD.sub("", colunas)):
+        tipos[m.group(1)] = None
+    return tipos
+
+
+def _timestamp(valor):
+    return datetime.fromisoformat(valor) if isinstance(valor, str) else valor
+
+
+def _custo(resultado, leitura=0, escrita=0):
+    resultado.set_read_kb(leitura).set_read_units(leitura)
+    resultado.set_write_kb(escrita).set_write_units(escrita)
+    return resultado
+
+
+class _Resultado:
+    """Resultado genérico com os acessores que o app usa dos resultados do borneo."""
+
+    def __init__(self, valor=None, versao=None, resultados=None, leitura=0, escrita=0, continuacao=None,
+                 sucesso=None):
+        self._valor = valor
+        self._versao = versao
+        self._resultados = resultados if resultados is not None else []
+        self._leitura = leitura
+        self._escrita = escrita
+        self._continuacao = continuacao
+        self._sucesso = sucesso
+
+    def get_value(self):
+        return self._valor
+
+    def get_version(self):
+        return self._versao
+
+    def get_results(self):
+        return self._resultados
+
+    def get_continuation_key(self):
+        return self._continuacao
+
+    def get_success(self):
+        return self._sucesso
+
+    def get_read_units(self):
+        return self._leitura
+
+    def get_read_kb(self):
+        return self._leitura
+
+    def get_write_units(self):
+        return self._escrita
+
+    def get_write_kb(self):
+        return self._escrita
+
+    def wait_for_completion(self, handle, wait_millis, delay_millis):
+        return self
+
+
+class _Tabela:
+    def __init__(self, nome, chave, shard, limites=None, timestamps=None):
+        self.nome = nome
+        self.chave = chave
+        self.shard = shard    # prefixo da chave que decide a partição (SHARD(...) na DDL)
+        self.limites = limites  # (leitura, escrita) por segundo, do TableLimits
+        self.timestamps = timestamps or {}  # colunas TIMESTAMP, como em _timestamps
+        self.linhas = {}      # tupla da chave -> (linha, versão)
+        self.indices = {}     # nome -> tupla de colunas
+        self.entradas = {}    # nome -> {tupla de valores: set(chaves)}
+        self.janela = [0, 0, 0]  # segundo atual, leitura e escrita consumidas nele
+        self._ordenadas = None
+
+    def chaves_ordenadas(self):
+        """Chaves em ordem (a varredura sem índice); refeito só quando entra ou sai uma linha."""
+        if self._ordenadas is None:
+            self._ordenadas = sorted(self.linhas)
+        return self._ordenadas
+
+    def tipar(self, linha):
+        """Converte para datetime os textos ISO gravados em colunas TIMESTAMP."""
+        for coluna, campos in self.timestamps.items():
+            valor = linha.get(coluna)
+            if valor is None:
+                continue
+            if campos is None:
+                linha[coluna] = _timestamp(valor)
+            elif isinstance(valor, list):
+                linha[coluna] = [
+                    {**e, **{c: _timestamp(e[c]) for c in campos if e.get(c) is not None}}
+                    if isinstance(e, dict) else e
+                    for e in valor
+                ]
+        return linha
+
+    def gravar(self, chave, linha):
+        linha = self.tipar(linha)
+        existente = self.linhas.get(chave)
+        if existente is None:
+            self._ordenadas = None
+        else:
+            self.indexar(chave, existente[0], remover=True)
+        versao = _versao()
+        self.linhas[chave] = (linha, versao)
+        self.indexar(chave, linha)
+        return versao
+
+    def apagar(self, chave):
+        existente = self.linhas.pop(chave, None)
+        if existente is not None:
+            self._ordenadas = None
+            self.indexar(chave, existente[0], remover=True)
+        return existente
+
+    def consumo(self):
+        """Janela de consumo do segundo atual: [segundo, leitura, escrita]."""
+        segundo = int(time.monotonic())
+        if self.janela[0] != segundo:
+            self.janela = [segundo, 0, 0]
+        return self.janela
+
+    def chave_de(self, valor):
+        try:
+            return tuple(valor[col] for col in self.chave)
+        except KeyError:
+            raise IllegalArgumentException(f"Chave primária ausente em {self.nome}")
+
+    def indexar(self, chave, linha, remover=False):
+        for nome, colunas in self.indices.items():
+            valores = tuple(linha.get(col) for col in colunas)
+            grupo = self.entradas[nome].setdefault(valores, set())
+            if remover:
+                grupo.discard(chave)
+            else:
+                grupo.add(chave)
+
+
+class LocalNoSQLHandle:
+    """Substituto de borneo.NoSQLHandle guardando tudo em dicionários."""
+
+    def __init__(self, latencia=0.0, latencia_ddl=0.0, limitar_capacidade=False, taxa_throttling=0.0, seed=None):
+        self.tabelas = {}
+        self.lock = threading.RLock()
+        # Tempo de ida e volta simulado em cada operação de dados (bloqueia a thread, como o borneo)
+        self.latencia = latencia
+        # Tempo simulado de cada DDL até a tabela/índice ficar ativo (do_table_request espera por isso)
+        self.latencia_ddl = latencia_ddl
+        # Recusa operações acima das unidades/s do TableLimits de cada tabela
+        self.limitar_capacidade = limitar_capacidade
+        # Fração das operações de dados recusadas com throttling, independente do consumo
+        self.taxa_throttling = taxa_throttling
+        self._aleatorio = random.Random(seed)
+        # Totais acumulados, para os benchmarks lerem o consumo
+        self.unidades_leitura = 0
+        self.unidades_escrita = 0
+        self.chamadas = {}
+        self.throttles = 0
+
+    def _contar(self, operacao, leitura=0, escrita=0, tabela=None):
+        self.unidades_leitura += leitura
+        self.unidades_escrita += escrita
+        self.chamadas[operacao] = self.chamadas.get(operacao, 0) + 1
+        if tabela is not None:
+            janela = tabela.consumo()
+            janela[1] += leitura
+            janela[2] += escrita
+
+    def zerar_contadores(self):
+        self.unidades_leitura = 0
+        self.unidades_escrita = 0
+        self.chamadas = {}
+        self.throttles = 0
+
+    def _verificar_capacidade(self, tabela, escrita=False):
+        """Levanta a exceção de throttling do borneo se a operação não cabe agora."""
+        excecao = WriteThrottlingException if escrita else ReadThrottlingException
+        if self.taxa_throttling and self._aleatorio.random() < self.taxa_throttling:
+            self.throttles += 1
+            raise excecao(f"Throttling simulado em {tabela.nome}")
+        if self.limitar_capacidade and tabela.limites:
+            janela = tabela.consumo()
+            if janela[2 if escrita else 1] >= tabela.limites[1 if escrita else 0]:
+                self.throttles += 1
+                raise excecao(f"Limite de unidades por segundo atingido em {tabela.nome}")
+
+    def _tabela(self, nome):
+        tabela = self.tabelas.get(nome)
+        if tabela is None:
+            raise TableNotFoundException(f"Tabela não encontrada: {nome}")
+        return tabela
+
+    # DDL
+
+    def table_request(self, request):
+        ddl = request.get_statement().strip()
+        with self.lock:
+            if m := _RE_CREATE_TABLE.match(ddl):
+                nome = m.group(1)
+                if nome not in self.tabelas:
+                    limites = request.get_table_limits()
+                    if limites is not None:
+                        limites = (limites.get_read_units(), limites.get_write_units())
+                    self.tabelas[nome] = _Tabela(
+                        nome, *_chave_primaria(m.group(3)), limites, timestamps=_timestamps(m.group(2))
+                    )
+            elif m := _RE_CREATE_INDEX.match(ddl):
+                tabela = self._tabela(m.group(3))
+                nome = m.group(2)
+                if nome in tabela.indices:
+                    if not m.group(1):
+                        raise IllegalArgumentException(f"Índice já existe: {nome}")
+                else:
+                    tabela.indices[nome] = tuple(c.strip() for c in m.group(4).split(","))
+                    tabela.entradas[nome] = {}
+                    for chave, (linha, _) in tabela.linhas.items():
+                        tabela.indexar(chave, linha)
+            elif m := _RE_ALTER_ADD.match(ddl):
+                tabela = self._tabela(m.group(1))
+                if m.group(3).upper() == "TIMESTAMP":
+                    tabela.timestamps[m.group(2)] = None
+            else:
+                raise IllegalArgumentException(f"DDL não suportada no handle local: {ddl[:60]}")
+        return _Resultado()
+
+    def do_table_request(self, request, timeout_ms, poll_interval_ms):
+        if self.latencia_ddl:
+            time.sleep(self.latencia_ddl)
+        return self.table_request(request)
+
+    # Leitura e escrita por chave
+
+    def _simular_rede(self):
+        if self.latencia:
+            time.sleep(self.latencia)
+
+    def get(self, request):
+        self._simular_rede()
+        with self.lock:
+            tabela = self._tabela(request.get_table_name())
+            self._verificar_capacidade(tabela)
+            encontrado = tabela.linhas.get(tabela.chave_de(request.get_key()))
+            if encontrado is None:
+                self._contar("get", leitura=1, tabela=tabela)
+                return _Resultado(leitura=1)
+            linha, versao = encontrado
+            unidades = _unidades(linha)
+            self._contar("get", leitura=unidades, tabela=tabela)
+            return _Resultado(valor=dict(linha), versao=versao, leitura=unidades)
+
+    def put(self, request):
+        self._simular_rede()
+        with self.lock:
+            tabela = self._tabela(request.get_table_name())
+            self._verificar_capacidade(tabela, escrita=True)
+            valor, chave = self._valor_put(tabela, request)
+            if not self._condicao_put(tabela, chave, request):
+                self._contar("put", leitura=1, tabela=tabela)
+                return _Resultado(leitura=1)
+
+            versao = tabela.gravar(chave, valor)
+            unidades = _unidades(valor) + len(tabela.indices)
+            self._contar("put", escrita=unidades, tabela=tabela)
+            return _Resultado(versao=versao, escrita=unidades)
+
+    def delete(self, request):
+        self._simular_rede()
+        with self.lock:
+            tabela = self._tabela(request.get_table_name())
+            self._verificar_capacidade(tabela, escrita=True)
+            chave = tabela.chave_de(request.get_key())
+            versao = request.get_match_version()
+            atual = tabela.linhas.get(chave)
+            if versao is not None and atual is not None and atual[1].get_bytes() != versao.get_bytes():
+                self._contar("delete", leitura=1, tabela=tabela)
+                return _Resultado(leitura=1, sucesso=False)
+            existente = tabela.apagar(chave)
+            if existente is None:
+                self._contar("delete", leitura=1, tabela=tabela)
+                return _Resultado(leitura=1, sucesso=False)
+
+            unidades = _unidades(existente[0]) + len(tabela.indices)
+            self._contar("delete", escrita=unidades, tabela=tabela)
+            return _Resultado(escrita=unidades, sucesso=True)
+
+    @staticmethod
+    def _valor_put(tabela, request):
+        valor = dict(request.get_value())
+        return valor, tabela.chave_de(valor)
+
+    @staticmethod
+    def _condicao_put(tabela, chave, request):
+        """False quando a opção do put (IF_ABSENT, IF_PRESENT, IF_VERSION) não é satisfeita."""
+        existente = tabela.linhas.get(chave)
+        opcao = request.get_option()
+        return not (
+            (opcao == PutOption.IF_ABSENT and existente is not None)
+            or (opcao == PutOption.IF_PRESENT and existente is None)
+            or (opcao == PutOption.IF_VERSION and (
+                existente is None or existente[1].get_bytes() != request.get_match_version().get_bytes()
+            ))
+        )
+
+    def write_multiple(self, request):
+        """
+        Vários puts numa única transação. Como na nuvem: no máximo 50 operações, todas da
+        mesma tabela, com a mesma shard key e sem repetir a chave primária. Se uma operação
+        com abort_if_unsuccessful falha, nada é gravado.
+        """
+        operacoes = request.get_operations()
+        if len(operacoes) > MAX_OPERACOES_LOTE:
+            raise BatchOperationNumberLimitException(f"Mais de {MAX_OPERACOES_LOTE} operações no lote")
+        self._simular_rede()
+        with self.lock:
+            tabela = self._tabela(request.get_table_name())
+            self._verificar_capacidade(tabela, escrita=True)
+
+            planejadas = []
+            for operacao in operacoes:
+                put = operacao.get_request()
+                if not isinstance(put, PutRequest):
+                    raise IllegalArgumentException("O handle local só aceita PutRequest em write_multiple")
+                valor, chave = self._valor_put(tabela, put)
+                planejadas.append((operacao, valor, chave, self._condicao_put(tabela, chave, put)))
+            chaves = [chave for _, _, chave, _ in planejadas]
+            if len({chave[:tabela.shard] for chave in chaves}) > 1:
+                raise IllegalArgumentException("Todas as operações do lote precisam ter a mesma shard key")
+            if len(set(chaves)) < len(chaves):
+                raise IllegalArgumentException("Chave primária repetida no lote")
+
+            resultado = WriteMultipleResult()
+            for indice, (operacao, _, _, ok) in enumerate(planejadas):
+                if not ok and operacao.is_abort_if_unsuccessful():
+                    resultado.set_failed_operation_index(indice)
+                    resultado.add_result(OperationResult().set_success(False))
+                    self._contar("write_multiple", leitura=1, tabela=tabela)
+                    return _custo(resultado, leitura=1)
+
+            escrita = 0
+            for _, valor, chave, ok in planejadas:
+                item = OperationResult().set_success(ok)
+                if ok:
+                    item.set_version(tabela.gravar(chave, valor))
+                    escrita += _unidades(valor) + len(tabela.indices)
+                resultado.add_result(item)
+            self._contar("write_multiple", escrita=escrita, tabela=tabela)
+            return _custo(resultado, escrita=escrita)
+
+    def prepare(self, request):
+        self._simular_rede()
+        sql = request.get_statement()
+        m = _RE_SELECT.match(_RE_DECLARE.sub("", sql).strip())
+        tabela = m.group(1) if m else None
+        preparado = PreparedStatement(sql, None, None, b"local:" + sql.encode(), None, 0, 0, None, None, tabela, 5)
+        self._contar("prepare", leitura=1)
+        resultado = _Resultado(leitura=1)
+        resultado.get_prepared_statement = lambda: preparado
+        return resultado
+
+    def query(self, request):
+        preparado = request.get_prepared_statement()
+        if preparado is not None:
+            sql, variaveis = preparado.get_sql_text(), preparado.get_variables() or {}
+        else:
+            sql, variaveis = request.get_statement(), {}
+
+        sql = _RE_DECLARE.sub("", sql).strip()
+        if _RE_UPDATE.match(sql):
+            self._simular_rede()
+            return self._update(sql, variaveis, request)
+
+        m = _RE_SELECT.match(sql)
+        if not m:
+            raise IllegalArgumentException(f"Consulta não suportada no handle local: {sql[:60]}")
+        self._simular_rede()
+
+        with self.lock:
+            tabela = self._tabela(m.group(1))
+            self._verificar_capacidade(tabela)
+            filtros = {}
+            if m.group(3):
+                for termo in re.split(r"\s+AND\s+", m.group(3), flags=re.I):
+                    igualdade = _RE_IGUALDADE.fullmatch(termo.strip())
+                    if not igualdade:
+                        raise IllegalArgumentException(f"Filtro não suportado no handle local: {termo}")
+                    filtros[igualdade.group(1)] = self._valor(igualdade.group(2), variaveis)
+            chaves, por_indice = self._candidatos(tabela, filtros)
+
+            inicio = int(request.get_cont_key() or 0)
+            limite = request.get_limit() or len(chaves)
+            resultados = []
+            leitura = 0
+            posicao = inicio
+            while posicao < len(chaves) and len(resultados) < limite:
+                linha = tabela.linhas[chaves[posicao]][0]
+                posicao += 1
+                leitura += _unidades(linha) + (1 if por_indice else 0)
+                if all(linha.get(col) == valor for col, valor in filtros.items()):
+                    resultados.append(dict(linha))
+            leitura = max(leitura, 1)
+
+            self._contar("query", leitura=leitura, tabela=tabela)
+
+        continuacao = bytearray(str(posicao).encode()) if posicao < len(chaves) else None
+        request.set_cont_key(continuacao)
+        return _Resultado(resultados=resultados, leitura=leitura, continuacao=continuacao)
+
+    def _update(self, sql, variaveis, request):
+        m = _RE_UPDATE.match(sql)
+        with self.lock:
+            tabela = self._tabela(m.group(1))
+            self._verificar_capacidade(tabela, escrita=True)
+            filtros = {}
+            for termo in re.split(r"\s+AND\s+", m.group(4), flags=re.I):
+                igualdade = _RE_IGUALDADE.fullmatch(termo.strip())
+                if not igualdade:
+                    raise IllegalArgumentException(f"Filtro não suportado no handle local: {termo}")
+                filtros[igualdade.group(1)] = self._valor(igualdade.group(2), variaveis)
+            if set(filtros) != set(tabela.chave):
+                raise IllegalArgumentException("UPDATE precisa da chave primária completa no WHERE")
+
+            chave = tuple(filtros[col] for col in tabela.chave)
+            existente = tabela.linhas.get(chave)
+            if existente is None:
+                self._contar("update", leitura=1, tabela=tabela)
+                request.set_cont_key(None)
+                return _Resultado(resultados=[{"NumRowsUpdated": 0}], leitura=1)
+
+            linha = copy.deepcopy(existente[0])
+            operacao = None
+            for clausula in self._dividir(m.group(3)):
+                partes = _RE_CLAUSULA.match(clausula.strip())
+                operacao = (partes.group(1) or operacao or "").upper()
+                coluna, filtro, expressao = partes.group(2), partes.group(3), partes.group(4)
+                if operacao == "SET":
+                    linha[coluna] = self._expressao(expressao, variaveis)
+                elif operacao == "ADD":
+                    linha.setdefault(coluna, []).append(self._expressao(expressao, variaveis))
+                elif operacao == "REMOVE" and filtro:
+                    elementos = linha.get(coluna) or []
+                    linha[coluna] = [
+                        e for pos, e in enumerate(elementos)
+                        if not self._filtro(filtro, e, pos, len(elementos), variaveis)
+                    ]
+                elif operacao == "REMOVE":
+                    linha.pop(coluna, None)
+                else:
+                    raise IllegalArgumentException(f"Cláusula não suportada no handle local: {clausula}")
+
+            leitura = _unidades(existente[0])
+            tabela.gravar(chave, linha)
+            escrita = _unidades(linha) + len(tabela.indices)
+            self._contar("update", leitura=leitura, escrita=escrita, tabela=tabela)
+        request.set_cont_key(None)
+        return _Resultado(resultados=[{"NumRowsUpdated": 1}], leitura=leitura, escrita=escrita)
+
+    @staticmethod
+    def _dividir(texto):
+        """Separa por vírgulas fora de colchetes e chaves."""
+        partes, atual, profundidade = [], "", 0
+        for caractere in texto:
+            if caractere in "[{":
+                profundidade += 1
+            elif caractere in "]}":
+                profundidade -= 1
+            if caractere == "," and profundidade == 0:
+                partes.append(atual)
+                atual = ""
+            else:
+                atual += caractere
+        partes.append(atual)
+        return partes
+
+    def _filtro(self, texto, elemento, posicao, tamanho, variaveis):
+        """Predicado de um filtro de array ([...] no REMOVE): termos ligados por OR."""
+        for termo in re.split(r"\s+OR\s+", texto.strip(), flags=re.I):
+            partes = _RE_TERMO_FILTRO.fullmatch(termo)
+            if not partes:
+                raise IllegalArgumentException(f"Filtro de array não suportado no handle local: {termo}")
+            alvo, campo, comparador, literal = partes.groups()
+            if alvo.lower() == "$pos":
+                esquerda = posicao
+            else:
+                esquerda = elemento.get(campo) if campo else elemento
+            direita = self._valor(literal, variaveis)
+            if "size(" in termo.lower():
+                direita = tamanho - direita
+            if isinstance(esquerda, datetime):
+                direita = _timestamp(direita)
+            if esquerda is not None and _COMPARADORES[comparador](esquerda, direita):
+                return True
+        return False
+
+    def _expressao(self, texto, variaveis):
+        texto = texto.strip()
+        if texto.startswith("{"):
+            construido = {}
+            for par in self._dividir(texto[1:-1]):
+                nome, _, valor = par.partition(":")
+                construido[nome.strip().strip('"')] = self._valor(valor.strip(), variaveis)
+            return construido
+        return self._valor(texto, variaveis)
+
+    @staticmethod
+    def _valor(literal, variaveis):
+        if literal.startswith("$"):
+            if literal not in variaveis:
+                raise IllegalArgumentException(f"Variável sem valor: {literal}")
+            return variaveis[literal]
+        if literal[0] in "'\"":
+            return literal[1:-1].replace("''", "'")
+        if literal.lower() in ("true", "false"):
+            return literal.lower() == "true"
+        return float(literal) if "." in literal else int(literal)
+
+    @staticmethod
+    def _candidatos(tabela, filtros):
+        """
+        Chaves a examinar e se vieram de índice: com a chave de shard inteira nos filtros,
+        só as linhas daquela partição; senão pelo índice que cobre os filtros; senão todas.
+        """
+        colunas_shard = tabela.chave[:tabela.shard]
+        if all(col in filtros for col in colunas_shard):
+            prefixo = tuple(filtros[col] for col in colunas_shard)
+            chaves = tabela.chaves_ordenadas()
+            inicio = bisect_left(chaves, prefixo)
+            fim = inicio
+            while fim < len(chaves) and chaves[fim][:len(prefixo)] == prefixo:
+                fim += 1
+            return chaves[inicio:fim], False
+        for nome, colunas in tabela.indices.items():
+            if filtros and all(col in filtros for col in colunas):
+                return sorted(tabela.entradas[nome].get(tuple(filtros[c] for c in colunas), ())), True
+        return tabela.chaves_ordenadas(), False
+
+    def close(self):
+        pass
@@ -0,0 +1,47 @@
+import os
+
+from borneo import DefaultRetryHandler, NoSQLHandle, NoSQLHandleConfig
+from borneo.exception import ThrottlingException
+from borneo.iam import SignatureProvider
+
+from app import config
+
+
+class ThrottlingRetryHandler(DefaultRetryHandler):
+    """
+    Não repete throttling dentro do borneo: a exceção sobe na hora para o AsyncHandle, que
+    espera e repete pelo CapacityGovernor (sem ocupar uma thread do pool dormindo). Os
+    outros erros retentáveis (ex.: SecurityInfoNotReadyException) seguem o padrão do borneo.
+    """
+
+    def do_retry(self, request, num_retried, re):
+        if isinstance(re, ThrottlingException):
+            return False
+        return super().do_retry(request, num_retried, re)
+
+
+def connect_oracle() -> NoSQLHandle:
+    """Abre o handle do Oracle NoSQL na nuvem com as credenciais ORACLE_* do ambiente."""
+    nosql_config = NoSQLHandleConfig(config.ORACLE_ENDPOINT)
+    nosql_config.set_default_compartment(config.ORACLE_COMPARTMENT_ID)
+    nosql_config.set_retry_handler(ThrottlingRetryHandler())
+
+    full_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', config.ORACLE_PRIVATE_KEY_FILE)
+
+    print(f"Procurando chave em: {full_path}")
+
+    # Ler o conteúdo do arquivo PEM
+    with open(full_path, 'r') as file:
+        private_key = file.read()
+
+    provider = SignatureProvider(
+        tenant_id=config.ORACLE_TENANT_ID,
+        user_id=config.ORACLE_USER_ID,
+        fingerprint=config.ORACLE_FINGERPRINT,
+        private_key=private_key
+    )
+
+    nosql_config.set_authorization_provider(provider)
+    handle = NoSQLHandle(nosql_config)
+    print("Conectado ao Oracle NoSQL!")
+    return handle
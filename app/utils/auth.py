@@ -1,21 +1,49 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, status, Depends, Header
 from fastapi.security import HTTPBearer
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+import asyncio
+import hashlib
+import hmac
+import multiprocessing
 import os
+import threading
+import time
+import uuid
+from app import config
+from app.utils.cache import CacheLRUTTL
 
 # Configurações
 SECRET_KEY = os.getenv("SECRET_KEY", "checkmen-mvp-saude-homem-2025-secret-key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+# Duração máxima de uma sessão, contada do login: o /auth/refresh não a estende além disso
+REFRESH_SESSION_MAX_DAYS = int(os.getenv("REFRESH_SESSION_MAX_DAYS", "30"))
+# Claims de tokens de acesso já verificados guardados em memória (cada entrada vale até o
+# exp do token); 0 desliga o cache e todo request verifica a assinatura
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+
+# Custo do sha256_crypt (535000 é o padrão do passlib). Hashes salvos com outro número de
+# rounds são refeitos com este valor no próximo login (verify_and_update)
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "535000"))
+# Processos dedicados a gerar/verificar hashes; 0 = threads do próprio processo
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
 
 # Constante para o limite de 72 bytes do bcrypt (não usado)
 BCRYPT_MAX_LENGTH = 72
 
 # 🟢 SOLUÇÃO FINAL: Usamos *apenas* sha256_crypt para máxima estabilidade
-pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["sha256_crypt"],
+    deprecated="auto",
+    sha256_crypt__default_rounds=PASSWORD_HASH_ROUNDS,
+    sha256_crypt__min_rounds=PASSWORD_HASH_ROUNDS,
+    sha256_crypt__max_rounds=PASSWORD_HASH_ROUNDS,
+)
 security = HTTPBearer()
 
 
@@ -31,6 +59,11 @@ class AuthUtils:
         # Se a senha foi salva com sha256_crypt, ela será verificada corretamente aqui.
         return pwd_context.verify(plain_password, hashed_password)
 
+    @staticmethod
+    def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verifica a senha e, se o hash usa um custo diferente do configurado, devolve o novo hash."""
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+
     @staticmethod
     def create_access_token(data: dict) -> str:
         """Cria token JWT de acesso"""
@@ -40,13 +73,30 @@ class AuthUtils:
         return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
     @staticmethod
-    def create_refresh_token(data: dict) -> str:
-        """Cria token JWT de atualização"""
+    def create_refresh_token(data: dict, auth_time: Optional[int] = None) -> str:
+        """
+        Cria token JWT de atualização, com um jti próprio para poder ser revogado, o iat
+        (comparado com o tokens_revoked_before do usuário) e o auth_time do login que
+        abriu a sessão: o exp nunca passa de auth_time + REFRESH_SESSION_MAX_DAYS.
+        """
         to_encode = data.copy()
-        expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-        to_encode.update({"exp": expire, "type": "refresh"})
+        now = int(time.time())
+        auth_time = now if auth_time is None else auth_time
+        expire = min(now + REFRESH_TOKEN_EXPIRE_DAYS * 86400, auth_time + REFRESH_SESSION_MAX_DAYS * 86400)
+        to_encode.update({
+            "exp": expire, "iat": now, "auth_time": auth_time, "type": "refresh", "jti": uuid.uuid4().hex,
+        })
         return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+    @staticmethod
+    def create_token_pair(user_id: str, auth_time: Optional[int] = None) -> Dict[str, str]:
+        """Par de tokens devolvido no login, no cadastro e no /auth/refresh (que mantém o auth_time)"""
+        return {
+            "access_token": AuthUtils.create_access_token({"sub": user_id}),
+            "refresh_token": AuthUtils.create_refresh_token({"sub": user_id}, auth_time),
+            "token_type": "bearer",
+        }
+
     @staticmethod
     def verify_token(token: str, expected_type: str = "access") -> dict:
         """Verifica e decodifica token JWT, esperando um tipo específico"""
@@ -66,14 +116,157 @@ class AuthUtils:
             )
 
 
+class PasswordHasher:
+    """
+    Executor dos hashes de senha. Cada hash custa dezenas de milissegundos de CPU; rodando
+    em processos separados ele não trava o event loop nem disputa o GIL com as requisições,
+    e vários logins usam vários núcleos ao mesmo tempo.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> Optional[ProcessPoolExecutor]:
+        # Criado no primeiro uso: os processos filhos importam este módulo e não devem abrir outro pool
+        if self._pool is None and self.workers > 0:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor(), func, *args)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(AuthUtils.hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(AuthUtils.verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        return await self._run(AuthUtils.verify_and_update_password, plain_password, hashed_password)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS)
+
+
+class RevokedTokens:
+    """
+    jti de refresh tokens que não valem mais (já trocados no /auth/refresh), em memória.
+
+    Cada entrada é o jti em 16 bytes e o exp do token: depois do exp o token já é recusado
+    pela assinatura, então a entrada sai na próxima limpeza, que roda quando o conjunto
+    dobra de tamanho desde a anterior. Fica no processo: com vários workers, um token
+    trocado em um ainda seria aceito uma vez em outro, e um restart esquece tudo (um token
+    já trocado volta a valer uma vez até o exp dele). Para cortar as sessões de um usuário
+    de verdade vale o tokens_revoked_before gravado no documento dele (ver
+    UserService.refresh_session), que sobrevive a restarts e é visto por todos os workers.
+    """
+
+    def __init__(self):
+        self._entradas: Dict[bytes, float] = {}
+        self._lock = threading.Lock()
+        self._limite_limpeza = 1024
+
+    def __len__(self):
+        return len(self._entradas)
+
+    @staticmethod
+    def _chave(jti: str) -> bytes:
+        try:
+            return uuid.UUID(hex=jti).bytes
+        except ValueError:
+            return jti.encode()
+
+    def revoke(self, jti: str, exp: float) -> bool:
+        """Revoga o jti; False se ele já estava revogado (token reutilizado)."""
+        chave = self._chave(jti)
+        with self._lock:
+            if chave in self._entradas:
+                return False
+            self._entradas[chave] = exp
+            if len(self._entradas) >= self._limite_limpeza:
+                agora = time.time()
+                self._entradas = {k: v for k, v in self._entradas.items() if v > agora}
+                self._limite_limpeza = max(1024, 2 * len(self._entradas))
+        return True
+
+    def is_revoked(self, jti: str) -> bool:
+        return self._chave(jti) in self._entradas
+
+
+revoked_refresh_tokens = RevokedTokens()
+
+# digest do token -> claims já verificados; a validade de cada entrada é o exp do token
+token_cache = CacheLRUTTL(TOKEN_CACHE_MAX_ENTRIES, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+def verify_access_token(token: str) -> dict:
+    """
+    Verifica o token de acesso, reaproveitando a verificação de um request anterior com o
+    mesmo token. A chave do cache é o hash do token inteiro (assinatura inclusa): um token
+    alterado nunca encontra a entrada do original.
+    """
+    if TOKEN_CACHE_MAX_ENTRIES <= 0:
+        return AuthUtils.verify_token(token, expected_type="access")
+    chave = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    payload = token_cache.obter(chave)
+    if payload is None:
+        payload = AuthUtils.verify_token(token, expected_type="access")
+        restante = payload.get("exp", 0) - time.time()
+        if restante > 0:
+            token_cache.guardar(chave, payload, ttl=restante)
+    return payload
+
+
+def refresh_issued_at(payload: dict) -> int:
+    """iat do refresh token; nos emitidos antes do claim existir, deduzido do exp."""
+    return payload.get("iat") or payload.get("exp", 0) - REFRESH_TOKEN_EXPIRE_DAYS * 86400
+
+
+def rotate_refresh_token(payload: dict) -> Dict[str, str]:
+    """
+    Troca um refresh token já verificado (payload de verify_token) por um novo par da
+    mesma sessão. O jti dele é revogado para não ser usado de novo; a sessão não passa de
+    REFRESH_SESSION_MAX_DAYS desde o login.
+    """
+    user_id, jti = payload.get("sub"), payload.get("jti")
+    auth_time = payload.get("auth_time") or refresh_issued_at(payload)
+    if (
+        not user_id or not jti
+        or time.time() >= auth_time + REFRESH_SESSION_MAX_DAYS * 86400
+        or not revoked_refresh_tokens.revoke(jti, payload.get("exp", 0))
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido ou expirado"
+        )
+    return AuthUtils.create_token_pair(user_id, auth_time)
+
+
 # Dependency para rotas protegidas
 async def get_current_user(token=Depends(security)):
     """Middleware para verificar autenticação"""
-    payload = AuthUtils.verify_token(token.credentials, expected_type="access")
+    payload = verify_access_token(token.credentials)
     user_id = payload.get("sub")
     if not user_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido"
         )
-    return user_id
\ No newline at end of file
+    return user_id
+
+
+async def require_admin(x_admin_key: Optional[str] = Header(None)):
+    """Protege as rotas /admin com a chave de ADMIN_API_KEY (rotas desligadas se ela não existe)"""
+    if not config.ADMIN_API_KEY or not x_admin_key or not hmac.compare_digest(x_admin_key, config.ADMIN_API_KEY):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso restrito à administração"
+        )
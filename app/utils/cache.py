@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class CacheLRUTTL:
+    """
+    Cache em memória limitado em número de entradas, com descarte do menos usado e
+    validade por entrada. Seguro para uso por várias threads.
+
+    Os contadores (acertos, faltas, descartes, expirados) ficam disponíveis em estatisticas().
+
+    Quem preenche o cache com o que acabou de ler da origem usa geracao() antes da leitura
+    e preencher() depois: se uma escrita (guardar/invalidar) tocou a chave nesse meio
+    tempo, o valor lido pode ser anterior a ela e é descartado.
+    """
+
+    def __init__(self, max_entradas: int, ttl: float):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # chave -> (valor, expira_em), do menos para o mais recentemente usado
+        self._entradas: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self.acertos = 0
+        self.faltas = 0
+        self.descartes = 0
+        self.expirados = 0
+        # Número da última escrita e, para as chaves escritas recentemente, o da última
+        # escrita de cada uma (limitado a max_entradas; o que sai conta em _esquecida)
+        self._escrita = 0
+        self._escritas: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._esquecida = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obter(self, chave: Hashable) -> Optional[Any]:
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.faltas += 1
+                return None
+            valor, expira_em = entrada
+            if expira_em <= agora:
+                del self._entradas[chave]
+                self.expirados += 1
+                self.faltas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return valor
+
+    def _registrar_escrita(self, chave: Hashable):
+        self._escrita += 1
+        self._escritas[chave] = self._escrita
+        self._escritas.move_to_end(chave)
+        while len(self._escritas) > self.max_entradas:
+            self._esquecida = self._escritas.popitem(last=False)[1]
+
+    def _inserir(self, chave: Hashable, valor: Any, ttl: Optional[float]):
+        self._entradas[chave] = (valor, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._entradas.move_to_end(chave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+            self.descartes += 1
+
+    def guardar(self, chave: Hashable, valor: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._registrar_escrita(chave)
+            self._inserir(chave, valor, ttl)
+
+    def geracao(self) -> int:
+        """Marca a ser passada a preencher(), tomada antes de ler o valor na origem."""
+        with self._lock:
+            return self._escrita
+
+    def preencher(self, chave: Hashable, valor: Any, geracao: int, ttl: Optional[float] = None) -> bool:
+        """
+        Guarda um valor lido da origem, a menos que a chave tenha sido escrita depois de
+        `geracao` (ou que isso não dê mais para saber). Retorna se guardou.
+        """
+        with self._lock:
+            if geracao < self._esquecida or self._escritas.get(chave, 0) > geracao:
+                return False
+            self._inserir(chave, valor, ttl)
+            return True
+
+    def invalidar(self, chave: Hashable):
+        with self._lock:
+            self._registrar_escrita(chave)
+            self._entradas.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._escrita += 1
+            self._esquecida = self._escrita
+            self._escritas.clear()
+            self._entradas.clear()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        consultas = self.acertos + self.faltas
+        return {
+            "entradas": len(self._entradas),
+            "max_entradas": self.max_entradas,
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "descartes": self.descartes,
+            "expirados": self.expirados,
+            "taxa_acerto": round(self.acertos / consultas, 4) if consultas else 0.0,
+        }
@@ -0,0 +1,84 @@
+import gzip
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele só servimos gzip
+    brotli = None
+
+
+class RespostaPronta:
+    """
+    Corpo JSON serializado uma única vez, com as versões comprimidas e um ETag fraco.
+
+    `campo_variavel` (ex.: idadeSnapshot) fica fora do corpo serializado e é acrescentado
+    no fim a cada resposta; as versões comprimidas são refeitas só quando o valor dele
+    muda. Por isso o ETag é fraco (W/): identifica o conteúdo, não os bytes, que também
+    variam com a codificação.
+    """
+
+    __slots__ = ("prefixo", "campo_variavel", "etag", "_valor", "_variantes")
+
+    def __init__(self, conteudo: Dict[str, Any], campo_variavel: Optional[str] = None):
+        corpo = json.dumps(conteudo, ensure_ascii=False, separators=(",", ":")).encode()
+        self.etag = f'W/"{hashlib.sha1(corpo).hexdigest()[:20]}"'
+        # Sem o "}" final quando há campo variável, para acrescentá-lo sem serializar de novo
+        self.prefixo = corpo[:-1] if campo_variavel else corpo
+        self.campo_variavel = campo_variavel
+        self._valor: Any = None
+        self._variantes: Optional[Dict[Optional[str], bytes]] = None
+
+    def _corpo(self, valor: Any) -> Dict[Optional[str], bytes]:
+        if self._variantes is None or valor != self._valor:
+            corpo = self.prefixo
+            if self.campo_variavel:
+                sufixo = json.dumps({self.campo_variavel: valor}, separators=(",", ":")).encode()
+                corpo += b"," + sufixo[1:] if len(self.prefixo) > 1 else sufixo[1:]
+            self._valor, self._variantes = valor, {None: corpo}
+        return self._variantes
+
+    def codificada(self, accept_encoding: Optional[str], valor: Any = None):
+        """
+        Escolhe a melhor codificação aceita pelo cliente: (bytes, Content-Encoding ou None).
+        `valor` é o do campo variável nesta resposta.
+        """
+        variantes = self._corpo(valor)
+        aceitas = _codificacoes_aceitas(accept_encoding)
+        if brotli is not None and "br" in aceitas:
+            codificacao = "br"
+        elif "gzip" in aceitas:
+            codificacao = "gzip"
+        else:
+            return variantes[None], None
+        if codificacao not in variantes:
+            corpo = variantes[None]
+            variantes[codificacao] = (
+                brotli.compress(corpo, quality=5) if codificacao == "br"
+                else gzip.compress(corpo, compresslevel=6, mtime=0)
+            )
+        return variantes[codificacao], codificacao
+
+
+def _codificacoes_aceitas(accept_encoding: Optional[str]):
+    aceitas = set()
+    for parte in (accept_encoding or "").split(","):
+        nome, _, parametros = parte.strip().partition(";")
+        if parametros.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        aceitas.add(nome.strip().lower())
+    return aceitas
+
+
+def etag_confere(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    True se o If-None-Match do cliente já contém o ETag atual (responder 304). Comparação
+    fraca, como manda o If-None-Match: W/"x" e "x" conferem.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    atual = etag.removeprefix("W/")
+    return any(valor.strip().removeprefix("W/") == atual for valor in if_none_match.split(","))
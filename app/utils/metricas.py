@@ -0,0 +1,217 @@
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Iterable, Optional, Tuple
+
+# Limites (em segundos) dos baldes do histograma de latência das chamadas ao banco
+BALDES_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Operação lógica em andamento (ex.: "get_user_by_email"); vale para toda chamada ao banco
+# feita dentro dela, inclusive em outras corrotinas da mesma tarefa
+_operacao_atual: ContextVar[Optional[str]] = ContextVar("operacao_db", default=None)
+
+
+def operacao_atual() -> Optional[str]:
+    return _operacao_atual.get()
+
+
+@contextmanager
+def operacao(nome: str):
+    """Rotula as chamadas ao banco feitas dentro do bloco com a operação `nome`."""
+    token = _operacao_atual.set(nome)
+    try:
+        yield
+    finally:
+        _operacao_atual.reset(token)
+
+
+def instrumentar(nome: str):
+    """Decorator de corrotina: as chamadas ao banco feitas por ela contam como a operação `nome`."""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with operacao(nome):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _rotulos(nomes: Tuple[str, ...], valores: Tuple[str, ...], extra: str = "") -> str:
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor: float) -> str:
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """Contador monotônico com rótulos, no formato de texto do Prometheus."""
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Tuple[str, ...] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self._valores: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def somar(self, *valores_rotulos: str, valor: float = 1):
+        with self._lock:
+            self._valores[valores_rotulos] = self._valores.get(valores_rotulos, 0) + valor
+
+    def valor(self, *valores_rotulos: str) -> float:
+        return self._valores.get(valores_rotulos, 0)
+
+    def linhas(self) -> Iterable[str]:
+        yield f"# HELP {self.nome} {self.ajuda}"
+        yield f"# TYPE {self.nome} counter"
+        with self._lock:
+            itens = sorted(self._valores.items())
+        for valores_rotulos, valor in itens:
+            yield f"{self.nome}{_rotulos(self.rotulos, valores_rotulos)} {_numero(valor)}"
+
+
+class Registro:
+    """Conjunto de métricas exportado junto em /metrics; cada uma gera suas linhas em linhas()."""
+
+    def __init__(self):
+        self._metricas = []
+
+    def registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def exportar(self) -> str:
+        return "\n".join(linha for metrica in self._metricas for linha in metrica.linhas()) + "\n"
+
+
+class _SerieBanco:
+    """Acumulados de uma (operação, chamada); o último balde é o +Inf."""
+
+    __slots__ = ("baldes", "soma", "leitura", "escrita", "linhas", "throttles")
+
+    def __init__(self):
+        self.baldes = [0] * (len(BALDES_LATENCIA) + 1)
+        self.soma = 0.0
+        self.leitura = 0
+        self.escrita = 0
+        self.linhas = 0
+        self.throttles = 0
+
+    def copia(self):
+        copia = _SerieBanco()
+        copia.baldes = list(self.baldes)
+        copia.soma, copia.leitura, copia.escrita = self.soma, self.leitura, self.escrita
+        copia.linhas, copia.throttles = self.linhas, self.throttles
+        return copia
+
+
+class MetricasBanco:
+    """
+    Métricas das chamadas ao Oracle NoSQL, por operação lógica e método do handle:
+    latência, unidades de leitura/escrita informadas pelo borneo, linhas e throttling.
+
+    Cada chamada atualiza uma única série (um lock, um acesso ao dicionário): o registro
+    custa poucos microssegundos e pode ficar ligado em produção.
+    """
+
+    ROTULOS = ("operation", "call")
+
+    def __init__(self):
+        self._series: Dict[Tuple[str, str], _SerieBanco] = {}
+        self._lock = threading.Lock()
+        self.erros = Contador("nosql_errors_total", "Chamadas que terminaram com erro, por tipo", self.ROTULOS + ("error",))
+
+    def _serie(self, chave: Tuple[str, str]) -> _SerieBanco:
+        serie = self._series.get(chave)
+        if serie is None:
+            serie = self._series.setdefault(chave, _SerieBanco())
+        return serie
+
+    def sucesso(self, chamada: str, duracao: float, resultado):
+        chave = (_operacao_atual.get() or chamada, chamada)
+        balde = bisect_left(BALDES_LATENCIA, duracao)
+        # Resultados de DDL também têm get_read_units, mas com os limites da tabela, não consumo
+        dados = chamada in _CHAMADAS_DE_DADOS
+        leitura = (resultado.get_read_units() or 0) if dados else 0
+        escrita = (resultado.get_write_units() or 0) if dados else 0
+        linhas = _linhas(chamada, resultado)
+        with self._lock:
+            serie = self._serie(chave)
+            serie.baldes[balde] += 1
+            serie.soma += duracao
+            serie.leitura += leitura
+            serie.escrita += escrita
+            serie.linhas += linhas
+
+    def falha(self, chamada: str, duracao: float, erro: BaseException, throttle: bool):
+        chave = (_operacao_atual.get() or chamada, chamada)
+        with self._lock:
+            serie = self._serie(chave)
+            serie.baldes[bisect_left(BALDES_LATENCIA, duracao)] += 1
+            serie.soma += duracao
+            serie.throttles += 1 if throttle else 0
+        self.erros.somar(*chave, type(erro).__name__)
+
+    def series(self) -> Dict[Tuple[str, str], _SerieBanco]:
+        with self._lock:
+            return {chave: serie.copia() for chave, serie in sorted(self._series.items())}
+
+    def linhas(self) -> Iterable[str]:
+        series = self.series()
+        yield "# HELP nosql_call_duration_seconds Latência das chamadas ao banco, incluindo a fila do pool"
+        yield "# TYPE nosql_call_duration_seconds histogram"
+        for chave, serie in series.items():
+            acumulado = 0
+            for limite, contagem in zip(BALDES_LATENCIA + (float("inf"),), serie.baldes):
+                acumulado += contagem
+                le = "+Inf" if limite == float("inf") else repr(limite)
+                rotulos = _rotulos(self.ROTULOS, chave, f'le="{le}"')
+                yield f"nosql_call_duration_seconds_bucket{rotulos} {acumulado}"
+            yield f"nosql_call_duration_seconds_sum{_rotulos(self.ROTULOS, chave)} {_numero(serie.soma)}"
+            yield f"nosql_call_duration_seconds_count{_rotulos(self.ROTULOS, chave)} {acumulado}"
+        for nome, campo, ajuda in (
+            ("nosql_read_units_total", "leitura", "Unidades de leitura consumidas"),
+            ("nosql_write_units_total", "escrita", "Unidades de escrita consumidas"),
+            ("nosql_rows_total", "linhas", "Linhas lidas (get/query) ou gravadas (put/update/write_multiple)"),
+            ("nosql_throttles_total", "throttles", "Chamadas recusadas por limite de capacidade da tabela"),
+        ):
+            yield f"# HELP {nome} {ajuda}"
+            yield f"# TYPE {nome} counter"
+            for chave, serie in series.items():
+                yield f"{nome}{_rotulos(self.ROTULOS, chave)} {_numero(getattr(serie, campo))}"
+        yield from self.erros.linhas()
+
+
+_CHAMADAS_DE_DADOS = ("get", "put", "delete", "query", "prepare", "write_multiple")
+
+
+def _linhas(chamada: str, resultado) -> int:
+    if chamada == "get":
+        return 1 if resultado.get_value() is not None else 0
+    if chamada == "put":
+        return 1 if resultado.get_version() is not None else 0
+    if chamada == "delete":
+        return 1 if resultado.get_success() else 0
+    if chamada == "query":
+        resultados = resultado.get_results()
+        # UPDATE devolve uma linha só com a contagem de linhas alteradas
+        if len(resultados) == 1 and "NumRowsUpdated" in resultados[0]:
+            return resultados[0]["NumRowsUpdated"]
+        return len(resultados)
+    if chamada == "write_multiple":
+        return sum(1 for item in resultado.get_results() if item.get_success()) if resultado.get_success() else 0
+    return 0
+
+
+# Registro do processo, servido em /metrics
+registro = Registro()
+metricas_banco = registro.registrar(MetricasBanco())
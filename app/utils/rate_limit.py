@@ -0,0 +1,240 @@
+import math
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from app import config
+from app.utils.metricas import Contador, registro
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # redis é opcional: só o backend "redis" precisa dele
+    redis_asyncio = None
+
+
+class Regra(NamedTuple):
+    por_ip: int
+    por_identificador: int
+    janela: float
+
+
+def carregar_regras(texto: str) -> Dict[str, Regra]:
+    """Lê RATE_LIMIT_RULES ("login=30,5/60;check-email=30,10/60")."""
+    regras = {}
+    for item in filter(None, (parte.strip() for parte in texto.split(";"))):
+        try:
+            rota, valor = item.split("=")
+            limites, janela = valor.split("/")
+            por_ip, por_identificador = limites.split(",")
+            regras[rota.strip()] = Regra(int(por_ip), int(por_identificador), float(janela))
+        except ValueError:
+            raise ValueError(f"Regra de RATE_LIMIT_RULES inválida: {item!r} (use rota=por_ip,por_identificador/janela)")
+    return regras
+
+
+def _estimativa(anterior: int, atual: int, decorrido: float, janela: float) -> float:
+    """Requests na última `janela` segundos, supondo a janela anterior distribuída por igual."""
+    return anterior * (1 - decorrido / janela) + atual
+
+
+def _espera(anterior: int, atual: int, decorrido: float, janela: float, limite: int) -> int:
+    """Segundos até a estimativa cair abaixo do limite (Retry-After)."""
+    if atual < limite and anterior:
+        segundos = janela * (1 - (limite - atual) / anterior) - decorrido
+    else:
+        # Só a janela atual já passa do limite: espera ela virar a anterior e perder peso
+        segundos = (janela - decorrido) + janela * (1 - limite / atual)
+    return max(1, math.ceil(segundos))
+
+
+class _Contagem:
+    """Dois contadores por chave: a janela fixa atual e a anterior."""
+
+    __slots__ = ("indice", "anterior", "atual")
+
+    def __init__(self, indice: int):
+        self.indice = indice
+        self.anterior = 0
+        self.atual = 0
+
+
+class MemoryBackend:
+    """
+    Contadores de janela deslizante no próprio processo. A janela é aproximada por duas
+    janelas fixas (a atual e a anterior, ponderada pelo quanto dela ainda cabe na janela
+    deslizante): memória constante por chave, sem guardar o horário de cada request.
+
+    Chaves sem request há duas janelas são descartadas numa varredura que roda no máximo
+    a cada `intervalo_limpeza` segundos.
+    """
+
+    def __init__(self, intervalo_limpeza: float = 60.0):
+        self._contagens: Dict[Tuple[str, float], _Contagem] = {}
+        self._lock = threading.Lock()
+        self.intervalo_limpeza = intervalo_limpeza
+        self._proxima_limpeza = time.monotonic() + intervalo_limpeza
+
+    def __len__(self):
+        return len(self._contagens)
+
+    def _limpar(self, agora: float):
+        self._contagens = {
+            chave: contagem for chave, contagem in self._contagens.items()
+            if agora // chave[1] - contagem.indice < 2
+        }
+        self._proxima_limpeza = agora + self.intervalo_limpeza
+
+    async def hit(self, chave: str, limite: int, janela: float) -> Optional[int]:
+        """Conta um request; devolve None se passou, ou o Retry-After em segundos."""
+        agora = time.monotonic()
+        indice = int(agora // janela)
+        with self._lock:
+            if agora >= self._proxima_limpeza:
+                self._limpar(agora)
+            contagem = self._contagens.get((chave, janela))
+            if contagem is None:
+                contagem = self._contagens[(chave, janela)] = _Contagem(indice)
+            elif contagem.indice != indice:
+                # Virou a janela: a atual passa a ser a anterior (ou zera, se pulou mais de uma)
+                contagem.anterior = contagem.atual if indice - contagem.indice == 1 else 0
+                contagem.atual = 0
+                contagem.indice = indice
+            decorrido = agora - indice * janela
+            if _estimativa(contagem.anterior, contagem.atual, decorrido, janela) >= limite:
+                return _espera(contagem.anterior, contagem.atual, decorrido, janela, limite)
+            contagem.atual += 1
+        return None
+
+
+# Mesma conta do MemoryBackend, atômica no servidor: KEYS = (janela atual, anterior),
+# ARGV = (limite, peso da anterior, validade em segundos)
+_SCRIPT_REDIS = """
+local atual = tonumber(redis.call('GET', KEYS[1]) or '0')
+local anterior = tonumber(redis.call('GET', KEYS[2]) or '0')
+if anterior * tonumber(ARGV[2]) + atual >= tonumber(ARGV[1]) then
+    return {0, atual, anterior}
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return {1, atual + 1, anterior}
+"""
+
+
+class RedisBackend:
+    """
+    Contadores no Redis, compartilhados por todos os workers. Cada janela fixa é uma chave
+    com validade de duas janelas, então o próprio Redis faz a limpeza. Se o Redis cair,
+    os requests passam (o limite some, a autenticação continua).
+    """
+
+    def __init__(self, url: str):
+        if redis_asyncio is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis precisa do pacote redis (pip install redis)")
+        self._cliente = redis_asyncio.from_url(url)
+        self._script = self._cliente.register_script(_SCRIPT_REDIS)
+
+    async def hit(self, chave: str, limite: int, janela: float) -> Optional[int]:
+        agora = time.time()
+        indice = int(agora // janela)
+        decorrido = agora - indice * janela
+        try:
+            passou, atual, anterior = await self._script(
+                keys=[f"rl:{chave}:{janela:g}:{indice}", f"rl:{chave}:{janela:g}:{indice - 1}"],
+                args=[limite, 1 - decorrido / janela, math.ceil(2 * janela)],
+            )
+        except Exception as e:
+            print(f"Rate limit indisponível (Redis): {e}")
+            return None
+        return None if passou else _espera(int(anterior), int(atual), decorrido, janela, limite)
+
+
+def open_backend(backend: Optional[str] = None):
+    backend = (backend or config.RATE_LIMIT_BACKEND).lower()
+    if backend == "memory":
+        return MemoryBackend()
+    if backend == "redis":
+        return RedisBackend(config.RATE_LIMIT_REDIS_URL)
+    raise ValueError(f"RATE_LIMIT_BACKEND desconhecido: {backend!r} (use memory ou redis)")
+
+
+class RateLimiter:
+    """Aplica as regras por rota: um contador por IP e outro por identificador."""
+
+    def __init__(self, regras: Dict[str, Regra], backend=None):
+        self.regras = regras
+        self._backend = backend
+        self.recusados = Contador(
+            "http_rate_limited_total", "Requests recusados com 429, por rota e tipo de limite", ("route", "key")
+        )
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = open_backend()
+        return self._backend
+
+    @backend.setter
+    def backend(self, valor):
+        self._backend = valor
+
+    async def check(self, rota: str, ip: str, identificador: Optional[str]) -> Optional[int]:
+        """None se o request pode seguir; senão, o Retry-After do limite estourado."""
+        regra = self.regras.get(rota)
+        if regra is None:
+            return None
+        if regra.por_ip > 0:
+            espera = await self.backend.hit(f"{rota}:ip:{ip}", regra.por_ip, regra.janela)
+            if espera is not None:
+                self.recusados.somar(rota, "ip")
+                return espera
+        if regra.por_identificador > 0 and identificador:
+            espera = await self.backend.hit(f"{rota}:id:{identificador}", regra.por_identificador, regra.janela)
+            if espera is not None:
+                self.recusados.somar(rota, "identifier")
+                return espera
+        return None
+
+
+rate_limiter = RateLimiter(carregar_regras(config.RATE_LIMIT_RULES))
+registro.registrar(rate_limiter.recusados)
+
+
+def client_ip(request: Request) -> str:
+    """
+    IP do cliente. Com RATE_LIMIT_TRUST_PROXY, o endereço que o proxy mais externo dos
+    RATE_LIMIT_PROXY_HOPS confiáveis viu em X-Forwarded-For, contado a partir da direita:
+    os endereços à esquerda dele vêm do próprio cliente e trocá-los não muda a chave.
+    """
+    if config.RATE_LIMIT_TRUST_PROXY:
+        enderecos = [e.strip() for e in request.headers.get("x-forwarded-for", "").split(",") if e.strip()]
+        if enderecos:
+            return enderecos[-min(config.RATE_LIMIT_PROXY_HOPS, len(enderecos))]
+    return request.client.host if request.client else "desconhecido"
+
+
+def rate_limit(rota: str, campo: str):
+    """
+    Dependency das rotas caras de /auth: conta o request pelo IP e pelo `campo` do corpo
+    JSON (email ou identificador, sem diferenciar maiúsculas) e responde 429 com
+    Retry-After quando a regra de `rota` em RATE_LIMIT_RULES estoura.
+    """
+    async def dependency(request: Request):
+        if not config.RATE_LIMIT_ENABLED:
+            return
+        try:
+            corpo = await request.json()
+        except ValueError:
+            corpo = None
+        identificador = corpo.get(campo) if isinstance(corpo, dict) else None
+        if identificador is not None:
+            identificador = str(identificador).strip().lower()
+        espera = await rate_limiter.check(rota, client_ip(request), identificador)
+        if espera is not None:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Muitas tentativas. Tente novamente mais tarde.",
+                headers={"Retry-After": str(espera)},
+            )
+    return dependency
@@ -0,0 +1,20 @@
+import re
+import unicodedata
+
+_RE_NAO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+
+
+def dobrar_acentos(texto: str) -> str:
+    """Remove acentos e caixa: 'Próstata' -> 'prostata'."""
+    decomposto = unicodedata.normalize('NFKD', texto.casefold())
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def chave_texto(texto: str) -> str:
+    """Forma canônica de um texto para comparação (sem acento, caixa ou pontuação)."""
+    return _RE_NAO_ALFANUMERICO.sub(' ', dobrar_acentos(texto)).strip()
+
+
+def normalizar_nome(nome: str) -> str:
+    """Nome como é indexado para login: sem diferença de caixa nem de espaços extras."""
+    return ' '.join(nome.split()).casefold()
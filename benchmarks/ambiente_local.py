@@ -0,0 +1,26 @@
+"""
+Faz o app rodar contra o backend de armazenamento local (STORAGE_BACKEND=local),
+sem credenciais da Oracle Cloud.
+
+Precisa ser chamado antes de qualquer import de app.config (que lê o ambiente na importação).
+"""
+import os
+
+
+def usar_handle_local(latencia_ddl=0.0):
+    """Liga o backend local e devolve o handle em memória que o app vai usar."""
+    os.environ["STORAGE_BACKEND"] = "local"
+    # O handle em memória começa vazio: a DDL precisa rodar mesmo com um cache de schema no disco
+    os.environ.setdefault("SCHEMA_CACHE_FILE", "")
+    # O handle local não cobra capacidade por padrão; sem isso o governador limitaria os
+    # benchmarks às unidades da tabela na nuvem (bench_capacidade liga os dois)
+    os.environ.setdefault("DB_CAPACITY_GOVERNOR", "false")
+    # Os benchmarks repetem logins do mesmo usuário e IP: sem isso o limite de requests os barraria
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    # Notificações vão para o LocalMessaging em memória, não para o FCM
+    os.environ.setdefault("MESSAGING_BACKEND", "local")
+
+    from app.database import db
+
+    db.handle.latencia_ddl = latencia_ddl
+    return db.handle
@@ -0,0 +1,86 @@
+"""
+Teste de carga de GET /auth/me com várias requisições simultâneas.
+
+O handle em memória simula a latência do Oracle NoSQL bloqueando a thread (como o borneo).
+"bloqueante" chama o handle direto no event loop, como o UserService fazia antes do
+AsyncHandle; "pool de threads" é o AsyncHandle atual. Com o primeiro a vazão fica presa
+em ~1/latência; com o segundo cresce com a concorrência até o tamanho do pool.
+
+    python -m benchmarks.bench_auth_me_concorrencia [--latencia-ms 20]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.ambiente_local import usar_handle_local
+
+handle = usar_handle_local()
+
+import httpx  # noqa: E402
+from borneo import PutRequest  # noqa: E402
+
+from app import database  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services import user_service as user_service_module  # noqa: E402
+from app.utils.auth import AuthUtils  # noqa: E402
+
+
+class ChamadaBloqueante:
+    """Mesma interface do AsyncHandle, mas executando no próprio event loop."""
+
+    async def get(self, request, timeout=None):
+        return database.db.handle.get(request)
+
+    async def put(self, request, timeout=None):
+        return database.db.handle.put(request)
+
+    async def query(self, request, timeout=None):
+        return database.db.handle.query(request)
+
+
+async def _carga(client, token, concorrencia, requisicoes):
+    fila = iter(range(requisicoes))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def trabalhador():
+        for _ in fila:
+            resposta = await client.get("/auth/me", headers=headers)
+            assert resposta.status_code == 200, resposta.text
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    return requisicoes / (time.perf_counter() - inicio)
+
+
+async def main(latencia_ms, requisicoes, niveis):
+    service = user_service_module.user_service
+    await service.ensure_schema()
+    handle.put(PutRequest().set_table_name(service.table_name).set_value({
+        "user_id": "usuario-carga", "name": "Carga", "name_normalized": "carga",
+        "email": "carga@exemplo.com", "password_hash": "x", "security_word": "y",
+        "device_tokens": [], "is_active": True,
+        "created_at": "2025-01-01T00:00:00", "updated_at": "2025-01-01T00:00:00",
+    }))
+    handle.latencia = latencia_ms / 1000
+    token = AuthUtils.create_access_token({"sub": "usuario-carga"})
+
+    modos = {"bloqueante": ChamadaBloqueante(), "pool de threads": database.async_handle}
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as client:
+        print(f"latência simulada do banco: {latencia_ms} ms")
+        print(f"{'concorrência':>12} " + " ".join(f"{nome:>18}" for nome in modos))
+        for concorrencia in niveis:
+            linha = []
+            for modo in modos.values():
+                user_service_module.async_handle = modo
+                linha.append(await _carga(client, token, concorrencia, requisicoes))
+            print(f"{concorrencia:>12} " + " ".join(f"{req_s:>14.0f} r/s" for req_s in linha))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latencia-ms", type=float, default=20)
+    parser.add_argument("--requisicoes", type=int, default=400)
+    parser.add_argument("--concorrencia", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+    asyncio.run(main(args.latencia_ms, args.requisicoes, args.concorrencia))
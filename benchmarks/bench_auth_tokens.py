@@ -0,0 +1,117 @@
+"""
+Custo da autenticação por request e da renovação da sessão.
+
+1. get_current_user com e sem o cache de claims verificados, para `--usuarios` tokens
+   diferentes usados em rodízio (cada usuário faz vários requests com o mesmo token).
+2. Renovação da sessão quando o token de acesso expira: POST /auth/login (hash de senha,
+   como os clientes faziam antes, sem endpoint de refresh) contra POST /auth/refresh
+   (só JWT), com `--concorrencia` clientes simultâneos. No fim, quantos logins por dia
+   cada usuário ativo faz em cada caso.
+
+    python -m benchmarks.bench_auth_tokens [--rounds 100000] [--usuarios 1000]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+
+async def _auth_por_request(auth, tokens, requests):
+    from fastapi.security import HTTPAuthorizationCredentials
+
+    credenciais = [HTTPAuthorizationCredentials(scheme="Bearer", credentials=t) for t in tokens]
+    inicio = time.perf_counter()
+    for i in range(requests):
+        await auth.get_current_user(credenciais[i % len(credenciais)])
+    return (time.perf_counter() - inicio) / requests * 1e6
+
+
+async def _renovacoes(client, concorrencia, total, renovar):
+    fila = asyncio.Queue()
+    for i in range(total):
+        fila.put_nowait(i)
+
+    async def cliente():
+        while not fila.empty():
+            fila.get_nowait()
+            await renovar(client)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(concorrencia)))
+    return total / (time.perf_counter() - inicio)
+
+
+async def main(usuarios, requests, concorrencia, renovacoes):
+    import httpx
+    from borneo import PutRequest
+
+    from app.main import app
+    from app.services import user_service as user_service_module
+    from app.utils import auth
+
+    tokens = [auth.AuthUtils.create_access_token({"sub": f"usuario-{i}"}) for i in range(usuarios)]
+    print(f"1. get_current_user, {usuarios} tokens em rodízio, {requests} requests")
+    limite = auth.TOKEN_CACHE_MAX_ENTRIES
+    auth.TOKEN_CACHE_MAX_ENTRIES = 0
+    sem_cache = await _auth_por_request(auth, tokens, requests)
+    auth.TOKEN_CACHE_MAX_ENTRIES = limite
+    auth.token_cache.limpar()
+    com_cache = await _auth_por_request(auth, tokens, requests)
+    print(f"  sem cache  {sem_cache:7.1f} µs/request")
+    print(f"  com cache  {com_cache:7.1f} µs/request  (acertos: {auth.token_cache.estatisticas()['taxa_acerto']:.1%})")
+
+    service = user_service_module.user_service
+    await service.ensure_schema()
+    handle.put(PutRequest().set_table_name(service.table_name).set_value({
+        "user_id": "usuario-bench", "name": "Bench", "name_normalized": "bench",
+        "email": "bench@exemplo.com", "password_hash": auth.AuthUtils.hash_password("senha-bench"),
+        "security_word": "x", "device_tokens": [], "is_active": True,
+        "created_at": "2025-01-01T00:00:00", "updated_at": "2025-01-01T00:00:00",
+    }))
+
+    async def login(client):
+        resposta = await client.post("/auth/login", json={"identifier": "bench@exemplo.com", "password": "senha-bench"})
+        assert resposta.status_code == 200, resposta.text
+
+    refresh_tokens = []
+
+    async def refresh(client):
+        token = refresh_tokens.pop()
+        resposta = await client.post("/auth/refresh", json={"refresh_token": token})
+        assert resposta.status_code == 200, resposta.text
+        # O token trocado não vale mais
+        reuso = await client.post("/auth/refresh", json={"refresh_token": token})
+        assert reuso.status_code == 401, reuso.text
+
+    print(f"\n2. renovação da sessão, {concorrencia} clientes simultâneos")
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as client:
+        await login(client)  # sobe os processos do hash antes de medir
+        por_login = await _renovacoes(client, concorrencia, renovacoes, login)
+        refresh_tokens.extend(auth.AuthUtils.create_refresh_token({"sub": "usuario-bench"}) for _ in range(renovacoes * 20))
+        por_refresh = await _renovacoes(client, concorrencia, renovacoes * 20, refresh)
+    auth.password_hasher.close()
+    print(f"  POST /auth/login    {por_login:8.1f}/s")
+    print(f"  POST /auth/refresh  {por_refresh:8.1f}/s  (cada um com a tentativa de reuso recusada)")
+
+    por_dia_antes = 24 * 60 / auth.ACCESS_TOKEN_EXPIRE_MINUTES
+    por_dia_depois = 1 / auth.REFRESH_SESSION_MAX_DAYS
+    print(f"\n  logins por usuário ativo o dia todo, token de acesso de {auth.ACCESS_TOKEN_EXPIRE_MINUTES} min:")
+    print(f"    sem refresh  {por_dia_antes:6.1f}/dia")
+    print(f"    com refresh  {por_dia_depois:6.2f}/dia (um a cada {auth.REFRESH_SESSION_MAX_DAYS} dias, o teto da sessão)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=100000)
+    parser.add_argument("--usuarios", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--renovacoes", type=int, default=64)
+    args = parser.parse_args()
+    # O custo precisa estar no ambiente antes do import: os processos filhos também o leem
+    os.environ["PASSWORD_HASH_ROUNDS"] = str(args.rounds)
+    from benchmarks.ambiente_local import usar_handle_local
+
+    handle = usar_handle_local()
+    asyncio.run(main(args.usuarios, args.requests, args.concorrencia, args.renovacoes))
@@ -0,0 +1,89 @@
+"""
+Rajada de consultas contra uma tabela com TableLimits de 50 unidades de leitura por segundo.
+
+O handle em memória recusa com ReadThrottlingException o que passar do limite no segundo,
+como a nuvem. Compara três configurações da camada de dados sob a mesma rajada de
+POST /auth/check-email (consulta por email pelo índice):
+
+  - sem repetição: sem governador, o throttling vira 503 na hora (antes desta camada, 500);
+  - só repetição: espera exponencial com jitter até o prazo, sem controlar o ritmo;
+  - governador: ritmo dentro das unidades provisionadas + repetição + fila limitada (503).
+
+    python -m benchmarks.bench_capacidade [--requisicoes 300] [--concorrencia 50]
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from benchmarks.ambiente_local import usar_handle_local
+
+handle = usar_handle_local()
+
+import httpx  # noqa: E402
+from borneo import PutRequest  # noqa: E402
+
+from app import config  # noqa: E402
+from app.database import async_handle  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.user_service import user_service  # noqa: E402
+from app.storage.governor import CapacityGovernor  # noqa: E402
+
+
+async def _rajada(client, requisicoes, concorrencia, usuarios):
+    fila = iter(range(requisicoes))
+    status = Counter()
+    retry_after = []
+
+    async def cliente():
+        for i in fila:
+            resposta = await client.post("/auth/check-email", json={"email": f"usuario{i % usuarios}@exemplo.com"})
+            status[resposta.status_code] += 1
+            if "retry-after" in resposta.headers:
+                retry_after.append(int(resposta.headers["retry-after"]))
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(concorrencia)))
+    return status, time.perf_counter() - inicio, retry_after
+
+
+async def main(requisicoes, concorrencia, fila_maxima, usuarios=500):
+    await user_service.ensure_schema()
+    for i in range(usuarios):
+        handle.put(PutRequest().set_table_name(user_service.table_name).set_value({
+            "user_id": f"usuario-{i}", "name": f"Usuario {i}", "name_normalized": f"usuario {i}",
+            "email": f"usuario{i}@exemplo.com", "password_hash": "x" * 80, "security_word": "palavra",
+            "device_tokens": [], "is_active": True,
+        }))
+    handle.latencia = 0.005
+    handle.limitar_capacidade = True
+
+    transporte = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    print(f"{requisicoes} consultas, {concorrencia} clientes, limite de {config.DB_TABLE_READ_UNITS} RU/s, "
+          f"fila máxima {fila_maxima}")
+    print(f"  {'modo':<16} {'200':>5} {'503':>5} {'500':>5} {'recusas do banco':>17} {'duração':>9} {'RU/s':>7}")
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=60) as client:
+        for nome, governador, prazo in (
+            ("sem repetição", None, 0.0),
+            ("só repetição", None, config.DB_THROTTLE_RETRY_SECONDS),
+            ("governador", CapacityGovernor(config.DB_TABLE_READ_UNITS, config.DB_TABLE_WRITE_UNITS, fila_maxima),
+             config.DB_THROTTLE_RETRY_SECONDS),
+        ):
+            async_handle.governor = governador
+            async_handle.retry_deadline = prazo
+            # Começa com a janela de capacidade do banco zerada
+            await asyncio.sleep(1.1)
+            handle.zerar_contadores()
+            status, duracao, retry_after = await _rajada(client, requisicoes, concorrencia, usuarios)
+            print(f"  {nome:<16} {status[200]:>5} {status[503]:>5} {status[500]:>5} {handle.throttles:>17} "
+                  f"{duracao:>7.1f} s {handle.unidades_leitura / duracao:>7.1f}"
+                  + (f"   Retry-After {min(retry_after)}-{max(retry_after)} s" if retry_after else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requisicoes", type=int, default=300)
+    parser.add_argument("--concorrencia", type=int, default=50)
+    parser.add_argument("--fila-maxima", type=int, default=config.DB_MAX_QUEUE_DEPTH)
+    args = parser.parse_args()
+    asyncio.run(main(args.requisicoes, args.concorrencia, args.fila_maxima))
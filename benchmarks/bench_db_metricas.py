@@ -0,0 +1,66 @@
+"""
+Custo da instrumentação das chamadas ao banco (métricas de /metrics).
+
+Chama get_user_by_id sem cache de usuários (toda chamada vai ao handle em memória, sem
+latência simulada, para o custo da instrumentação não sumir no ruído da rede) com as métricas
+desligadas e ligadas, e mostra um trecho do /metrics resultante.
+
+    python -m benchmarks.bench_db_metricas [--chamadas 20000]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.ambiente_local import usar_handle_local
+
+handle = usar_handle_local()
+
+import httpx  # noqa: E402
+from borneo import PutRequest  # noqa: E402
+
+from app.database import async_handle  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.user_service import user_service  # noqa: E402
+from app.utils.cache import CacheLRUTTL  # noqa: E402
+from app.utils.metricas import metricas_banco  # noqa: E402
+
+
+async def _medir(chamadas, usuarios=100):
+    inicio = time.perf_counter()
+    for i in range(chamadas):
+        assert await user_service.get_user_by_id(f"usuario-{i % usuarios}")
+    return (time.perf_counter() - inicio) / chamadas * 1e6
+
+
+async def main(chamadas):
+    await user_service.ensure_schema()
+    for i in range(100):
+        handle.put(PutRequest().set_table_name(user_service.table_name).set_value({
+            "user_id": f"usuario-{i}", "name": f"Usuario {i}", "email": f"usuario{i}@exemplo.com",
+        }))
+    user_service.cache = CacheLRUTTL(0, 0)
+    await _medir(1000)
+
+    resultados = {}
+    for rodada in range(3):
+        for nome, metricas in (("desligadas", None), ("ligadas", metricas_banco)):
+            async_handle.metrics = metricas
+            resultados.setdefault(nome, []).append(await _medir(chamadas))
+    sem, com = min(resultados["desligadas"]), min(resultados["ligadas"])
+    print(f"get_user_by_id sem cache, {chamadas} chamadas (melhor de 3)")
+    print(f"  métricas desligadas  {sem:7.1f} µs/chamada")
+    print(f"  métricas ligadas     {com:7.1f} µs/chamada  (+{com - sem:.1f} µs, {(com / sem - 1) * 100:+.1f}%)")
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        texto = (await client.get("/metrics")).text
+    print("\ntrecho de /metrics:")
+    for linha in texto.splitlines():
+        if 'operation="get_user_by_id"' in linha and "_bucket" not in linha:
+            print(f"  {linha}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chamadas", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.chamadas))
@@ -0,0 +1,107 @@
+"""
+Tamanho da linha do usuário e custo por notificação conforme ele troca de aparelho.
+
+1. Um usuário reinstala o app N vezes (um token novo a cada vez). "antes" é o UPDATE antigo,
+   que só acrescentava; "depois" é o atual, com teto por usuário e expiração por last_used.
+   Mostra tokens guardados, bytes da linha e unidades de leitura de get_user_by_id.
+2. Envio de notificação para um usuário com tokens vivos e tokens que o FCM (LocalMessaging)
+   responde como desinstalados: o primeiro envio remove os mortos, o segundo só vai aos vivos.
+
+    python -m benchmarks.bench_device_tokens [--reinstalacoes 200]
+"""
+import argparse
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from benchmarks.ambiente_local import usar_handle_local
+
+handle = usar_handle_local()
+
+from borneo import GetRequest, PutRequest  # noqa: E402
+
+from app import config  # noqa: E402
+from app.services.messaging import LocalMessaging  # noqa: E402
+from app.services.notification_service import notification_service  # noqa: E402
+from app.services.user_service import user_service  # noqa: E402
+from app.utils.cache import CacheLRUTTL  # noqa: E402
+
+# O save_device_token anterior: tira o token se já existe e acrescenta, sem limite
+UPDATE_ANTIGO = (
+    "DECLARE $user_id STRING; $token STRING; $platform STRING; $now STRING; "
+    "UPDATE UsersV2 u "
+    "REMOVE u.device_tokens[$element.token = $token], "
+    'ADD u.device_tokens {"token": $token, "platform": $platform, "last_used": $now}, '
+    "SET u.updated_at = $now "
+    "WHERE user_id = $user_id"
+)
+
+
+def _criar(user_id, tokens=()):
+    handle.put(PutRequest().set_table_name(user_service.table_name).set_value({
+        "user_id": user_id, "name": "Usuario", "email": f"{user_id}@exemplo.com", "password_hash": "x" * 80,
+        "security_word": "palavra", "device_tokens": list(tokens), "is_active": True,
+    }))
+
+
+def _linha(user_id):
+    resultado = handle.get(GetRequest().set_table_name(user_service.table_name).set_key({"user_id": user_id}))
+    return resultado.get_value(), resultado.get_read_units()
+
+
+async def _reinstalacoes(reinstalacoes):
+    print(f"1. {reinstalacoes} reinstalações (teto {config.DEVICE_TOKENS_PER_USER} tokens, "
+          f"validade {config.DEVICE_TOKEN_TTL_DAYS} dias)")
+    print(f"  {'reinstalações':>13} {'antes: tokens':>14} {'bytes':>7} {'RU':>4} {'depois: tokens':>15} {'bytes':>7} {'RU':>4}")
+    _criar("antes")
+    _criar("depois")
+    marcos = {10, 50, reinstalacoes}
+    for i in range(1, reinstalacoes + 1):
+        token = f"fcm-{i:06d}-" + "x" * 140
+        await user_service._execute_update(UPDATE_ANTIGO, {
+            "$user_id": "antes", "$token": token, "$platform": "android", "$now": datetime.utcnow().isoformat(),
+        })
+        await user_service.save_device_token("depois", token)
+        if i in marcos:
+            colunas = []
+            for user_id in ("antes", "depois"):
+                linha, unidades = _linha(user_id)
+                colunas += [len(linha["device_tokens"]), len(json.dumps(linha, default=str).encode()), unidades]
+            print(f"  {i:>13} {colunas[0]:>14} {colunas[1]:>7} {colunas[2]:>4} "
+                  f"{colunas[3]:>15} {colunas[4]:>7} {colunas[5]:>4}")
+
+
+async def _envios():
+    agora = datetime.utcnow()
+    velho = (agora - timedelta(days=config.DEVICE_TOKEN_TTL_DAYS + 1)).isoformat()
+    tokens = [
+        {"token": "vivo-1", "platform": "android", "last_used": agora.isoformat()},
+        {"token": "vivo-2", "platform": "ios", "last_used": agora.isoformat()},
+        {"token": "desinstalado-1", "platform": "android", "last_used": agora.isoformat()},
+        {"token": "desinstalado-2", "platform": "android", "last_used": agora.isoformat()},
+        {"token": "expirado", "platform": "android", "last_used": velho},
+    ]
+    _criar("notificado", tokens)
+    backend = LocalMessaging(unregistered={"desinstalado-1", "desinstalado-2"})
+    notification_service.backend = backend
+
+    print("\n2. envio para um usuário com 2 tokens vivos, 2 desinstalados e 1 expirado")
+    for envio in (1, 2):
+        enviadas = len(backend.sent)
+        relatorio = await notification_service.send_to_user("notificado", "Lembrete", "Teste")
+        restantes = [t["token"] for t in _linha("notificado")[0]["device_tokens"]]
+        print(f"  envio {envio}: {relatorio}  entregues={len(backend.sent) - enviadas}  tokens na linha={restantes}")
+
+
+async def main(reinstalacoes):
+    await user_service.ensure_schema()
+    user_service.cache = CacheLRUTTL(0, 0)
+    await _reinstalacoes(reinstalacoes)
+    await _envios()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reinstalacoes", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.reinstalacoes))
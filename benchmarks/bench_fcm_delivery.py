@@ -0,0 +1,111 @@
+"""
+Entrega de lembretes que vencem juntos: `--usuarios` usuários com 2 aparelhos cada
+disparam o lembrete no mesmo instante, contra o LocalMessaging com `--latencia-ms` por
+chamada a send_each (a ida e volta ao FCM).
+
+1. um messaging.send por token, em série (como era o send_fcm_message), medido numa
+   amostra de `--amostra` mensagens;
+2. um send_each por usuário (cada lembrete com a sua chamada, no pool padrão de threads);
+3. a fila de entrega: lotes de até FCM_BATCH_SIZE em FCM_SEND_WORKERS envios simultâneos.
+
+Depois repete a fila com `--indisponivel` das mensagens recebendo UnavailableError, para
+mostrar as novas tentativas.
+
+    python -m benchmarks.bench_fcm_delivery [--usuarios 5000] [--latencia-ms 50]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from benchmarks.ambiente_local import usar_handle_local
+
+handle = usar_handle_local()
+
+from borneo import PutRequest  # noqa: E402
+from firebase_admin import messaging  # noqa: E402
+
+from app.services.fcm_delivery import delivery_pipeline  # noqa: E402
+from app.services.messaging import LocalMessaging  # noqa: E402
+from app.services.notification_service import notification_service, send_exam_reminder  # noqa: E402
+from app.services.user_service import user_service  # noqa: E402
+
+
+def _mensagem(token):
+    return messaging.Message(notification=messaging.Notification(title="Lembrete de Exame", body="PSA"), token=token)
+
+
+async def _serie(backend, tokens):
+    loop = asyncio.get_running_loop()
+    for token in tokens:
+        await loop.run_in_executor(None, backend.send_each, [_mensagem(token)])
+
+
+async def _por_usuario(backend, usuarios):
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(
+        loop.run_in_executor(None, backend.send_each, [_mensagem(f"{u}-a"), _mensagem(f"{u}-b")]) for u in usuarios
+    ))
+
+
+async def _fila(usuarios):
+    await asyncio.gather(*(send_exam_reminder(u, "PSA") for u in usuarios))
+
+
+async def _medir(nome, mensagens, corrotina, backend):
+    inicio = time.perf_counter()
+    await corrotina
+    duracao = time.perf_counter() - inicio
+    print(f"  {nome:<32} {mensagens / duracao:9.0f} msg/s  {backend.calls:>6} chamadas  "
+          f"{len(backend.sent):>6} entregues  {duracao:6.2f} s")
+
+
+def _contagem(contador):
+    return {chave: int(valor) for chave, valor in sorted(contador._valores.items())}
+
+
+async def main(total, latencia, amostra, indisponivel):
+    await user_service.ensure_schema()
+    agora = datetime.utcnow().isoformat()
+    usuarios = [f"usuario-{i}" for i in range(total)]
+    for u in usuarios:
+        handle.put(PutRequest().set_table_name(user_service.table_name).set_value({
+            "user_id": u, "name": u, "name_normalized": u, "email": f"{u}@exemplo.com",
+            "password_hash": "x", "security_word": "x", "is_active": True,
+            "device_tokens": [
+                {"token": f"{u}-a", "platform": "android", "last_used": agora},
+                {"token": f"{u}-b", "platform": "ios", "last_used": agora},
+            ],
+            "created_at": agora, "updated_at": agora,
+        }))
+    mensagens = 2 * total
+    print(f"{total} lembretes ({mensagens} mensagens), send_each com {latencia * 1000:g} ms de latência; "
+          f"lotes de até {delivery_pipeline.batch_size}, {delivery_pipeline.workers} envios simultâneos\n")
+
+    backend = LocalMessaging(latency=latencia)
+    tokens = [f"{u}-{lado}" for u in usuarios for lado in "ab"][:amostra]
+    await _medir(f"1 send por token ({amostra})", len(tokens), _serie(backend, tokens), backend)
+
+    backend = LocalMessaging(latency=latencia)
+    await _medir("1 send_each por usuário", mensagens, _por_usuario(backend, usuarios), backend)
+
+    backend = notification_service.backend = LocalMessaging(latency=latencia)
+    await _medir("fila em lotes", mensagens, _fila(usuarios), backend)
+
+    print(f"\n  com {indisponivel:.0%} das mensagens recebendo UnavailableError (espera base de 50 ms):")
+    delivery_pipeline.outcomes._valores.clear()
+    delivery_pipeline.retry_base = 0.05
+    backend = notification_service.backend = LocalMessaging(latency=latencia, unavailable_rate=indisponivel, seed=3)
+    await _medir("fila em lotes", mensagens, _fila(usuarios), backend)
+    print(f"  resultados: {_contagem(delivery_pipeline.outcomes)}")
+    delivery_pipeline.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--usuarios", type=int, default=5000)
+    parser.add_argument("--latencia-ms", type=float, default=50)
+    parser.add_argument("--amostra", type=int, default=200)
+    parser.add_argument("--indisponivel", type=float, default=0.1)
+    args = parser.parse_args()
+    asyncio.run(main(args.usuarios, args.latencia_ms / 1000, args.amostra, args.indisponivel))
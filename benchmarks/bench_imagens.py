@@ -0,0 +1,134 @@
+"""
+Proxy de imagens contra um servidor de imagens local (127.0.0.1, liberado com
+IMAGE_ALLOWED_HOSTS): download, miniatura e cache LRU em disco.
+
+1. sem o host liberado, a origem local é recusada (OrigemBloqueada) sem ir ao servidor;
+2. `--imagens` JPEGs de 1600 px gerados no pool de workers: tempo e bytes antes/depois;
+3. leituras do cache (obter) e o descarte do LRU com `--cache-mb` MB de limite;
+4. uma imagem atrás de um redirecionamento e uma que não existe (404): a falha fica
+   lembrada e o segundo pedido não vai ao servidor;
+5. um processo novo sobre o mesmo diretório reconstrói o índice do disco.
+
+    python -m benchmarks.bench_imagens [--imagens 40] [--cache-mb 1]
+"""
+import argparse
+import io
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+from app.services.image_service import ImageProxy, OrigemBloqueada
+
+
+def _jpeg(i, largura=1600, altura=1000):
+    rnd = random.Random(i)
+    imagem = Image.new("RGB", (largura, altura), tuple(rnd.randrange(256) for _ in range(3)))
+    # Ruído em blocos, para o JPEG ter um tamanho parecido com o de uma foto
+    ruido = Image.frombytes("RGB", (largura // 8, altura // 8), rnd.randbytes(largura // 8 * altura // 8 * 3))
+    imagem.paste(ruido.resize((largura, altura)), (0, 0))
+    saida = io.BytesIO()
+    imagem.save(saida, format="JPEG", quality=85)
+    return saida.getvalue()
+
+
+def servidor_imagens(total):
+    """
+    Sobe um servidor local com /img/<i>.jpg, /redir/<i> (302 para a imagem) e 404 no resto.
+    Retorna (base, acessos por caminho, bytes servidos, servidor); chame servidor.shutdown() no fim.
+    """
+    imagens = {f"/img/{i}.jpg": _jpeg(i) for i in range(total)}
+    acessos = Counter()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            acessos[self.path] += 1
+            if self.path.startswith("/redir/"):
+                self.send_response(302)
+                self.send_header("Location", f"/img/{self.path.rsplit('/', 1)[1]}.jpg")
+                self.end_headers()
+                return
+            conteudo = imagens.get(self.path)
+            if conteudo is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(conteudo)))
+            self.end_headers()
+            self.wfile.write(conteudo)
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{servidor.server_port}", acessos, sum(map(len, imagens.values())), servidor
+
+
+def _resultado(futuro):
+    try:
+        futuro.result()
+        return "ok"
+    except Exception as e:
+        return type(e).__name__
+
+
+def main(total, cache_mb, workers):
+    base, acessos, bytes_originais, servidor = servidor_imagens(total)
+    urls = [f"{base}/img/{i}.jpg" for i in range(total)]
+    with tempfile.TemporaryDirectory() as pasta:
+        bloqueado = ImageProxy(pasta, cache_mb * 1024 * 1024, workers=workers)
+        futuro = bloqueado.agendar(bloqueado.registrar(urls[0]))
+        print(f"1. sem host liberado: {_resultado(futuro)} ({sum(acessos.values())} acessos ao servidor)")
+        assert isinstance(futuro.exception(), OrigemBloqueada)
+        bloqueado.fechar()
+
+        proxy = ImageProxy(pasta, cache_mb * 1024 * 1024, workers=workers, hosts_liberados={"127.0.0.1"})
+        ids = [proxy.registrar(url) for url in urls]
+        inicio = time.perf_counter()
+        futuros = [proxy.agendar(image_id) for image_id in ids]
+        wait(futuros)
+        duracao = time.perf_counter() - inicio
+        resultados = Counter(_resultado(f) for f in futuros)
+        print(f"2. {total} miniaturas com {workers} workers: {duracao * 1000:.0f} ms "
+              f"({total / duracao:.0f} imagens/s) {dict(resultados)}; "
+              f"{bytes_originais / 1024:.0f} KB baixados -> {proxy.cache.total_bytes / 1024:.0f} KB no disco")
+
+        inicio = time.perf_counter()
+        em_cache = sum(proxy.obter(image_id) is not None for image_id in ids)
+        duracao = time.perf_counter() - inicio
+        print(f"3. obter: {duracao / total * 1e6:.1f} µs por id; {em_cache} de {total} ainda no disco "
+              f"(limite de {cache_mb} MB, {proxy.cache.total_bytes / 1024:.0f} KB usados)")
+        assert proxy.cache.total_bytes <= cache_mb * 1024 * 1024
+
+        redirecionada = proxy.agendar(proxy.registrar(f"{base}/redir/{total - 1}"))
+        faltando = proxy.registrar(f"{base}/nao-existe.jpg")
+        primeira = proxy.agendar(faltando)
+        wait([redirecionada, primeira])
+        segunda = proxy.agendar(faltando)
+        print(f"4. redirecionada: {_resultado(redirecionada)}; inexistente: {_resultado(primeira)}, "
+              f"de novo: {_resultado(segunda)} ({acessos['/nao-existe.jpg']} acesso(s) ao servidor)")
+        assert acessos["/nao-existe.jpg"] == 1
+        proxy.fechar()
+
+        novo = ImageProxy(pasta, cache_mb * 1024 * 1024, workers=workers)
+        reabertas = sum(novo.obter(image_id) is not None for image_id in ids)
+        print(f"5. processo novo: {reabertas} miniaturas lidas do disco")
+        novo.fechar()
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--imagens", type=int, default=40)
+    parser.add_argument("--cache-mb", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    main(args.imagens, args.cache_mb, args.workers)
@@ -0,0 +1,124 @@
+"""
+Hash de senha fora do event loop: logins por segundo e latência do resto da API.
+
+1. Vazão de verificações de senha com o PasswordHasher em 1, 4 e N processos, comparada
+   com a verificação direta no event loop (como era antes).
+2. "Tempestade de logins": muitos POST /auth/login simultâneos enquanto outro cliente
+   chama GET /health a cada 10 ms; mostra a latência do /health com o hash no event loop
+   e no pool de processos.
+
+    python -m benchmarks.bench_login_hashing [--rounds 100000] [--logins 64]
+
+Os processos só escalam até o número de núcleos livres da máquina.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.ambiente_local import usar_handle_local
+
+
+class HashNoEventLoop:
+    """Mesma interface do PasswordHasher, mas calculando o hash no próprio event loop."""
+
+    async def hash(self, password):
+        from app.utils.auth import AuthUtils
+        return AuthUtils.hash_password(password)
+
+    async def verify_and_update(self, plain_password, hashed_password):
+        from app.utils.auth import AuthUtils
+        return AuthUtils.verify_and_update_password(plain_password, hashed_password)
+
+    def close(self):
+        pass
+
+
+async def _vazao(hasher, hashed, verificacoes):
+    await hasher.verify_and_update("senha-bench", hashed)  # sobe os processos antes de medir
+    inicio = time.perf_counter()
+    await asyncio.gather(*(hasher.verify_and_update("senha-bench", hashed) for _ in range(verificacoes)))
+    return verificacoes / (time.perf_counter() - inicio)
+
+
+async def _tempestade(client, logins):
+    latencias = []
+    terminou = asyncio.Event()
+
+    async def sonda():
+        while not terminou.is_set():
+            inicio = time.perf_counter()
+            await client.get("/health")
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            await asyncio.sleep(0.01)
+
+    async def logar():
+        resposta = await client.post("/auth/login", json={"identifier": "bench@exemplo.com", "password": "senha-bench"})
+        assert resposta.status_code == 200, resposta.text
+
+    tarefa = asyncio.create_task(sonda())
+    inicio = time.perf_counter()
+    await asyncio.gather(*(logar() for _ in range(logins)))
+    duracao = time.perf_counter() - inicio
+    terminou.set()
+    await tarefa
+    latencias.sort()
+    p99 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))]
+    return logins / duracao, len(latencias), statistics.median(latencias), p99, max(latencias)
+
+
+async def main(rounds, verificacoes, logins):
+    import httpx
+    from borneo import PutRequest
+
+    from app.main import app
+    from app.services import user_service as user_service_module
+    from app.utils.auth import AuthUtils, PasswordHasher
+
+    await user_service_module.user_service.ensure_schema()
+    hashed = AuthUtils.hash_password("senha-bench")
+    nucleos = os.cpu_count() or 1
+    print(f"sha256_crypt com {rounds} rounds, {nucleos} núcleo(s) na máquina")
+
+    print("\nverificações de senha por segundo")
+    print(f"  {'event loop':<14} {await _vazao(HashNoEventLoop(), hashed, verificacoes):8.1f}/s")
+    for workers in sorted({1, 4, nucleos}):
+        hasher = PasswordHasher(workers)
+        try:
+            print(f"  {f'{workers} processo(s)':<14} {await _vazao(hasher, hashed, verificacoes):8.1f}/s")
+        finally:
+            hasher.close()
+
+    service = user_service_module.user_service
+    handle.put(PutRequest().set_table_name(service.table_name).set_value({
+        "user_id": "usuario-bench", "name": "Bench", "name_normalized": "bench",
+        "email": "bench@exemplo.com", "password_hash": hashed, "security_word": "x",
+        "device_tokens": [], "is_active": True,
+        "created_at": "2025-01-01T00:00:00", "updated_at": "2025-01-01T00:00:00",
+    }))
+
+    print(f"\n{logins} logins simultâneos, GET /health a cada 10 ms")
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as client:
+        for nome, hasher in (("event loop", HashNoEventLoop()), (f"{nucleos} processo(s)", PasswordHasher(nucleos))):
+            user_service_module.password_hasher = hasher
+            try:
+                await hasher.verify_and_update("senha-bench", hashed)
+                por_segundo, sondas, p50, p99, pior = await _tempestade(client, logins)
+            finally:
+                hasher.close()
+            print(f"  {nome:<14} logins={por_segundo:6.1f}/s  /health: {sondas:>4} respostas  "
+                  f"p50={p50:7.1f} ms  p99={p99:7.1f} ms  pior={pior:7.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=100000)
+    parser.add_argument("--verificacoes", type=int, default=40)
+    parser.add_argument("--logins", type=int, default=64)
+    args = parser.parse_args()
+    # O custo precisa estar no ambiente antes do import: os processos filhos também o leem
+    os.environ["PASSWORD_HASH_ROUNDS"] = str(args.rounds)
+    handle = usar_handle_local()
+    asyncio.run(main(args.rounds, args.verificacoes, args.logins))
@@ -0,0 +1,78 @@
+"""
+Latência das consultas de usuário com o cache de consultas preparadas frio e quente.
+
+Frio: cada consulta passa por PrepareRequest antes de executar (a compilação que o SQL
+montado por f-string exigia a cada chamada). Quente: só a cópia do PreparedStatement e a
+execução.
+A latência de rede é simulada no handle em memória; o custo de compilar no servidor não
+é, então a diferença real tende a ser maior que a medida aqui.
+
+Também confere que identificadores com aspas (O'Brien) são buscados normalmente.
+
+    python -m benchmarks.bench_prepared_statements [--consultas 300] [--latencia-ms 5]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.ambiente_local import usar_handle_local
+
+handle = usar_handle_local()
+
+from borneo import PutRequest  # noqa: E402
+
+from app.database import statements  # noqa: E402
+from app.services.user_service import user_service  # noqa: E402
+from app.utils.texto import normalizar_nome  # noqa: E402
+
+
+async def _medir(consulta, consultas, frio):
+    latencias = []
+    for i in range(consultas):
+        if frio:
+            statements.clear()
+        inicio = time.perf_counter()
+        await consulta(i)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    latencias.sort()
+    return statistics.median(latencias), latencias[int(len(latencias) * 0.99) - 1]
+
+
+async def main(consultas, latencia_ms, usuarios):
+    await user_service.ensure_schema()
+    for i in range(usuarios):
+        nome = f"Usuario D'Ávila {i}"
+        handle.put(PutRequest().set_table_name(user_service.table_name).set_value({
+            "user_id": f"u{i}", "name": nome, "name_normalized": normalizar_nome(nome),
+            "email": f"usuario{i}@exemplo.com", "password_hash": "x", "security_word": "y",
+            "device_tokens": [], "is_active": True,
+            "created_at": "2025-01-01T00:00:00", "updated_at": "2025-01-01T00:00:00",
+        }))
+
+    encontrado = await user_service._get_user_by_name("usuario d'ávila 7")
+    assert encontrado and encontrado["user_id"] == "u7", "busca por nome com aspas falhou"
+    assert await user_service._get_user_by_email("x' OR email <> '@") is None
+
+    handle.latencia = latencia_ms / 1000
+    print(f"{consultas} consultas, latência do banco {latencia_ms} ms por ida")
+    casos = (
+        ("por email", lambda i: user_service._get_user_by_email(f"usuario{i % usuarios}@exemplo.com")),
+        ("por nome", lambda i: user_service._get_user_by_name(f"Usuario D'Ávila {i % usuarios}")),
+    )
+    for nome, consulta in casos:
+        for modo, frio in (("frio", True), ("quente", False)):
+            handle.zerar_contadores()
+            p50, p99 = await _medir(consulta, consultas, frio)
+            idas = sum(handle.chamadas.values()) / consultas
+            print(f"  {nome:<10} {modo:<7} p50={p50:6.2f} ms  p99={p99:6.2f} ms  "
+                  f"idas ao banco/consulta={idas:.2f}  RU/consulta={handle.unidades_leitura / consultas:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--consultas", type=int, default=300)
+    parser.add_argument("--latencia-ms", type=float, default=5)
+    parser.add_argument("--usuarios", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.consultas, args.latencia_ms, args.usuarios))
@@ -0,0 +1,119 @@
+"""
+Limite de requests das rotas caras de /auth.
+
+1. Custo do MemoryBackend: microssegundos por request contado, memória por chave com
+   `--chaves` chaves distintas e a limpeza das chaves paradas.
+2. Ataques contra POST /auth/login, com e sem o limite (regra padrão de login):
+   - "credential stuffing": um IP tenta `--tentativas` contas diferentes;
+   - "força bruta distribuída": `--tentativas` IPs tentam a mesma conta.
+   Mostra quantos requests chegaram ao serviço (cada um uma consulta ao banco e um hash
+   de senha) e as unidades de leitura consumidas.
+
+    python -m benchmarks.bench_rate_limit [--chaves 100000] [--tentativas 300]
+"""
+import argparse
+import asyncio
+import os
+import time
+import tracemalloc
+
+from benchmarks.ambiente_local import usar_handle_local
+
+os.environ["RATE_LIMIT_ENABLED"] = "true"
+os.environ["RATE_LIMIT_TRUST_PROXY"] = "true"
+os.environ.setdefault("PASSWORD_HASH_ROUNDS", "1000")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+handle = usar_handle_local()
+
+import httpx  # noqa: E402
+from borneo import PutRequest  # noqa: E402
+
+from app import config  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.user_service import user_service  # noqa: E402
+from app.utils import rate_limit  # noqa: E402
+from app.utils.auth import AuthUtils  # noqa: E402
+from app.utils.metricas import metricas_banco  # noqa: E402
+
+
+async def _backend(chaves):
+    nomes = [f"login:ip:10.{i // 65536}.{i // 256 % 256}.{i % 256}" for i in range(chaves)]
+    backend = rate_limit.MemoryBackend()
+    inicio = time.perf_counter()
+    for nome in nomes:
+        await backend.hit(nome, 30, 60)
+    duracao = time.perf_counter() - inicio
+
+    # Memória medida à parte (o tracemalloc deixa cada alocação mais lenta); os nomes já existiam
+    backend = rate_limit.MemoryBackend()
+    tracemalloc.start()
+    for nome in nomes:
+        await backend.hit(nome, 30, 60)
+    por_chave = tracemalloc.get_traced_memory()[0] / chaves
+    tracemalloc.stop()
+    print(f"  {duracao / chaves * 1e6:6.2f} µs/request, {por_chave:5.0f} bytes/chave ({len(backend)} chaves)")
+
+    # Limpeza: janelas de 0,1 s; depois de duas janelas paradas as chaves somem na próxima varredura
+    backend = rate_limit.MemoryBackend(intervalo_limpeza=0.2)
+    for nome in nomes:
+        await backend.hit(nome, 30, 0.1)
+    await asyncio.sleep(0.3)
+    antes = len(backend)
+    await backend.hit("login:ip:outro", 30, 0.1)
+    print(f"  limpeza: {antes} chaves paradas -> {len(backend)} chave(s) depois da varredura")
+
+
+def _unidades_leitura():
+    return sum(serie.leitura for serie in metricas_banco.series().values())
+
+
+async def _ataque(client, tentativas, por_ip):
+    rate_limit.rate_limiter.backend = rate_limit.MemoryBackend()
+    leitura = _unidades_leitura()
+    status = {}
+    inicio = time.perf_counter()
+    for i in range(tentativas):
+        ip, conta = ("203.0.113.7", f"alvo{i}@exemplo.com") if por_ip else (f"198.51.{i // 256}.{i % 256}", "alvo0@exemplo.com")
+        resposta = await client.post(
+            "/auth/login", json={"identifier": conta, "password": "chute"}, headers={"X-Forwarded-For": ip}
+        )
+        status[resposta.status_code] = status.get(resposta.status_code, 0) + 1
+    duracao = time.perf_counter() - inicio
+    return status, _unidades_leitura() - leitura, duracao
+
+
+async def main(chaves, tentativas):
+    print(f"1. MemoryBackend, {chaves} chaves distintas")
+    await _backend(chaves)
+
+    await user_service.ensure_schema()
+    hashed = AuthUtils.hash_password("senha-certa")
+    for i in range(tentativas):
+        handle.put(PutRequest().set_table_name(user_service.table_name).set_value({
+            "user_id": f"alvo-{i}", "name": f"Alvo {i}", "name_normalized": f"alvo {i}",
+            "email": f"alvo{i}@exemplo.com", "password_hash": hashed, "security_word": "x",
+            "device_tokens": [], "is_active": True,
+            "created_at": "2025-01-01T00:00:00", "updated_at": "2025-01-01T00:00:00",
+        }))
+
+    regra = rate_limit.rate_limiter.regras["login"]
+    print(f"\n2. {tentativas} tentativas de login erradas (regra: {regra.por_ip}/IP e "
+          f"{regra.por_identificador}/conta a cada {regra.janela:g} s)")
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as client:
+        for nome, por_ip in (("stuffing (1 IP)", True), ("distribuído (1 conta)", False)):
+            for ligado in (False, True):
+                config.RATE_LIMIT_ENABLED = ligado
+                status, leitura, duracao = await _ataque(client, tentativas, por_ip)
+                chegaram = tentativas - status.get(429, 0)
+                print(f"  {nome:<22} limite {'ligado ' if ligado else 'desligado'}  "
+                      f"no serviço={chegaram:>4}  429={status.get(429, 0):>4}  "
+                      f"unidades de leitura={leitura:>6}  {duracao:5.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chaves", type=int, default=100000)
+    parser.add_argument("--tentativas", type=int, default=300)
+    args = parser.parse_args()
+    asyncio.run(main(args.chaves, args.tentativas))
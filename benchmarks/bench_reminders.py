@@ -0,0 +1,110 @@
+"""
+Subida do agendador com `--lembretes` lembretes guardados, espalhados pelos próximos
+`--dias` dias, nos dois REMINDER_STORE (SQLite em arquivo temporário e a tabela NoSQL no
+handle local).
+
+Para cada store compara carregar todos os lembretes no agendador (o que um job store que
+restaura tudo faria) com carregar só o horizonte (REMINDER_HORIZON_HOURS): tempo, jobs
+no agendador e memória que ficou ocupada depois da carga.
+
+Por fim, dois "workers" com o mesmo lembrete carregado disparam juntos: só um envia.
+
+    python -m benchmarks.bench_reminders [--lembretes 100000] [--dias 180]
+"""
+import argparse
+import asyncio
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmarks.ambiente_local import usar_handle_local
+
+handle = usar_handle_local()
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler  # noqa: E402
+
+from app import config  # noqa: E402
+from app import firebase_setup  # noqa: E402
+from app.services.notification_service import notification_service  # noqa: E402
+from app.services.reminder_store import NoSQLReminderStore, SQLiteReminderStore, new_reminder  # noqa: E402
+
+
+def _lembretes(total, dias):
+    rng = random.Random(7)
+    agora = datetime.now()
+    for i in range(total):
+        run_at = agora + timedelta(seconds=rng.uniform(3600, dias * 86400))
+        yield new_reminder(f"reminder_usuario-{i}_Exame_{i}", f"usuario-{i}", f"Exame {i}", run_at)
+
+
+async def _subida(store, horizonte_horas):
+    """Cria um ReminderScheduler novo sobre o store e mede a carga inicial."""
+    config.REMINDER_HORIZON_HOURS = horizonte_horas
+    scheduler = AsyncIOScheduler()
+    # Pausado: os jobs entram no job store em memória, mas nenhum roda durante a medida
+    scheduler.start(paused=True)
+    reminders = firebase_setup.ReminderScheduler(scheduler, store)
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    await reminders.start()
+    duracao = time.perf_counter() - inicio
+    gc.collect()
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    jobs = len(scheduler.get_jobs())
+    scheduler.shutdown(wait=False)
+    return duracao, jobs - 1, memoria  # menos o job que recarrega o horizonte
+
+
+async def _disputa(store, lembrete):
+    """Dois workers disparam o mesmo lembrete; conta quantas mensagens saíram."""
+    original = firebase_setup.send_exam_reminder
+    enviados = []
+
+    async def enviar(user_id, exam_name):
+        enviados.append(user_id)
+        return {"sent": 1, "failed": 0, "pruned": 0}
+
+    firebase_setup.send_exam_reminder = enviar
+    try:
+        await asyncio.gather(firebase_setup.run_reminder(store, lembrete), firebase_setup.run_reminder(store, lembrete))
+    finally:
+        firebase_setup.send_exam_reminder = original
+    return len(enviados)
+
+
+async def main(total, dias):
+    lembretes = list(_lembretes(total, dias))
+    notification_service.backend  # abre o LocalMessaging antes de medir
+    with tempfile.TemporaryDirectory() as pasta:
+        stores = (
+            ("sqlite", SQLiteReminderStore(os.path.join(pasta, "reminders.sqlite3"))),
+            ("nosql (local)", NoSQLReminderStore()),
+        )
+        print(f"{total} lembretes nos próximos {dias} dias; horizonte de {config.REMINDER_HORIZON_HOURS:g} h")
+        for nome, store in stores:
+            await store.ensure_schema()
+            inicio = time.perf_counter()
+            for i in range(0, total, 1000):
+                await store.save_many(lembretes[i:i + 1000])
+            print(f"\n  {nome}: {total} gravados em {time.perf_counter() - inicio:.1f} s")
+            for rotulo, horas in (("tudo", dias * 24 + 24), ("horizonte", config.REMINDER_HORIZON_HOURS)):
+                duracao, jobs, memoria = await _subida(store, horas)
+                print(f"    {rotulo:<10} {duracao * 1000:9.1f} ms  {jobs:>7} jobs  {memoria / 1024 / 1024:7.1f} MB")
+            config.REMINDER_HORIZON_HOURS = 24
+            disputa = lembretes[0]
+            print(f"    dois workers com o mesmo lembrete: {await _disputa(store, disputa)} envio(s)")
+            store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lembretes", type=int, default=100000)
+    parser.add_argument("--dias", type=int, default=180)
+    args = parser.parse_args()
+    asyncio.run(main(args.lembretes, args.dias))
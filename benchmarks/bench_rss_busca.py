@@ -0,0 +1,58 @@
+"""
+Latência da busca de notícias (/rss/search) no índice invertido.
+
+Monta um snapshot sintético com alguns milhares de notícias, indexa e mede consultas
+típicas do app, além do custo de uma atualização incremental do índice.
+
+    python -m benchmarks.bench_rss_busca [--noticias 5000]
+"""
+import argparse
+import statistics
+import time
+
+import feedparser
+
+from app.services import rss_service
+from app.services.rss_search import IndiceInvertido
+from benchmarks.feeds_locais import corpus_sintetico
+
+CONSULTAS = ["próstata", "colesterol alto", "pressao arterial", "saúde mental sono", "testosterona check-up"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--noticias", type=int, default=5000)
+    parser.add_argument("--repeticoes", type=int, default=200)
+    args = parser.parse_args()
+
+    itens = []
+    for nome, xml in corpus_sintetico(n_itens=args.noticias // 4):
+        itens.extend(rss_service._ingerir_entradas(nome, feedparser.parse(xml).entries))
+
+    indice = IndiceInvertido()
+    inicio = time.perf_counter()
+    indice.sincronizar(itens)
+    print(f"indexação de {len(indice)} notícias: {(time.perf_counter() - inicio) * 1e3:.1f} ms")
+
+    # Próximo snapshot: 5% das notícias trocadas
+    trocadas = len(itens) // 20
+    proximo = itens[trocadas:] + [dict(item, id=item["id"] + "-novo") for item in itens[:trocadas]]
+    inicio = time.perf_counter()
+    indice.sincronizar(proximo)
+    print(f"atualização incremental ({trocadas} trocadas): {(time.perf_counter() - inicio) * 1e3:.1f} ms")
+
+    for consulta in CONSULTAS:
+        tempos = []
+        for _ in range(args.repeticoes):
+            inicio = time.perf_counter()
+            resultados = indice.buscar(consulta, 10)
+            tempos.append(time.perf_counter() - inicio)
+        tempos.sort()
+        print(
+            f"{consulta!r:28s} p50 {statistics.median(tempos) * 1e6:7.1f} µs"
+            f"  p99 {tempos[int(len(tempos) * 0.99) - 1] * 1e6:7.1f} µs  ({len(resultados)} resultados)"
+        )
+
+
+if __name__ == "__main__":
+    main()
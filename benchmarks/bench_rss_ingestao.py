@@ -0,0 +1,96 @@
+"""
+Custo de normalização por entrada de feed.
+
+Compara a normalização original (regex compilada a cada chamada, tudo refeito a cada busca)
+com a ingestão incremental (padrões pré-compilados + índice por GUID/hash que reaproveita
+entradas inalteradas). O parse do feedparser fica fora da medição.
+
+    python -m benchmarks.bench_rss_ingestao [--repeticoes 20]
+"""
+import argparse
+import re
+import time
+
+import feedparser
+
+from app.services import rss_service
+from benchmarks.feeds_locais import carregar_corpus, corpus_salvo
+
+
+def _normalizar_original(entry):
+    """Cópia da normalização antes do índice de ingestão (referência)."""
+    title = entry.get('title', '')
+    link = entry.get('link', '')
+    raw_description = entry.get('summary', '') or entry.get('description', '') or ''
+    clean_description = re.sub('<[^<]+?>', '', raw_description).strip()
+    image_url = ''
+    if 'media_content' in entry:
+        media = entry.media_content
+        if isinstance(media, list) and len(media) > 0:
+            image_url = media[-1].get('url', '')
+    if not image_url and 'media_thumbnail' in entry:
+        thumb = entry.media_thumbnail
+        if isinstance(thumb, list) and len(thumb) > 0:
+            image_url = thumb[0].get('url', '')
+    if not image_url and 'src=' in raw_description:
+        match = re.search(r'src="([^"]+jpg|[^"]+png|[^"]+jpeg)"', raw_description)
+        if match:
+            image_url = match.group(1)
+    if not image_url and 'links' in entry:
+        for l in entry.links:
+            if l.get('rel') == 'enclosure' and 'image' in l.get('type', ''):
+                image_url = l.get('href', '')
+                break
+    return {
+        "title": title,
+        "description": clean_description[:140] + "..." if len(clean_description) > 140 else clean_description,
+        "link": link,
+        "imageUrl": image_url
+    }
+
+
+def _medir(funcao, repeticoes):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    feeds = [(nome, feedparser.parse(xml).entries) for nome, xml in carregar_corpus()]
+    total = sum(len(entries) for _, entries in feeds)
+    origem = "feeds reais de benchmarks/corpus/" if corpus_salvo() else "SINTÉTICO (sem XML em benchmarks/corpus/)"
+    print(f"corpus {origem}: {len(feeds)} feeds, {total} entradas")
+
+    def original():
+        for _, entries in feeds:
+            for entry in entries:
+                _normalizar_original(entry)
+
+    def incremental_frio():
+        rss_service._indice_por_feed.clear()
+        for nome, entries in feeds:
+            rss_service._ingerir_entradas(nome, entries)
+
+    def incremental_quente():
+        for nome, entries in feeds:
+            rss_service._ingerir_entradas(nome, entries)
+
+    incremental_frio()
+    resultados = {
+        "original (tudo a cada busca)": _medir(original, args.repeticoes),
+        "incremental, índice vazio": _medir(incremental_frio, args.repeticoes),
+        "incremental, nada mudou": _medir(incremental_quente, args.repeticoes),
+    }
+    for nome, segundos in resultados.items():
+        print(f"{nome:32s} {segundos / total * 1e6:8.2f} µs/entrada")
+
+
+if __name__ == "__main__":
+    main()
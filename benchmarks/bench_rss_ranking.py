@@ -0,0 +1,46 @@
+"""
+Custo do ranking de relevância por snapshot (sort=relevance).
+
+Indexa alguns milhares de notícias sintéticas e mede a pontuação vetorizada pelo léxico
+de temas (matriz de frequências + produto com os pesos) e a ordenação final.
+
+    python -m benchmarks.bench_rss_ranking [--noticias 5000]
+"""
+import argparse
+import time
+
+import feedparser
+
+from app.services import rss_service
+from app.services.rss_ranking import RanqueadorRelevancia, carregar_lexico
+from app.services.rss_search import IndiceInvertido
+from benchmarks.feeds_locais import corpus_sintetico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--noticias", type=int, default=5000)
+    parser.add_argument("--repeticoes", type=int, default=50)
+    args = parser.parse_args()
+
+    itens = []
+    for nome, xml in corpus_sintetico(n_itens=args.noticias // 4):
+        itens.extend(rss_service._ingerir_entradas(nome, feedparser.parse(xml).entries))
+    indice = IndiceInvertido()
+    indice.sincronizar(itens)
+    ranqueador = RanqueadorRelevancia(carregar_lexico())
+
+    for nome, funcao in {
+        "pontuar (matriz + produto)": lambda: ranqueador.pontuar(indice),
+        "pontuar + ordenar": lambda: ranqueador.ordenar(itens, indice),
+    }.items():
+        tempos = []
+        for _ in range(args.repeticoes):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append(time.perf_counter() - inicio)
+        print(f"{nome:28s} {len(itens)} notícias: melhor {min(tempos) * 1e3:.2f} ms, mediana {sorted(tempos)[len(tempos) // 2] * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Requisições por segundo em GET /rss/ antes e depois das páginas pré-serializadas.
+
+"antes" reproduz o handler original: monta o dicionário da página e devolve um JSONResponse
+(serializa a cada requisição), com e sem gzip feito na hora. "depois" é o handler atual,
+que serve bytes prontos do cache de páginas (e 304 quando o app manda If-None-Match).
+Os feeds vêm de um servidor HTTP local.
+
+    python -m benchmarks.bench_rss_respostas [--requisicoes 3000]
+"""
+import argparse
+import asyncio
+import gzip
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from app.controllers.rss_controller import router
+from app.services import rss_service
+from app.services.feed_fetcher import FeedFetcher
+from benchmarks.feeds_locais import servidor_stub
+
+
+def _app():
+    app = FastAPI()
+    app.include_router(router)
+
+    @app.get("/antes")
+    async def antes(page: int = 1, limit: int = 3):
+        itens = await rss_service.buscar_rss()
+        inicio = (page - 1) * limit
+        return JSONResponse(content={
+            "noticias": itens[inicio:inicio + limit],
+            "totalNoticias": len(itens),
+            "paginaAtual": page,
+            "noticiasPorPagina": limit
+        })
+
+    @app.get("/antes-gzip")
+    async def antes_gzip(request: Request, page: int = 1, limit: int = 3):
+        resposta = await antes(page, limit)
+        return Response(gzip.compress(resposta.body), media_type="application/json", headers={"Content-Encoding": "gzip"})
+
+    return app
+
+
+async def _medir(client, url, requisicoes, limite, headers=None, paginas=5):
+    inicio = time.perf_counter()
+    for i in range(requisicoes):
+        resposta = await client.get(url, params={"page": i % paginas + 1, "limit": limite}, headers=headers)
+        assert resposta.status_code in (200, 304)
+    return requisicoes / (time.perf_counter() - inicio)
+
+
+async def main(requisicoes, limite):
+    urls, servidor = servidor_stub()
+    rss_service._fetcher = FeedFetcher(urls)
+    await rss_service.atualizar_snapshot()
+
+    transporte = httpx.ASGITransport(app=_app())
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as client:
+        etag = (await client.get("/rss/", params={"page": 1, "limit": limite})).headers["etag"]
+        cenarios = {
+            "antes (JSONResponse)": ("/antes", {"Accept-Encoding": "identity"}, 5),
+            "antes (JSON + gzip na hora)": ("/antes-gzip", {"Accept-Encoding": "gzip"}, 5),
+            "depois (bytes prontos, gzip)": ("/rss/", {"Accept-Encoding": "gzip"}, 5),
+            "depois (304 If-None-Match)": ("/rss/", {"If-None-Match": etag}, 1),
+        }
+        for nome, (url, headers, paginas) in cenarios.items():
+            await _medir(client, url, 200, limite, headers, paginas)
+            req_s = await _medir(client, url, requisicoes, limite, headers, paginas)
+            print(f"{nome:30s} {req_s:8.0f} req/s")
+
+    await rss_service.parar_atualizacao_periodica()
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requisicoes", type=int, default=3000)
+    parser.add_argument("--limite", type=int, default=20, help="notícias por página")
+    args = parser.parse_args()
+    asyncio.run(main(args.requisicoes, args.limite))
@@ -0,0 +1,75 @@
+"""
+Tempo de inicialização da API contra os substitutos locais (handle em memória).
+
+Cada medida roda num processo Python novo, como um worker do uvicorn subindo:
+  - import: tempo de `import app.main`
+  - primeira requisição: lifespan (Firebase, schema, agendador, RSS) + GET /health
+
+A DDL do handle em memória leva --latencia-ddl segundos, como a espera do
+do_table_request na nuvem. "schema frio" roda a DDL; "schema em cache" encontra a
+versão atual no SCHEMA_CACHE_FILE e não vai ao banco.
+
+    python -m benchmarks.bench_startup [--latencia-ddl 1.0] [--repeticoes 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+CODIGO = """
+import asyncio, json, sys, time
+inicio = time.perf_counter()
+from benchmarks.ambiente_local import usar_handle_local
+usar_handle_local(latencia_ddl=float(sys.argv[1]))
+import app.main
+importado = time.perf_counter()
+
+import httpx
+
+async def primeira_requisicao():
+    async with app.main.lifespan(app.main.app):
+        transporte = httpx.ASGITransport(app=app.main.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as client:
+            assert (await client.get("/health")).status_code == 200
+            return time.perf_counter()
+
+pronto = asyncio.run(primeira_requisicao())
+print(json.dumps({"import": importado - inicio, "primeira": pronto - inicio}))
+"""
+
+
+def _medir(latencia_ddl, cache_schema):
+    ambiente = dict(os.environ, SCHEMA_CACHE_FILE=cache_schema)
+    saida = subprocess.run(
+        [sys.executable, "-c", CODIGO, str(latencia_ddl)],
+        cwd=RAIZ, env=ambiente, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def main(latencia_ddl, repeticoes):
+    with tempfile.TemporaryDirectory() as diretorio:
+        cache_schema = os.path.join(diretorio, "schema_versions.json")
+        _medir(latencia_ddl, cache_schema)  # grava a versão do schema para o modo "em cache"
+
+        print(f"DDL simulada: {latencia_ddl} s por comando; mediana de {repeticoes} processos")
+        print(f"{'modo':<18} {'import':>10} {'1ª requisição':>15}")
+        for nome, arquivo in (("schema frio", ""), ("schema em cache", cache_schema)):
+            medidas = [_medir(latencia_ddl, arquivo) for _ in range(repeticoes)]
+            importacao = statistics.median(m["import"] for m in medidas)
+            primeira = statistics.median(m["primeira"] for m in medidas)
+            print(f"{nome:<18} {importacao * 1000:>8.0f} ms {primeira * 1000:>12.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latencia-ddl", type=float, default=1.0)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+    main(args.latencia_ddl, args.repeticoes)
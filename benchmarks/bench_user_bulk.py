@@ -0,0 +1,99 @@
+"""
+Importação e exportação em massa de usuários (NDJSON) contra o handle em memória.
+
+Gera o arquivo de entrada em fluxo (senhas já com hash, como numa migração da tabela
+Users antiga), importa e depois exporta tudo. Para cada tamanho mostra linhas/s e, com
+--memoria, a memória de trabalho medida com tracemalloc: o pico durante a operação menos
+o que ficou retido no fim (as linhas guardadas no próprio handle em memória não contam).
+Se o fluxo é realmente contínuo, esse número não cresce com o tamanho da tabela. O
+tracemalloc deixa tudo bem mais lento, então as duas medidas saem de rodadas separadas.
+
+    python -m benchmarks.bench_user_bulk [--tamanhos 10000 100000] [--memoria]
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+
+from benchmarks.ambiente_local import usar_handle_local
+
+handle = usar_handle_local()
+
+from app.services.user_bulk_service import user_bulk_service  # noqa: E402
+from app.utils.auth import AuthUtils  # noqa: E402
+
+HASH = AuthUtils.hash_password("senha-migrada")
+
+
+async def _arquivo(linhas, inicio, bloco=64 * 1024):
+    """NDJSON gerado sob demanda, entregue em blocos como o corpo de uma requisição."""
+    buffer = bytearray()
+    for i in range(inicio, inicio + linhas):
+        buffer += json.dumps({
+            "user_id": f"migrado-{i}", "name": f"Usuário Migrado {i}", "email": f"migrado{i}@exemplo.com",
+            "password_hash": HASH, "security_word": "Azul", "created_at": "2024-05-01T12:00:00",
+        }).encode() + b"\n"
+        if len(buffer) >= bloco:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def _medir(operacao, memoria):
+    if not memoria:
+        inicio = time.perf_counter()
+        resultado = await operacao()
+        return resultado, time.perf_counter() - inicio, None
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    inicio = time.perf_counter()
+    resultado = await operacao()
+    duracao = time.perf_counter() - inicio
+    atual, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, duracao, (pico - max(atual, base)) / 1024 / 1024
+
+
+def _mb(valor):
+    return f"{valor:>6.1f} MB" if valor is not None else " " * 9
+
+
+async def main(tamanhos, check_existing, memoria):
+    await user_bulk_service.users.ensure_schema()
+    print(f"{'linhas':>8} {'importação':>24} {'exportação':>24}")
+    inicio = 0
+    for linhas in tamanhos:
+        # Cada rodada começa com a tabela vazia
+        handle.tabelas[user_bulk_service.users.table_name].linhas.clear()
+        for entradas in handle.tabelas[user_bulk_service.users.table_name].entradas.values():
+            entradas.clear()
+
+        relatorio, t_import, mem_import = await _medir(
+            lambda: user_bulk_service.import_ndjson(_arquivo(linhas, inicio), check_existing=check_existing),
+            memoria,
+        )
+        assert relatorio["imported"] == linhas, relatorio
+
+        async def exportar():
+            total = 0
+            async for bloco in user_bulk_service.export_ndjson(include_sensitive=True):
+                total += bloco.count(b"\n")
+            return total
+
+        exportadas, t_export, mem_export = await _medir(exportar, memoria)
+        assert exportadas == linhas
+        print(f"{linhas:>8} {linhas / t_import:>9.0f} l/s {_mb(mem_import)} "
+              f"{linhas / t_export:>9.0f} l/s {_mb(mem_export)}")
+        inicio += linhas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--sem-checar-email", action="store_true", help="Importa sem consultar emails existentes")
+    parser.add_argument("--memoria", action="store_true", help="Mede a memória de trabalho com tracemalloc")
+    args = parser.parse_args()
+    asyncio.run(main(args.tamanhos, not args.sem_checar_email, args.memoria))
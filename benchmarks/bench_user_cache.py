@@ -0,0 +1,92 @@
+"""
+Efeito do cache de usuários em GET /auth/me sob tráfego de abertura do app.
+
+Muitos usuários abrindo o app ao mesmo tempo, com alguns bem mais ativos que outros
+(distribuição de Zipf). Compara unidades de leitura consumidas e latência p50/p95/p99 com o
+cache desligado e ligado, contra o handle em memória com latência simulada. Cada modo roda
+duas rodadas: "frio" (logo após o deploy) e "quente" (cache já povoado).
+
+    python -m benchmarks.bench_user_cache [--usuarios 2000] [--requisicoes 10000]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from benchmarks.ambiente_local import usar_handle_local
+
+handle = usar_handle_local()
+
+import httpx  # noqa: E402
+from borneo import PutRequest  # noqa: E402
+
+from app import config  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.user_service import user_service  # noqa: E402
+from app.utils.auth import AuthUtils  # noqa: E402
+from app.utils.cache import CacheLRUTTL  # noqa: E402
+
+
+def _popular(usuarios):
+    for i in range(usuarios):
+        handle.put(PutRequest().set_table_name(user_service.table_name).set_value({
+            "user_id": f"usuario-{i}", "name": f"Usuario {i}", "name_normalized": f"usuario {i}",
+            "email": f"usuario{i}@exemplo.com", "password_hash": "x" * 80, "security_word": "palavra",
+            "device_tokens": [{"token": "t" * 150, "platform": "android", "last_used": "2025-01-01T00:00:00"}],
+            "is_active": True, "created_at": "2025-01-01T00:00:00", "updated_at": "2025-01-01T00:00:00",
+        }))
+
+
+async def _carga(client, tokens, requisicoes, concorrencia, seed):
+    rng = random.Random(seed)
+    pesos = [1 / (i + 1) for i in range(len(tokens))]
+    sorteio = iter(rng.choices(tokens, weights=pesos, k=requisicoes))
+    latencias = []
+
+    async def trabalhador():
+        for token in sorteio:
+            # Pelo ASGITransport um acerto no cache não cede o event loop (não há socket no meio);
+            # sem isso um único cliente encadeia acertos e atrasa as respostas do pool de threads
+            await asyncio.sleep(0)
+            inicio = time.perf_counter()
+            resposta = await client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            assert resposta.status_code == 200, resposta.text
+
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    latencias.sort()
+    return statistics.median(latencias), latencias[int(len(latencias) * 0.95) - 1], latencias[int(len(latencias) * 0.99) - 1]
+
+
+async def main(usuarios, requisicoes, concorrencia, latencia_ms):
+    await user_service.ensure_schema()
+    _popular(usuarios)
+    handle.latencia = latencia_ms / 1000
+    tokens = [AuthUtils.create_access_token({"sub": f"usuario-{i}"}) for i in range(usuarios)]
+
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as client:
+        print(f"{usuarios} usuários, {requisicoes} requisições, concorrência {concorrencia}, "
+              f"latência do banco {latencia_ms} ms")
+        for nome, cache in (
+            ("sem cache", CacheLRUTTL(0, 0)),
+            ("com cache", CacheLRUTTL(config.USER_CACHE_MAX_ENTRIES, config.USER_CACHE_TTL_SECONDS)),
+        ):
+            user_service.cache = cache
+            for fase, seed in (("frio", 1), ("quente", 2)):
+                handle.zerar_contadores()
+                p50, p95, p99 = await _carga(client, tokens, requisicoes, concorrencia, seed)
+                print(f"  {nome:<10} {fase:<7} leituras={handle.unidades_leitura:>6}  "
+                      f"p50={p50:6.1f} ms  p95={p95:6.1f} ms  p99={p99:6.1f} ms")
+        print(f"  estatísticas: {user_service.cache.estatisticas()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--usuarios", type=int, default=2000)
+    parser.add_argument("--requisicoes", type=int, default=10000)
+    parser.add_argument("--concorrencia", type=int, default=32)
+    parser.add_argument("--latencia-ms", type=float, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.usuarios, args.requisicoes, args.concorrencia, args.latencia_ms))
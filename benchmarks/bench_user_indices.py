@@ -0,0 +1,74 @@
+"""
+Unidades de leitura por login conforme a tabela cresce: full scan x índice secundário.
+
+Usa o backend local em memória (app/storage/local.py), que cobra leituras como a nuvem:
+sem índice, a consulta por email/nome lê a tabela toda; com idx_email/idx_name_normalized,
+lê só a entrada do índice e a linha encontrada.
+
+    python -m benchmarks.bench_user_indices [--tamanhos 100 1000 10000]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.ambiente_local import usar_handle_local
+
+handle = usar_handle_local()
+
+from borneo import PutRequest  # noqa: E402
+
+from app.database import db  # noqa: E402
+from app.services.user_service import UserService  # noqa: E402
+from app.utils.texto import normalizar_nome  # noqa: E402
+from app.storage import LocalNoSQLHandle  # noqa: E402
+
+
+def _popular(service, quantidade):
+    for i in range(quantidade):
+        nome = f"Usuário Teste {i}"
+        db.handle.put(PutRequest().set_table_name(service.table_name).set_value({
+            "user_id": f"id-{i}",
+            "name": nome,
+            "name_normalized": normalizar_nome(nome),
+            "email": f"usuario{i}@exemplo.com",
+            "password_hash": "$5$rounds=535000$" + "x" * 60,
+            "security_word": "palavra",
+            "device_tokens": [],
+            "is_active": True,
+            "created_at": "2025-01-01T00:00:00",
+            "updated_at": "2025-01-01T00:00:00",
+        }))
+
+
+async def _medir(service, quantidade, logins):
+    db.handle.zerar_contadores()
+    inicio = time.perf_counter()
+    for i in range(logins):
+        alvo = (i * 7919) % quantidade
+        # Login por email e por nome, como o /auth/login faz
+        assert await service._get_user_by_email(f"usuario{alvo}@exemplo.com")
+        assert await service._get_user_by_name(f"usuário teste {alvo}")
+    decorrido = time.perf_counter() - inicio
+    return db.handle.unidades_leitura / logins, decorrido / logins * 1e6
+
+
+async def main(tamanhos, logins):
+    print(f"{'linhas':>8} {'RU/login sem índice':>20} {'RU/login com índice':>20}")
+    for quantidade in tamanhos:
+        db.handle = LocalNoSQLHandle()
+        service = UserService()
+        await service.ensure_schema()
+        _popular(service, quantidade)
+
+        com_indice, _ = await _medir(service, quantidade, logins)
+        db.handle.tabelas[service.table_name].indices.clear()
+        sem_indice, _ = await _medir(service, quantidade, min(logins, 20))
+        print(f"{quantidade:>8} {sem_indice:>20.0f} {com_indice:>20.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--logins", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.tamanhos, args.logins))
@@ -0,0 +1,155 @@
+"""
+Atualizações parciais de usuário: atualizações concorrentes e unidades consumidas.
+
+1. Vários dispositivos registram tokens ao mesmo tempo para o mesmo usuário. O caminho
+   antigo (lê o documento inteiro, altera em Python e grava tudo de volta) perde tokens;
+   o UPDATE de save_device_token não pode perder nenhum.
+2. Vários modify_user simultâneos sobre a mesma linha: cada um ou grava sobre a versão
+   mais recente ou desiste com 409 depois de USER_UPDATE_MAX_RETRIES tentativas; nenhuma
+   alteração confirmada some.
+3. Unidades de leitura/escrita por operação, antes e depois, para o registro de token e a
+   troca de senha.
+
+O script falha (AssertionError) se alguma garantia de concorrência não for cumprida.
+
+    python -m benchmarks.bench_user_updates [--dispositivos 20]
+"""
+import argparse
+import asyncio
+from datetime import datetime
+
+from benchmarks.ambiente_local import usar_handle_local
+
+handle = usar_handle_local()
+
+from borneo import GetRequest, PutRequest, QueryRequest  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+
+from app import config  # noqa: E402
+from app.database import async_handle  # noqa: E402
+from app.schemas.user_schema import PasswordReset  # noqa: E402
+from app.services.user_service import user_service  # noqa: E402
+from app.utils.auth import password_hasher  # noqa: E402
+
+TABELA = user_service.table_name
+
+
+def _novo_usuario(user_id, tokens=0):
+    handle.put(PutRequest().set_table_name(TABELA).set_value({
+        "user_id": user_id, "name": "Bench", "name_normalized": "bench",
+        "email": f"{user_id}@exemplo.com", "password_hash": "$5$" + "x" * 60, "security_word": "azul",
+        "device_tokens": [
+            {"token": f"token-antigo-{i}-" + "t" * 140, "platform": "android", "last_used": "2025-01-01T00:00:00"}
+            for i in range(tokens)
+        ],
+        "is_active": True, "created_at": "2025-01-01T00:00:00", "updated_at": "2025-01-01T00:00:00",
+    }))
+    user_service.cache.limpar()
+
+
+def _tokens(user_id):
+    linha = handle.get(GetRequest().set_table_name(TABELA).set_key({"user_id": user_id})).get_value()
+    return {t["token"] for t in linha["device_tokens"]}
+
+
+async def _token_legado(user_id, device_token, platform="android"):
+    """Como save_device_token era antes: lê tudo, altera em Python, grava a linha inteira."""
+    result = await async_handle.get(GetRequest().set_table_name(TABELA).set_key({"user_id": user_id}))
+    user = result.get_value()
+    tokens = [t for t in user.get("device_tokens") or [] if t.get("token") != device_token]
+    tokens.append({"token": device_token, "platform": platform, "last_used": datetime.utcnow().isoformat()})
+    user["device_tokens"] = tokens
+    user["updated_at"] = datetime.utcnow().isoformat()
+    await async_handle.put(PutRequest().set_table_name(TABELA).set_value(user))
+
+
+async def _senha_legado(reset_data):
+    """Como reset_password era antes: consulta por email e grava a linha inteira."""
+    request = QueryRequest().set_statement(f"SELECT * FROM {TABELA} WHERE email = '{reset_data.email}'")
+    user = (await async_handle.query(request)).get_results()[0]
+    user["password_hash"] = "$5$" + "y" * 60
+    user["updated_at"] = datetime.utcnow().isoformat()
+    await async_handle.put(PutRequest().set_table_name(TABELA).set_value(user))
+
+
+async def concorrencia_tokens(dispositivos):
+    print(f"{dispositivos} dispositivos registrando token ao mesmo tempo")
+    # O teto de tokens por usuário cortaria os mais antigos; aqui só importa não perder nenhum
+    config.DEVICE_TOKENS_PER_USER = max(config.DEVICE_TOKENS_PER_USER, dispositivos)
+    for nome, registrar in (("legado", _token_legado), ("UPDATE", user_service.save_device_token)):
+        _novo_usuario(f"u-{nome}")
+        esperados = {f"dispositivo-{i}" for i in range(dispositivos)}
+        await asyncio.gather(*(registrar(f"u-{nome}", token) for token in esperados))
+        sobreviventes = len(esperados & _tokens(f"u-{nome}"))
+        print(f"  {nome:<8} tokens gravados: {sobreviventes}/{dispositivos}")
+    assert sobreviventes == dispositivos, "UPDATE perdeu tokens"
+
+
+async def concorrencia_versao(escritores):
+    print(f"\n{escritores} modify_user simultâneos na mesma linha")
+    _novo_usuario("u-versao")
+
+    async def escrever(i):
+        def acrescentar(user):
+            user["device_tokens"].append({"token": f"versao-{i}", "platform": "ios", "last_used": "2025-01-01T00:00:00"})
+            return True
+        try:
+            await user_service.modify_user("u-versao", acrescentar)
+            return f"versao-{i}"
+        except HTTPException as e:
+            assert e.status_code == 409
+            return None
+
+    confirmados = {t for t in await asyncio.gather(*(escrever(i) for i in range(escritores))) if t}
+    gravados = {t for t in _tokens("u-versao") if t.startswith("versao-")}
+    print(f"  confirmados: {len(confirmados)}, desistiram com 409: {escritores - len(confirmados)}, "
+          f"gravados: {len(gravados)}")
+    assert confirmados == gravados, "alteração confirmada foi sobrescrita"
+
+
+async def _unidades(operacao):
+    handle.zerar_contadores()
+    await operacao()
+    return handle.unidades_leitura, handle.unidades_escrita, sum(handle.chamadas.values())
+
+
+async def unidades_por_operacao(tokens):
+    print(f"\nunidades por operação (linha com {tokens} tokens, sem cache de usuário)")
+    reset = PasswordReset(email="u-unidades@exemplo.com", security_word="azul", new_password="nova-senha")
+    casos = (
+        ("registro de token", lambda: _token_legado("u-unidades", "novo"),
+         lambda: user_service.save_device_token("u-unidades", "novo")),
+        ("troca de senha", lambda: _senha_legado(reset), lambda: user_service.reset_password(reset)),
+    )
+    print(f"  {'operação':<18} {'antes (RU/WU/idas)':>20} {'depois (RU/WU/idas)':>20}")
+    for nome, antes, depois in casos:
+        linha = []
+        for operacao in (antes, depois):
+            # Uma execução antes da medida, para as consultas preparadas já estarem em cache
+            _novo_usuario("u-unidades", tokens)
+            await operacao()
+            _novo_usuario("u-unidades", tokens)
+            ru, wu, idas = await _unidades(operacao)
+            linha.append(f"{ru}/{wu}/{idas}")
+        print(f"  {nome:<18} {linha[0]:>20} {linha[1]:>20}")
+
+
+async def main(dispositivos, escritores, tokens):
+    await user_service.ensure_schema()
+    handle.latencia = 0.005
+    try:
+        await concorrencia_tokens(dispositivos)
+        await concorrencia_versao(escritores)
+        handle.latencia = 0
+        await unidades_por_operacao(tokens)
+    finally:
+        password_hasher.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dispositivos", type=int, default=20)
+    parser.add_argument("--escritores", type=int, default=8)
+    parser.add_argument("--tokens", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.dispositivos, args.escritores, args.tokens))
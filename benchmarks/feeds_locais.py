@@ -0,0 +1,165 @@
+"""
+Corpus de feeds para os benchmarks.
+
+Usa os XML salvos em benchmarks/corpus/ (gere com `python -m benchmarks.feeds_locais --baixar`
+e faça commit dos arquivos: é a amostra da entrada de produção). Sem corpus salvo, gera feeds sintéticos nos dois formatos que as fontes reais usam:
+media:content (G1) e imagem dentro do HTML da descrição (WordPress: Drauzio/Einstein).
+"""
+import argparse
+import hashlib
+import random
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus"
+# Nome de cada feed de rss_service.URLS no corpus salvo (os mesmos do corpus sintético)
+NOMES_FEEDS = ("g1", "drauzio", "govbr", "einstein")
+_RE_FIM_ITEM = re.compile(rb"</item\s*>", re.I)
+
+_TEMAS = [
+    "câncer de próstata", "colesterol alto", "pressão arterial", "testosterona", "saúde mental",
+    "diabetes", "vacinação", "sono", "atividade física", "alimentação", "tabagismo", "check-up",
+]
+
+
+def _descricao(rnd, i):
+    tema = rnd.choice(_TEMAS)
+    return (
+        f"<p>Especialistas explicam como prevenir {tema}. "
+        f"O acompanhamento médico regular reduz riscos e ajuda no diagnóstico precoce "
+        f"(notícia {i}).</p><p>Leia mais <a href=\"https://exemplo.com/{i}\">aqui</a>.</p>"
+    )
+
+
+def gerar_feed_xml(nome, n_itens=50, estilo="g1", seed=0):
+    """Gera um RSS 2.0 com n_itens entradas no estilo das fontes reais."""
+    rnd = random.Random(f"{nome}-{seed}")
+    itens = []
+    for i in range(n_itens):
+        tema = rnd.choice(_TEMAS)
+        titulo = f"{tema.capitalize()}: o que saber sobre o assunto ({nome} {i})"
+        link = f"https://{nome}.exemplo.com.br/saude/noticia/{i}.ghtml"
+        descricao = _descricao(rnd, i)
+        if estilo == "g1":
+            extra = "".join(
+                f'<media:content url="https://s2.{nome}.exemplo.com/{i}/{w}.jpg" medium="image" width="{w}"/>'
+                for w in (320, 640, 1280)
+            )
+        else:
+            descricao = f'<img src="https://{nome}.exemplo.com.br/wp-content/uploads/{i}.jpg" width="300"/>' + descricao
+            extra = f"<content:encoded>{escape(descricao * 4)}</content:encoded>"
+        itens.append(
+            f"<item><title>{escape(titulo)}</title><link>{link}</link>"
+            f"<guid isPermaLink=\"false\">{nome}-{i}</guid>"
+            f"<description>{escape(descricao)}</description>{extra}</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0" xmlns:media="http://search.yahoo.com/mrss/" '
+        'xmlns:content="http://purl.org/rss/1.0/modules/content/">'
+        f"<channel><title>{nome}</title><link>https://{nome}.exemplo.com.br</link>"
+        + "".join(itens)
+        + "</channel></rss>"
+    ).encode()
+
+
+def corpus_sintetico(n_itens=50):
+    return [
+        ("g1", gerar_feed_xml("g1", n_itens, "g1")),
+        ("drauzio", gerar_feed_xml("drauzio", n_itens, "wordpress")),
+        ("govbr", gerar_feed_xml("govbr", n_itens, "g1")),
+        ("einstein", gerar_feed_xml("einstein", n_itens, "wordpress")),
+    ]
+
+
+def corpus_salvo():
+    """[(nome, xml_bytes)] dos feeds reais gravados em benchmarks/corpus/ (vazio se não há)."""
+    return [(arquivo.stem, arquivo.read_bytes()) for arquivo in sorted(CORPUS_DIR.glob("*.xml"))]
+
+
+def carregar_corpus():
+    """Retorna [(nome, xml_bytes)] do corpus salvo, ou o sintético se não houver."""
+    return corpus_salvo() or corpus_sintetico()
+
+
+def _recortar(xml, max_itens):
+    """Os primeiros `max_itens` itens do feed, fechando channel/rss: uma amostra pequena para o commit."""
+    fins = list(_RE_FIM_ITEM.finditer(xml))
+    if len(fins) <= max_itens:
+        return xml
+    return xml[:fins[max_itens - 1].end()] + b"</channel></rss>\n"
+
+
+def servidor_stub(feeds=None):
+    """
+    Sobe um servidor HTTP local servindo cada feed em /<nome> (com ETag e 304).
+    Retorna (urls, servidor); chame servidor.shutdown() no fim.
+    """
+    feeds = dict(feeds or carregar_corpus())
+    etags = {nome: f'"{hashlib.sha1(xml).hexdigest()[:16]}"' for nome, xml in feeds.items()}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            nome = self.path.strip("/")
+            if nome not in feeds:
+                self.send_response(404)
+                self.end_headers()
+                return
+            if self.headers.get("If-None-Match") == etags[nome]:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/rss+xml")
+            self.send_header("Content-Length", str(len(feeds[nome])))
+            self.send_header("ETag", etags[nome])
+            self.end_headers()
+            self.wfile.write(feeds[nome])
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{servidor.server_port}"
+    return [f"{base}/{nome}" for nome in feeds], servidor
+
+
+def baixar_corpus(max_itens=20):
+    """
+    Salva o XML atual de cada feed de produção em benchmarks/corpus/<nome>.xml, com até
+    `max_itens` itens. Retorna quantos feeds falharam (os outros são salvos mesmo assim).
+    """
+    import httpx
+    from app.services.rss_service import URLS, HEADERS
+
+    CORPUS_DIR.mkdir(exist_ok=True)
+    falhas = 0
+    for nome, url in zip(NOMES_FEEDS, URLS):
+        try:
+            resposta = httpx.get(url, headers=HEADERS, timeout=15, follow_redirects=True)
+            resposta.raise_for_status()
+        except httpx.HTTPError as e:
+            print(f"{url}: {e!r}", file=sys.stderr)
+            falhas += 1
+            continue
+        destino = CORPUS_DIR / f"{nome}.xml"
+        destino.write_bytes(_recortar(resposta.content, max_itens))
+        print(f"{url} -> {destino} ({destino.stat().st_size} bytes)")
+    return falhas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--baixar", action="store_true", help="salva os feeds reais em benchmarks/corpus/")
+    parser.add_argument("--max-itens", type=int, default=20, help="itens guardados por feed com --baixar")
+    args = parser.parse_args()
+    if args.baixar:
+        sys.exit(1 if baixar_corpus(args.max_itens) else 0)
+    else:
+        for nome, xml in carregar_corpus():
+            print(nome, len(xml), "bytes")
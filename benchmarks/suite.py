@@ -0,0 +1,299 @@
+"""
+Suíte de carga dos endpoints mais usados pelo app, para comparar versões do backend.
+
+Roda o FastAPI `app` no processo (httpx.ASGITransport), com o backend de armazenamento
+local e os feeds servidos por um servidor HTTP local, e mede vazão e latência p50/p95/p99
+de cada cenário em vários níveis de concorrência:
+
+    login          POST /auth/login        (hash de senha no pool de processos)
+    register       POST /auth/register     (email novo a cada requisição)
+    me             GET  /auth/me           (usuários sorteados com distribuição de Zipf)
+    rss            GET  /rss/              (páginas do snapshot em memória)
+    device-token   POST /auth/device-token (UPDATE no banco, poucos tokens por usuário)
+
+    python -m benchmarks.suite run [--saida resultados.json] [--baseline baseline.json]
+    python -m benchmarks.suite compare resultados.json baseline.json [--tolerancia 0.20]
+
+Cada cenário começa com o cache de usuários vazio e um aquecimento, para não depender dos
+cenários que rodaram antes; cada medida é a mediana de --repeticoes rodadas.
+
+O resultado sai em JSON; com --baseline (ou no modo compare) cada cenário/concorrência é
+comparado com o arquivo salvo e a saída é 1 se houver regressão: vazão abaixo de
+(1 - tolerância) x baseline, ou p95/p99 acima de (1 + tolerância) x baseline e ao mesmo
+tempo mais de --folga-ms acima dele (diferenças de décimos de ms são ruído). Números só
+são comparáveis na mesma máquina e com os mesmos parâmetros (ficam em "parametros").
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+CENARIOS = ("login", "register", "me", "rss", "device-token")
+METRICAS_MAIOR_MELHOR = ("rps",)
+METRICAS_MENOR_MELHOR = ("p95_ms", "p99_ms")
+
+
+def percentil(ordenadas, p):
+    """Percentil pelo posto mais próximo (lista já ordenada)."""
+    if not ordenadas:
+        return 0.0
+    return ordenadas[min(len(ordenadas) - 1, max(0, math.ceil(p * len(ordenadas)) - 1))]
+
+
+class Cenarios:
+    """Dados de partida e a requisição de cada cenário; `requisicao(nome, i)` devolve (método, url, kwargs)."""
+
+    SENHA = "senha-bench"
+
+    def __init__(self, usuarios, seed=0):
+        self.usuarios = usuarios
+        self.rng = random.Random(seed)
+        self.pesos = [1 / (i + 1) for i in range(usuarios)]
+        self.tokens = []
+        self.registros = 0
+
+    def popular(self, handle, table_name):
+        from borneo import PutRequest
+
+        from app.utils.auth import AuthUtils
+
+        # Um hash só para todos: o custo do hash entra nas requisições, não no preparo
+        password_hash = AuthUtils.hash_password(self.SENHA)
+        for i in range(self.usuarios):
+            handle.put(PutRequest().set_table_name(table_name).set_value({
+                "user_id": f"bench-{i}", "name": f"Usuario Bench {i}", "name_normalized": f"usuario bench {i}",
+                "email": f"bench{i}@exemplo.com", "password_hash": password_hash, "security_word": "palavra",
+                "device_tokens": [], "is_active": True,
+                "created_at": "2025-01-01T00:00:00", "updated_at": "2025-01-01T00:00:00",
+            }))
+        self.tokens = [AuthUtils.create_access_token({"sub": f"bench-{i}"}) for i in range(self.usuarios)]
+
+    def _usuario(self):
+        return self.rng.choices(range(self.usuarios), weights=self.pesos)[0]
+
+    def requisicao(self, nome, i):
+        if nome == "login":
+            usuario = self._usuario()
+            return "POST", "/auth/login", {"json": {"identifier": f"bench{usuario}@exemplo.com", "password": self.SENHA}}
+        if nome == "register":
+            self.registros += 1
+            return "POST", "/auth/register", {"json": {
+                "name": f"Novo Bench {self.registros}", "email": f"novo{self.registros}@exemplo.com",
+                "password": self.SENHA, "security_word": "palavra",
+            }}
+        if nome == "me":
+            usuario = self._usuario()
+            return "GET", "/auth/me", {"headers": {"Authorization": f"Bearer {self.tokens[usuario]}"}}
+        if nome == "rss":
+            return "GET", "/rss/", {"params": {"page": i % 5 + 1, "limit": 3}}
+        if nome == "device-token":
+            usuario = self._usuario()
+            return "POST", "/auth/device-token", {
+                "headers": {"Authorization": f"Bearer {self.tokens[usuario]}"},
+                "json": {"device_token": f"fcm-bench-{usuario}-{i % 3}", "platform": "android"},
+            }
+        raise ValueError(f"Cenário desconhecido: {nome}")
+
+
+async def medir(client, cenarios, nome, requisicoes, concorrencia, repeticoes=1):
+    """Mediana de cada métrica entre as rodadas (erros somados)."""
+    rodadas = [await _rodada(client, cenarios, nome, requisicoes, concorrencia) for _ in range(repeticoes)]
+    medida = {metrica: statistics.median(r[metrica] for r in rodadas) for metrica in rodadas[0]}
+    medida["requisicoes"] = sum(r["requisicoes"] for r in rodadas)
+    medida["erros"] = sum(r["erros"] for r in rodadas)
+    return medida
+
+
+async def _rodada(client, cenarios, nome, requisicoes, concorrencia):
+    contador = iter(range(requisicoes))
+    latencias = []
+    erros = 0
+
+    async def trabalhador():
+        nonlocal erros
+        for i in contador:
+            # Pelo ASGITransport uma resposta sem I/O não cede o event loop; sem isso um único
+            # trabalhador encadeia requisições e os demais (e o pool de threads) ficam esperando
+            await asyncio.sleep(0)
+            metodo, url, kwargs = cenarios.requisicao(nome, i)
+            inicio = time.perf_counter()
+            resposta = await client.request(metodo, url, **kwargs)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            if resposta.status_code >= 400:
+                erros += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    decorrido = time.perf_counter() - inicio
+    latencias.sort()
+    return {
+        "requisicoes": len(latencias),
+        "erros": erros,
+        "rps": round(len(latencias) / decorrido, 1),
+        "p50_ms": round(percentil(latencias, 0.50), 2),
+        "p95_ms": round(percentil(latencias, 0.95), 2),
+        "p99_ms": round(percentil(latencias, 0.99), 2),
+    }
+
+
+async def executar(args):
+    # Tudo que app.config e app.utils.auth leem precisa estar no ambiente antes do import
+    # (os processos do hash de senha também leem PASSWORD_HASH_ROUNDS)
+    os.environ["PASSWORD_HASH_ROUNDS"] = str(args.rounds)
+    from benchmarks.ambiente_local import usar_handle_local
+
+    handle = usar_handle_local()
+
+    import httpx
+
+    from app.database import async_handle
+    from app.main import app
+    from app.services import rss_service
+    from app.services.feed_fetcher import FeedFetcher
+    from app.services.user_service import user_service
+    from app.utils.auth import password_hasher
+    from benchmarks.feeds_locais import servidor_stub
+
+    await user_service.ensure_schema()
+    cenarios = Cenarios(args.usuarios, seed=args.seed)
+    cenarios.popular(handle, user_service.table_name)
+    handle.latencia = args.latencia_ms / 1000
+
+    urls, servidor = servidor_stub()
+    rss_service._fetcher = FeedFetcher(urls)
+    await rss_service.atualizar_snapshot()
+
+    resultados = {}
+    try:
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=60) as client:
+            for nome in args.cenarios:
+                # Mesmo ponto de partida em todo cenário; o aquecimento sobe o pool de processos
+                # do hash, prepara as consultas e povoa o cache como no tráfego real
+                user_service.cache.limpar()
+                await medir(client, cenarios, nome, args.requisicoes, max(args.concorrencias))
+                resultados[nome] = {}
+                for concorrencia in args.concorrencias:
+                    medida = await medir(client, cenarios, nome, args.requisicoes, concorrencia, args.repeticoes)
+                    resultados[nome][str(concorrencia)] = medida
+                    print(f"  {nome:<13} c={concorrencia:<4} {medida['rps']:>8.1f} req/s  "
+                          f"p50={medida['p50_ms']:7.2f}  p95={medida['p95_ms']:7.2f}  "
+                          f"p99={medida['p99_ms']:7.2f} ms  erros={medida['erros']}", file=sys.stderr)
+    finally:
+        servidor.shutdown()
+        password_hasher.close()
+        async_handle.close()
+
+    return {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "ambiente": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "parametros": {
+            "usuarios": args.usuarios,
+            "requisicoes": args.requisicoes,
+            "concorrencias": args.concorrencias,
+            "latencia_ms": args.latencia_ms,
+            "rounds": args.rounds,
+            "repeticoes": args.repeticoes,
+            "seed": args.seed,
+        },
+        "resultados": resultados,
+    }
+
+
+def comparar(atual, baseline, tolerancia, folga_ms=1.0):
+    """Linhas da comparação e se houve regressão em alguma métrica."""
+    linhas = []
+    regressao = False
+    if atual.get("parametros") != baseline.get("parametros"):
+        linhas.append("aviso: parâmetros diferentes do baseline, a comparação pode não valer")
+    for nome, por_concorrencia in atual["resultados"].items():
+        for concorrencia, medida in por_concorrencia.items():
+            base = baseline.get("resultados", {}).get(nome, {}).get(concorrencia)
+            if base is None:
+                linhas.append(f"  {nome:<13} c={concorrencia:<4} sem baseline")
+                continue
+            piores = []
+            for metrica in METRICAS_MAIOR_MELHOR:
+                if base[metrica] and medida[metrica] < base[metrica] * (1 - tolerancia):
+                    piores.append(metrica)
+            for metrica in METRICAS_MENOR_MELHOR:
+                limite = max(base[metrica] * (1 + tolerancia), base[metrica] + folga_ms)
+                if base[metrica] and medida[metrica] > limite:
+                    piores.append(metrica)
+            if medida["erros"] > base["erros"]:
+                piores.append("erros")
+            regressao = regressao or bool(piores)
+            variacoes = "  ".join(
+                f"{metrica}={medida[metrica]:.1f} ({(medida[metrica] / base[metrica] - 1) * 100:+.0f}%)"
+                if base[metrica] else f"{metrica}={medida[metrica]:.1f}"
+                for metrica in METRICAS_MAIOR_MELHOR + METRICAS_MENOR_MELHOR
+            )
+            marca = f"  REGRESSÃO: {', '.join(piores)}" if piores else ""
+            linhas.append(f"  {nome:<13} c={concorrencia:<4} {variacoes}{marca}")
+    return linhas, regressao
+
+
+def _carregar(caminho):
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    modos = parser.add_subparsers(dest="modo", required=True)
+
+    run = modos.add_parser("run", help="executa os cenários e grava o JSON")
+    run.add_argument("--cenarios", nargs="+", choices=CENARIOS, default=list(CENARIOS))
+    run.add_argument("--concorrencias", nargs="+", type=int, default=[1, 8, 32])
+    run.add_argument("--requisicoes", type=int, default=400, help="requisições por cenário e concorrência")
+    run.add_argument("--usuarios", type=int, default=1000)
+    run.add_argument("--latencia-ms", type=float, default=2.0, help="latência simulada de cada chamada ao banco")
+    run.add_argument("--rounds", type=int, default=20000, help="rounds do sha256_crypt (produção: 535000)")
+    run.add_argument("--repeticoes", type=int, default=3, help="rodadas por medida (vale a mediana)")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--saida", help="arquivo JSON do resultado (padrão: stdout)")
+    run.add_argument("--baseline", help="compara com este resultado salvo e sai com 1 se houver regressão")
+    run.add_argument("--tolerancia", type=float, default=0.20)
+    run.add_argument("--folga-ms", type=float, default=1.0)
+
+    compare = modos.add_parser("compare", help="compara dois resultados já gravados")
+    compare.add_argument("atual")
+    compare.add_argument("baseline")
+    compare.add_argument("--tolerancia", type=float, default=0.20)
+    compare.add_argument("--folga-ms", type=float, default=1.0)
+
+    args = parser.parse_args()
+    if args.modo == "run":
+        resultado = asyncio.run(executar(args))
+        texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+        if args.saida:
+            with open(args.saida, "w", encoding="utf-8") as arquivo:
+                arquivo.write(texto + "\n")
+        else:
+            print(texto)
+        if not args.baseline:
+            return 0
+        atual, baseline = resultado, _carregar(args.baseline)
+    else:
+        atual, baseline = _carregar(args.atual), _carregar(args.baseline)
+
+    linhas, regressao = comparar(atual, baseline, args.tolerancia, args.folga_ms)
+    print(f"comparação com o baseline (tolerância {args.tolerancia:.0%})", file=sys.stderr)
+    for linha in linhas:
+        print(linha, file=sys.stderr)
+    return 1 if regressao else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())